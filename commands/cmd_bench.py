@@ -0,0 +1,159 @@
+# pyright: strict
+
+"""A repeatable benchmark of the stages of the generator.
+
+Every stage is timed for each AGS of a fixed sample (big city, rural commune,
+gemeindefreies Gebiet, district, state and Germany), first a few times without
+recording (warm up) and then for the given number of repetitions. The output
+is JSON with percentiles of the wall clock seconds of every stage, and, if a
+previous output is given as baseline, how much slower or faster each stage got.
+"""
+
+from time import perf_counter
+from typing import Any, Callable, TypeVar
+import io
+import json
+import platform
+import sys
+
+import numpy as np
+
+from climatevision.generator import Inputs, RefData, make_entries, resultjson
+from climatevision.generator.generator import GRAPH, Result, result_of_evaluation
+from climatevision.tracing import with_tracing
+
+T = TypeVar("T")
+
+# label -> ags
+SAMPLE = {
+    "big_city": "09162000",  # München
+    "rural": "01051001",  # Albersdorf (Dithmarschen)
+    "gemfr": "03153504",  # Harz (Landkreis Goslar), gemfr. Gebiet
+    "district": "03159000",  # Landkreis Göttingen
+    "state": "03000000",  # Niedersachsen
+    "germany": "DG000000",
+}
+
+PERCENTILES = (50, 90, 99)
+
+
+class Timings:
+    seconds: dict[str, list[float]]
+    # False while warming up.
+    recording: bool
+
+    def __init__(self):
+        self.seconds = {}
+        self.recording = False
+
+    def add(self, stage: str, seconds: float):
+        if self.recording:
+            self.seconds.setdefault(stage, []).append(seconds)
+
+    def time(self, stage: str, f: Callable[[], T]) -> T:
+        start = perf_counter()
+        v = f()
+        self.add(stage, perf_counter() - start)
+        return v
+
+
+def stats(seconds: list[float]) -> dict[str, float]:
+    percentiles = np.percentile(seconds, PERCENTILES).tolist()
+    return {
+        "n": len(seconds),
+        "min": min(seconds),
+        "mean": sum(seconds) / len(seconds),
+        **{f"p{p}": v for (p, v) in zip(PERCENTILES, percentiles)},
+        "max": max(seconds),
+    }
+
+
+def compare_with_baseline(
+    stages: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> dict[str, Any]:
+    """The median of every stage relative to the baseline, and the stages that
+    got slower by more than tolerance."""
+    ratios = {
+        stage: s["p50"] / baseline[stage]["p50"]
+        for (stage, s) in stages.items()
+        if stage in baseline and baseline[stage]["p50"] > 0
+    }
+    return {
+        "p50_ratio": ratios,
+        "slower": sorted(s for (s, r) in ratios.items() if r > 1 + tolerance),
+        "faster": sorted(s for (s, r) in ratios.items() if r < 1 - tolerance),
+    }
+
+
+def _bench_ags(t: Timings, rd: RefData, label: str, ags: str, year: int):
+    entries = t.time(f"make_entries/{label}", lambda: make_entries(rd, ags, year))
+    inputs = Inputs(facts_and_assumptions=rd.facts_and_assumptions(), entries=entries)
+    evaluation = t.time(f"calculate/{label}", lambda: GRAPH.run(inputs))
+    for (node, seconds) in evaluation.seconds.items():
+        t.add(f"calc/{node}/{label}", seconds)
+    result = result_of_evaluation(evaluation)
+    d = t.time(f"result_dict/{label}", result.result_dict)
+    t.time(f"json/{label}", lambda: json.dumps(d))
+    t.time(f"json_stream/{label}", lambda: resultjson.dump(result, io.StringIO()))
+
+    def pipeline(rd: RefData) -> Result:
+        entries = make_entries(rd, ags, year)
+        return result_of_evaluation(
+            GRAPH.run(
+                Inputs(
+                    facts_and_assumptions=rd.facts_and_assumptions(), entries=entries
+                )
+            )
+        )
+
+    t.time(f"untraced/{label}", lambda: with_tracing(False, rd, pipeline))
+    t.time(f"traced/{label}", lambda: with_tracing(True, rd, pipeline))
+
+
+def bench(
+    sample: dict[str, str], year: int, warmup: int, repetitions: int
+) -> dict[str, Any]:
+    t = Timings()
+    rd = RefData.load()
+    unknown = [ags for ags in sample.values() if ags not in rd.ags_master()]
+    if unknown:
+        raise ValueError(f"Unknown AGS {unknown}")
+    for i in range(warmup + repetitions):
+        t.recording = i >= warmup
+        rd = t.time("refdata_load", RefData.load)
+        for (label, ags) in sample.items():
+            _bench_ags(t, rd, label, ags, year)
+    version = rd.version()
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "data_version": None
+        if version is None
+        else {"public": version.public, "proprietary": version.proprietary},
+        "year": year,
+        "warmup": warmup,
+        "repetitions": repetitions,
+        "sample": sample,
+        "stages": {stage: stats(s) for (stage, s) in t.seconds.items()},
+    }
+
+
+def cmd_bench(args: Any):
+    sample = SAMPLE if args.ags is None else {ags: ags for ags in args.ags}
+    report = bench(sample, int(args.year), int(args.warmup), int(args.repetitions))
+    if args.baseline is not None:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        report["baseline"] = compare_with_baseline(
+            report["stages"], baseline["stages"], float(args.tolerance)
+        )
+        for stage in report["baseline"]["slower"]:
+            ratio = report["baseline"]["p50_ratio"][stage]
+            print(f"{stage} is {ratio:.2f}x slower than the baseline", file=sys.stderr)
+    if args.o is not None:
+        with open(args.o, mode="w") as fp:
+            json.dump(report, fp, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
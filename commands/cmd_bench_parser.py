@@ -0,0 +1,27 @@
+# pyright: strict
+
+from typing import Any
+
+from commands.cmd_bench import cmd_bench
+
+
+def add_cmd_bench_parser(subcmd_parsers: Any):
+    cmd_bench_parser = subcmd_parsers.add_parser(
+        "bench", help="Time the stages of the generator for a sample of AGS"
+    )
+    cmd_bench_parser.add_argument("-year", default=2035)
+    cmd_bench_parser.add_argument(
+        "-ags", nargs="+", default=None, help="Use these AGS instead of the sample"
+    )
+    cmd_bench_parser.add_argument("-warmup", default=1)
+    cmd_bench_parser.add_argument("-repetitions", default=5)
+    cmd_bench_parser.add_argument("-o", default=None)
+    cmd_bench_parser.add_argument(
+        "-baseline", default=None, help="Compare with the output of an earlier run"
+    )
+    cmd_bench_parser.add_argument(
+        "-tolerance",
+        default=0.1,
+        help="List the stages whose median is this much slower than the baseline",
+    )
+    cmd_bench_parser.set_defaults(func=cmd_bench)
@@ -2,7 +2,30 @@
 
 from typing import Any
 
-from commands.cmd_explorer import cmd_explorer
+from commands.cmd_explorer import cmd_explorer, cmd_serve
+
+
+def add_server_arguments(parser: Any):
+    parser.add_argument("-host", default="")
+    parser.add_argument("-port", type=int, default=4070)
+    parser.add_argument(
+        "-workers",
+        type=int,
+        default=None,
+        help="Number of worker processes for the calculations (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "-timeout",
+        type=float,
+        default=120.0,
+        help="Seconds until a request is answered with a timeout error",
+    )
+    parser.add_argument(
+        "-cache_mb",
+        type=int,
+        default=256,
+        help="Megabytes of calculate results to keep in the cache",
+    )
 
 
 def add_cmd_explorer_parser(subcmd_parsers: Any):
@@ -10,4 +33,13 @@ def add_cmd_explorer_parser(subcmd_parsers: Any):
         "explorer", help="Start the LocalZero Explorer"
     )
     cmd_explorer_parser.add_argument("-trace", action="store_true")
+    add_server_arguments(cmd_explorer_parser)
     cmd_explorer_parser.set_defaults(func=cmd_explorer)
+
+
+def add_cmd_serve_parser(subcmd_parsers: Any):
+    cmd_serve_parser = subcmd_parsers.add_parser(
+        "serve", help="Serve the generator RPCs with a pool of worker processes"
+    )
+    add_server_arguments(cmd_serve_parser)
+    cmd_serve_parser.set_defaults(func=cmd_serve)
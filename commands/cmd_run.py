@@ -1,36 +1,92 @@
 # pyright: strict
 
 from dataclasses import asdict
-from typing import Any
+from typing import Any, Callable
 import json
+import logging
 import sys
 
-from climatevision.generator import calculate_with_default_inputs, RefData, make_entries
-from climatevision.tracing import with_tracing
+from climatevision.generator import (
+    instrumentation,
+    calculate_with_default_inputs,
+    RefData,
+    make_entries,
+    select_paths,
+)
+from climatevision.tracing import with_tracing, dump_with_tracing
+from climatevision.tracing.dependencies import dependency_index
 
 
-def json_to_output(json_object: Any, args: Any):
-    """Write json_object to stdout or a file depending on args"""
+def json_to_output(f: Callable[[RefData], object], rd: RefData, args: Any, trace: bool):
+    """Write the JSON of f(rd) to stdout or a file depending on args.
+
+    f may return a Result, which is written without building its result dict.
+    """
+
+    def dump(fp: Any):
+        dump_with_tracing(
+            enabled=trace,
+            rd=rd,
+            f=f,
+            fp=fp,
+            indent=None if args.compact else 4,
+            compact=args.compact,
+            dag=args.dag,
+        )
+
     if args.o is not None:
         with open(args.o, mode="w") as fp:
-            json.dump(json_object, indent=4, fp=fp)
+            dump(fp)
     else:
-        json.dump(json_object, indent=4, fp=sys.stdout)
+        dump(sys.stdout)
 
 
 def cmd_run(args: Any):
+    if args.timings:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        instrumentation.register(instrumentation.LoggingHook(level=logging.INFO))
+    rd = RefData.load()
+    if args.paths is None:
+        json_to_output(
+            lambda rd: calculate_with_default_inputs(
+                ags=args.ags, year=int(args.year), refdata=rd
+            ),
+            rd,
+            args,
+            trace=args.trace,
+        )
+        return
+    # The traces of the selected paths refer to names anywhere in the result.
     d = with_tracing(
         enabled=args.trace,
-        f=lambda: calculate_with_default_inputs(
-            ags=args.ags, year=int(args.year)
-        ).result_dict(),
+        rd=rd,
+        f=lambda rd: calculate_with_default_inputs(
+            ags=args.ags, year=int(args.year), paths=args.paths, refdata=rd
+        ),
     )
-    json_to_output(d, args)
+    d = select_paths(d, args.paths)
+    json_to_output(lambda _: d, rd, args, trace=False)
 
 
 def cmd_make_entries(args: Any):
     rd = RefData.load()
-    e = with_tracing(
-        enabled=args.trace, f=lambda: asdict(make_entries(rd, args.ags, int(args.year)))
+    json_to_output(
+        lambda rd: asdict(make_entries(rd, args.ags, int(args.year))),
+        rd,
+        args,
+        trace=args.trace,
     )
-    json_to_output(e, args)
+
+
+def cmd_dependents(args: Any):
+    rd = RefData.load()
+    index = dependency_index(rd, args.ags, int(args.year))
+    if args.used_by is not None:
+        with open(args.used_by) as fp:
+            index = index.restricted_to(json.load(fp)["generator"])
+    dependents = index.query(args.names)
+    if args.o is not None:
+        with open(args.o, mode="w") as fp:
+            json.dump(dependents, fp, indent=4)
+    else:
+        json.dump(dependents, sys.stdout, indent=4)
@@ -2,7 +2,7 @@
 
 from typing import Any
 
-from commands.cmd_run import cmd_run, cmd_make_entries
+from commands.cmd_run import cmd_run, cmd_make_entries, cmd_dependents
 
 
 def add_cmd_run_parser(subcmd_parsers: Any):
@@ -11,6 +11,25 @@ def add_cmd_run_parser(subcmd_parsers: Any):
     cmd_run_parser.add_argument("-year", default=2035)
     cmd_run_parser.add_argument("-o", default=None)
     cmd_run_parser.add_argument("-trace", action="store_true")
+    cmd_run_parser.add_argument(
+        "-timings",
+        action="store_true",
+        help="Log the time spent in every sector to stderr",
+    )
+    cmd_run_parser.add_argument(
+        "-compact", action="store_true", help="Write the JSON without whitespace"
+    )
+    cmd_run_parser.add_argument(
+        "-dag",
+        action="store_true",
+        help="With -trace write the traces as one list of shared nodes",
+    )
+    cmd_run_parser.add_argument(
+        "-paths",
+        nargs="+",
+        default=None,
+        help="Only calculate and output these result paths (e.g. bisko.* r18.r.CO2e_total)",
+    )
     cmd_run_parser.set_defaults(func=cmd_run)
 
 
@@ -20,4 +39,31 @@ def add_cmd_make_entries_parser(subcmd_parsers: Any):
     cmd_make_entries_parser.add_argument("-year", default=2035)
     cmd_make_entries_parser.add_argument("-o", default=None)
     cmd_make_entries_parser.add_argument("-trace", action="store_true")
+    cmd_make_entries_parser.add_argument(
+        "-compact", action="store_true", help="Write the JSON without whitespace"
+    )
+    cmd_make_entries_parser.add_argument(
+        "-dag",
+        action="store_true",
+        help="With -trace write the traces as one list of shared nodes",
+    )
     cmd_make_entries_parser.set_defaults(func=cmd_make_entries)
+
+
+def add_cmd_dependents_parser(subcmd_parsers: Any):
+    cmd_dependents_parser = subcmd_parsers.add_parser(
+        "dependents",
+        help="List the result paths that depend on facts, assumptions or entries",
+    )
+    cmd_dependents_parser.add_argument(
+        "names", nargs="+", help="e.g. Fact_M_cost_per_CO2e_2020 or r_gas_fec"
+    )
+    cmd_dependents_parser.add_argument("-ags", default="03159016")
+    cmd_dependents_parser.add_argument("-year", default=2035)
+    cmd_dependents_parser.add_argument("-o", default=None)
+    cmd_dependents_parser.add_argument(
+        "-used_by",
+        default=None,
+        help="Only list the paths used by a consumer (e.g. tests/usage.json)",
+    )
+    cmd_dependents_parser.set_defaults(func=cmd_dependents)
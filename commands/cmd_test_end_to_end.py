@@ -1,17 +1,33 @@
 # pyright: strict
 
 from dataclasses import asdict
-from typing import Iterator, Any
+from typing import Callable, Iterator, Any
 import json
+import multiprocessing
 import sys
 import os
 import os.path
 import re
 
-from climatevision.generator import calculate_with_default_inputs, make_entries, RefData
+from climatevision.generator import (
+    calculate,
+    calculate_with_default_inputs,
+    diffs,
+    make_entries,
+    resultvector,
+    Inputs,
+    RefData,
+)
+from climatevision.generator.goldenstore import GoldenStore
 
 test_dir = os.path.join("tests", "end_to_end_expected")
 
+# Where update_golden writes the golden store and check_golden reads it from.
+default_golden_store = os.path.join(test_dir, "golden.npz")
+
+# The years of the golden store (the extreme years and the default one).
+default_golden_years = [2021, 2035, 2050]
+
 
 def json_to_output_file(json_object: Any, file_path: str):
     """Write json_object to a file"""
@@ -61,18 +77,286 @@ def cmd_test_end_to_end_create_expectation(args: Any):
     update_expectation(args.ags, int(args.year), filepath)
 
 
+# The reference data used by the workers of run_all_ags. It is loaded in the
+# parent before the pool is created, so forked workers share it (copy on write).
+_run_all_ags_refdata: RefData | None = None
+
+# The golden store the workers of check_golden compare with (see
+# _run_all_ags_init_worker).
+_golden_store: GoldenStore | None = None
+
+
+def _run_all_ags_init_worker(golden_store: GoldenStore | None):
+    global _run_all_ags_refdata, _golden_store
+    if _run_all_ags_refdata is None:
+        # Only happens when the workers are spawned instead of forked.
+        _run_all_ags_refdata = RefData.load()
+    _golden_store = golden_store
+
+
+def _run_all_ags_result_dict(ags: str, year: int) -> dict[str, Any]:
+    rd = _run_all_ags_refdata
+    assert rd is not None
+    entries = make_entries(rd, ags=ags, year=year)
+    inputs = Inputs(facts_and_assumptions=rd.facts_and_assumptions(), entries=entries)
+    return calculate(inputs).result_dict()
+
+
+def _run_all_ags_calculate(job: tuple[str, int]) -> tuple[str, str | None, str | None]:
+    """Returns (ags, result as json, error)."""
+    (ags, year) = job
+    try:
+        result = _run_all_ags_result_dict(ags, year)
+        return (ags, json.dumps({"ags": ags, "result": result}), None)
+    except Exception as e:
+        return (ags, None, repr(e))
+
+
+def _run_all_ags_pool(jobs: str | None, golden_store: GoldenStore | None = None) -> Any:
+    """A pool of worker processes that share _run_all_ags_refdata (which must be
+    loaded before).
+
+    The golden store is passed to the initializer of the workers, which forked
+    workers share with the parent and spawned ones get a copy of.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("fork")
+    else:
+        ctx = multiprocessing.get_context()
+    return ctx.Pool(
+        processes=int(jobs) if jobs is not None else None,
+        initializer=_run_all_ags_init_worker,
+        initargs=(golden_store,),
+    )
+
+
+def _recover_lines(fname: str, key: Callable[[bytes], str]) -> list[str]:
+    """The keys of the complete lines of fname (in order).
+
+    A partly written last line (the run was interrupted while writing it) is cut off.
+    """
+    if not os.path.exists(fname):
+        return []
+    keys: list[str] = []
+    size = 0
+    with open(fname, "rb") as fp:
+        for line in fp:
+            if not line.endswith(b"\n"):
+                break
+            keys.append(key(line))
+            size += len(line)
+    os.truncate(fname, size)
+    return keys
+
+
+def _ags_of_result_line(line: bytes) -> str:
+    m = re.match(rb'\{"ags": "([^"]*)"', line)
+    assert m is not None, f"Not a result line: {line[:40]!r}"
+    return m.group(1).decode()
+
+
+def _ags_of_error_line(line: bytes) -> str:
+    return line.split(b"\t", maxsplit=1)[0].decode()
+
+
+def _recover_run_all_ags(outdir: str) -> set[str]:
+    """The AGS that an earlier (maybe interrupted) run into outdir already did.
+
+    results.jsonl and errors.txt are flushed before the checkpoint, so they are
+    the truth: Partly written lines are cut off and the checkpoint is written
+    again from their complete lines.
+    """
+    good = _recover_lines(os.path.join(outdir, "results.jsonl"), _ags_of_result_line)
+    failed = _recover_lines(os.path.join(outdir, "errors.txt"), _ags_of_error_line)
+    done = set(good)
+    with open(os.path.join(outdir, "checkpoint.txt"), "w") as fp:
+        for ags in dict.fromkeys(good):
+            fp.write(f"{ags}\tOK\n")
+        for ags in dict.fromkeys(failed):
+            if ags not in done:
+                fp.write(f"{ags}\tERROR\n")
+    return done | set(failed)
+
+
 def cmd_test_end_to_end_run_all_ags(args: Any):
-    data = RefData.load()
+    """Run the generator for all AGS in a pool of worker processes.
+
+    Everything is written to the directory given by -o:
+        results.jsonl   one line {"ags": ..., "result": ...} per successful AGS
+        errors.txt      one line ags<TAB>repr(exception) per failed AGS
+        checkpoint.txt  one line ags<TAB>OK|ERROR per finished AGS
+
+    When the directory already contains results or errors, those AGS are
+    skipped, so an interrupted run can just be started again (see
+    _recover_run_all_ags).
+    """
+    global _run_all_ags_refdata
+    year = int(args.year)
+    outdir = args.o if args.o is not None else f"run_all_ags_{year}"
+    os.makedirs(outdir, exist_ok=True)
+    checkpoint_fname = os.path.join(outdir, "checkpoint.txt")
+    if args.restart:
+        for fname in ["results.jsonl", "errors.txt", "checkpoint.txt"]:
+            if os.path.exists(os.path.join(outdir, fname)):
+                os.remove(os.path.join(outdir, fname))
+    done = _recover_run_all_ags(outdir)
+
+    _run_all_ags_refdata = RefData.load()
+    todo = [
+        (ags, year)
+        for ags in _run_all_ags_refdata.ags_master().keys()
+        if ags not in done
+    ]
+    print(f"{len(done)} AGS already done, {len(todo)} to go", file=sys.stderr)
+
     good = 0
     errors = 0
-    with open("test_errors.txt", "w") as error_file:
-        for ags in list(data.ags_master().keys()):
-            try:
-                calculate_with_default_inputs(ags=ags, year=int(args.year))
+    with open(os.path.join(outdir, "results.jsonl"), "a") as results_file, open(
+        os.path.join(outdir, "errors.txt"), "a"
+    ) as error_file, open(checkpoint_fname, "a") as checkpoint_file, _run_all_ags_pool(
+        args.jobs
+    ) as pool:
+        for (ags, result, error) in pool.imap_unordered(
+            _run_all_ags_calculate, todo, chunksize=4
+        ):
+            if result is not None:
                 good = good + 1
-            except Exception as e:
+                results_file.write(result + "\n")
+                results_file.flush()
+                checkpoint_file.write(f"{ags}\tOK\n")
+            else:
                 errors = errors + 1
-                print(ags, repr(e), sep="\t", file=error_file)
-                sys.stdout.write(ags + ": " + repr(e) + "\n")
+                print(ags, error, sep="\t", file=error_file)
+                error_file.flush()
+                checkpoint_file.write(f"{ags}\tERROR\n")
+                sys.stdout.write(f"{ags}: {error}\n")
+            # Only checkpoint an AGS once its result or error is on disk.
+            checkpoint_file.flush()
+            sys.stdout.write(f"OK {good:>5}    ERROR {errors:>5}\n")
+
+
+# The ids of the schemas whose paths this worker already sent (see _golden_calculate).
+_golden_schemas_sent: set[str] = set()
+
+
+def _golden_calculate(
+    job: tuple[str, int]
+) -> tuple[str, int, bytes | None, tuple[str, ...] | None, str]:
+    """Returns (ags, year, result vector as bytes, paths, error).
+
+    The paths of a schema are only sent with the first result of that schema
+    this worker sends.
+    """
+    (ags, year) = job
+    try:
+        result = _run_all_ags_result_dict(ags, year)
+        (schema, vector) = resultvector.vector_of_result_dict(result)
+        paths = None
+        if schema.id not in _golden_schemas_sent:
+            _golden_schemas_sent.add(schema.id)
+            paths = schema.paths
+        return (ags, year, resultvector.pack(schema, vector), paths, "")
+    except Exception as e:
+        return (ags, year, None, None, repr(e))
+
 
-            sys.stdout.write(f"OK {good:>5}    ERROR {errors:>5}\n\n")
+def update_golden(
+    rd: RefData, years: list[int], jobs: str | None = None
+) -> GoldenStore:
+    """Calculate all AGS for the given years in a pool of worker processes.
+
+    See GoldenStore.of_rows for which schema the store gets.
+    """
+    global _run_all_ags_refdata
+    _run_all_ags_refdata = rd
+    todo = [(ags, year) for ags in rd.ags_master().keys() for year in years]
+    schemas: dict[str, resultvector.Schema] = {}
+    packed_rows: list[tuple[str, int, bytes | None, str]] = []
+    with _run_all_ags_pool(jobs) as pool:
+        for (ags, year, packed, paths, error) in pool.imap_unordered(
+            _golden_calculate, todo, chunksize=4
+        ):
+            if paths is not None:
+                schema = resultvector.Schema(paths=paths)
+                schemas[schema.id] = schema
+            packed_rows.append((ags, year, packed, error))
+            if len(packed_rows) % 100 == 0:
+                print(f"{len(packed_rows)} of {len(todo)} done", file=sys.stderr)
+    rows: list[
+        tuple[str, int, tuple[resultvector.Schema, resultvector.Vector] | None, str]
+    ] = []
+    for (ags, year, packed, error) in packed_rows:
+        shaped = None
+        if packed is not None:
+            (schema_id, vector) = resultvector.unpack(packed)
+            shaped = (schemas[schema_id], vector)
+        rows.append((ags, year, shaped, error))
+    return GoldenStore.of_rows(rows, data_version=rd.version())
+
+
+def _golden_check(job: tuple[str, int]) -> tuple[str, int, list[str]]:
+    """Returns (ags, year, description of the regressions)."""
+    (ags, year) = job
+    store = _golden_store
+    assert store is not None
+    row = store.row(ags, year)
+    expected_error = store.errors[row]
+    try:
+        result = _run_all_ags_result_dict(ags, year)
+        error = ""
+    except Exception as e:
+        (result, error) = (None, repr(e))
+    if error != expected_error:
+        return (ags, year, [f"expected error {expected_error!r} got {error!r}"])
+    elif result is None:
+        return (ags, year, [])
+    (expected_schema, expected) = store.result_vector(row)
+    (schema, vector) = resultvector.vector_of_result_dict(result)
+    if schema.id != expected_schema.id:
+        report = diffs.compare(
+            actual=result, expected=expected_schema.result_dict(expected), top=10
+        )
+    else:
+        report = diffs.compare_vectors(schema, vector, expected, top=10)
+    return (ags, year, [str(d) for d in report.top])
+
+
+def check_golden(
+    rd: RefData, store: GoldenStore, jobs: str | None = None
+) -> list[tuple[str, int, list[str]]]:
+    """Calculate all (ags, year) of the store in a pool of worker processes and
+    return those whose result (or error) differs with the (first) differences."""
+    global _run_all_ags_refdata
+    _run_all_ags_refdata = rd
+    if store.data_version is not None and store.data_version != rd.version():
+        print(
+            f"The golden store was made with the reference data {store.data_version}",
+            file=sys.stderr,
+        )
+    regressions: list[tuple[str, int, list[str]]] = []
+    with _run_all_ags_pool(jobs, golden_store=store) as pool:
+        for (ags, year, differences) in pool.imap_unordered(
+            _golden_check, store.keys, chunksize=4
+        ):
+            if differences:
+                regressions.append((ags, year, differences))
+    return sorted(regressions)
+
+
+def cmd_test_end_to_end_update_golden(args: Any):
+    rd = RefData.load()
+    store = update_golden(rd, [int(y) for y in args.years], jobs=args.jobs)
+    store.save(args.o)
+    print(f"Wrote {len(store.keys)} results to {args.o}")
+
+
+def cmd_test_end_to_end_check_golden(args: Any):
+    rd = RefData.load()
+    store = GoldenStore.load(args.store)
+    regressions = check_golden(rd, store, jobs=args.jobs)
+    for (ags, year, differences) in regressions:
+        for d in differences:
+            print(ags, year, d)
+    print(f"{len(regressions)} of {len(store.keys)} results differ")
+    if regressions:
+        sys.exit(1)
@@ -6,6 +6,10 @@ from commands.cmd_test_end_to_end import (
     cmd_test_end_to_end_update_expectations,
     cmd_test_end_to_end_create_expectation,
     cmd_test_end_to_end_run_all_ags,
+    cmd_test_end_to_end_update_golden,
+    cmd_test_end_to_end_check_golden,
+    default_golden_store,
+    default_golden_years,
 )
 
 
@@ -42,6 +46,50 @@ def add_cmd_test_end_to_end_parser(subcmd_parsers: Any):
         help="Runs the generator for all ags.",
     )
     cmd_test_end_to_end_run_all_ags_parser.add_argument("-year", default=2035)
+    cmd_test_end_to_end_run_all_ags_parser.add_argument(
+        "-jobs", default=None, help="Number of worker processes (default: all cores)"
+    )
+    cmd_test_end_to_end_run_all_ags_parser.add_argument(
+        "-o",
+        default=None,
+        help="Output directory, also used to resume (default: run_all_ags_<year>)",
+    )
+    cmd_test_end_to_end_run_all_ags_parser.add_argument(
+        "-restart",
+        action="store_true",
+        help="Forget the results of a previous run in the output directory",
+    )
     cmd_test_end_to_end_run_all_ags_parser.set_defaults(
         func=cmd_test_end_to_end_run_all_ags
     )
+
+    cmd_test_end_to_end_update_golden_parser = subcmd_test_end_to_end.add_parser(
+        "update_golden",
+        help="Calculate all ags for a few years and store the results.",
+    )
+    cmd_test_end_to_end_update_golden_parser.add_argument(
+        "-years", nargs="+", default=default_golden_years
+    )
+    cmd_test_end_to_end_update_golden_parser.add_argument(
+        "-jobs", default=None, help="Number of worker processes (default: all cores)"
+    )
+    cmd_test_end_to_end_update_golden_parser.add_argument(
+        "-o", default=default_golden_store
+    )
+    cmd_test_end_to_end_update_golden_parser.set_defaults(
+        func=cmd_test_end_to_end_update_golden
+    )
+
+    cmd_test_end_to_end_check_golden_parser = subcmd_test_end_to_end.add_parser(
+        "check_golden",
+        help="Calculate all results of the golden store again and compare them.",
+    )
+    cmd_test_end_to_end_check_golden_parser.add_argument(
+        "-jobs", default=None, help="Number of worker processes (default: all cores)"
+    )
+    cmd_test_end_to_end_check_golden_parser.add_argument(
+        "-store", default=default_golden_store
+    )
+    cmd_test_end_to_end_check_golden_parser.set_defaults(
+        func=cmd_test_end_to_end_check_golden
+    )
@@ -17,11 +17,16 @@ from typing import Any
 import argparse
 import sys
 
-from commands.cmd_run_parser import add_cmd_make_entries_parser, add_cmd_run_parser
-from commands.cmd_explorer_parser import add_cmd_explorer_parser
+from commands.cmd_run_parser import (
+    add_cmd_dependents_parser,
+    add_cmd_make_entries_parser,
+    add_cmd_run_parser,
+)
+from commands.cmd_explorer_parser import add_cmd_explorer_parser, add_cmd_serve_parser
 from commands.cmd_ready_to_rock_parser import add_cmd_ready_to_rock_parser
 from commands.cmd_data_parser import add_cmd_data_parser
 from commands.cmd_test_end_to_end_parser import add_cmd_test_end_to_end_parser
+from commands.cmd_bench_parser import add_cmd_bench_parser
 
 
 class Devtool:
@@ -34,10 +39,13 @@ class Devtool:
 
         add_cmd_run_parser(subcmd_parsers)
         add_cmd_make_entries_parser(subcmd_parsers)
+        add_cmd_dependents_parser(subcmd_parsers)
         add_cmd_explorer_parser(subcmd_parsers)
+        add_cmd_serve_parser(subcmd_parsers)
         add_cmd_ready_to_rock_parser(subcmd_parsers)
         add_cmd_data_parser(subcmd_parsers)
         add_cmd_test_end_to_end_parser(subcmd_parsers)
+        add_cmd_bench_parser(subcmd_parsers)
 
         return self.parser.parse_args(args)
 
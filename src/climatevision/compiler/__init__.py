@@ -0,0 +1,5 @@
+"""Compile the generator into straight-line code (see codegen.py)."""
+
+from .codegen import CompiledGenerator
+
+__all__ = ["CompiledGenerator"]
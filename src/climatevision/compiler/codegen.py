@@ -0,0 +1,183 @@
+# pyright: strict
+
+"""Turn the formulas of a generator run into a straight-line python function."""
+
+from dataclasses import Field, fields
+from math import isfinite, isnan
+from typing import Any, Callable
+
+from ..generator import Entries, Inputs, calculate
+from ..generator import utils
+from ..generator.utils import uniform
+from ..generator.refdata import FactsAndAssumptions
+from .formula import Formula, Formulas
+
+ResultDict = dict[str, Any]
+
+_BINARY = ["+", "-", "*", "/", "<", "<=", ">", ">=", "==", "!="]
+_HELPERS = ["div", "maximum", "minimum", "where"]
+
+# The string entries only matter for the code path the calculation takes.
+# For the AGS only whether it is Germany or not selects a code path.
+_AGS_ENTRIES = ["ags", "m_AGS_com", "m_AGS_dis", "m_AGS_sta"]
+
+
+def shape(entries: Entries) -> tuple[object, ...]:
+    """All entries with the same shape share one compiled function."""
+    key: list[object] = [uniform(entries.m_AGS_com == "DG000000")]
+    for f in fields(entries):
+        if _is_str(f) and f.name not in _AGS_ENTRIES:
+            v = getattr(entries, f.name)
+            if not isinstance(v, str) and len(set(v.tolist())) > 1:
+                raise ValueError(f"{f.name} is not the same for all AGS of the batch")
+            key.append(_first(v))
+    return tuple(key)
+
+
+def _is_str(f: "Field[Any]") -> bool:
+    return f.type in (str, "str")
+
+
+def _first(v: Any) -> Any:
+    """The value for the first AGS if the entries were stacked (see batch.py).
+
+    The code path does not depend on the AGS (otherwise uniform raises).
+    """
+    return v if isinstance(v, str) else v[0].item()
+
+
+def _literal(v: Any) -> str:
+    if isinstance(v, float) and not isfinite(v):
+        return "nan" if isnan(v) else ("inf" if v > 0 else "(-inf)")
+    s = repr(v)
+    return f"({s})" if s.startswith("-") else s
+
+
+class _Emitter:
+    lines: list[str]
+    _emitted: set[int]
+
+    def __init__(self):
+        self.lines = []
+        self._emitted = set()
+
+    def arg(self, a: Any) -> str:
+        if isinstance(a, Formula):
+            self.formula(a)
+            return f"v{a.ndx}"
+        else:
+            return _literal(a)
+
+    def formula(self, f: Formula):
+        # Iterative (rather than recursive) as formulas can get very deep.
+        todo: list[tuple[Formula, bool]] = [(f, False)]
+        while todo:
+            (f, args_done) = todo.pop()
+            if f.ndx in self._emitted:
+                continue
+            if not args_done:
+                todo.append((f, True))
+                todo.extend(
+                    (a, False)
+                    for a in reversed(f.args)
+                    if isinstance(a, Formula) and a.ndx not in self._emitted
+                )
+                continue
+            self._emitted.add(f.ndx)
+            args = [self.arg(a) for a in f.args]
+            if f.op == "input":
+                expr = f"e.{f.args[0]}"
+            elif f.op == "neg":
+                expr = f"-{args[0]}"
+            elif f.op in _BINARY:
+                expr = f"{args[0]} {f.op} {args[1]}"
+            elif f.op in _HELPERS:
+                expr = f"_{f.op}({', '.join(args)})"
+            else:
+                assert False, f"Unknown operation {f.op}"
+            self.lines.append(f"    v{f.ndx} = {expr}")
+
+    def value(self, v: Any) -> str:
+        if isinstance(v, dict):
+            items = [f"{k!r}: {self.value(x)}" for (k, x) in v.items()]  # type: ignore
+            return "{" + ", ".join(items) + "}"
+        else:
+            return self.arg(v)
+
+
+def source_of_result_dict(result_dict: ResultDict) -> str:
+    """The source of a function evaluate(e) that returns the result dict for entries e."""
+    emitter = _Emitter()
+    result = emitter.value(result_dict)
+    return "\n".join(["def evaluate(e):", *emitter.lines, f"    return {result}", ""])
+
+
+def trace_result_dict(
+    facts_and_assumptions: FactsAndAssumptions, entries: Entries
+) -> ResultDict:
+    """Run the generator with a formula for every numeric entry.
+
+    The str entries are taken from entries (they select the code path).
+    """
+    table = Formulas()
+    symbolic: dict[str, Any] = {}
+    for f in fields(entries):
+        if _is_str(f):
+            symbolic[f.name] = _first(getattr(entries, f.name))
+        else:
+            symbolic[f.name] = table.input(f.name)
+    inputs = Inputs(
+        facts_and_assumptions=facts_and_assumptions, entries=Entries(**symbolic)
+    )
+    return calculate(inputs).result_dict()
+
+
+def compile_result_dict(
+    facts_and_assumptions: FactsAndAssumptions, entries: Entries
+) -> tuple[Callable[[Entries], ResultDict], str]:
+    """Compile the calculation for all entries with the same shape as entries.
+
+    Returns the function and its source.
+    """
+    source = source_of_result_dict(trace_result_dict(facts_and_assumptions, entries))
+    namespace: dict[str, Any] = {
+        "_div": utils.div,
+        "_maximum": utils.maximum,
+        "_minimum": utils.minimum,
+        "_where": utils.where,
+        "nan": float("nan"),
+        "inf": float("inf"),
+    }
+    code = compile(source, f"<compiled generator {shape(entries)}>", "exec")
+    exec(code, namespace)
+    return (namespace["evaluate"], source)
+
+
+class CompiledGenerator:
+    """Calculates result dicts with functions compiled from the formulas of the
+    generator. There is one function per shape of the entries, each compiled on
+    first use.
+
+    The functions only depend on the numbers in the entries, so (unlike
+    calculate) they also work with numpy arrays as entries (see batch.py).
+    Note that the asserts of the generator are not checked.
+    """
+
+    facts_and_assumptions: FactsAndAssumptions
+    _compiled: dict[tuple[object, ...], Callable[[Entries], ResultDict]]
+
+    def __init__(self, facts_and_assumptions: FactsAndAssumptions):
+        self.facts_and_assumptions = facts_and_assumptions
+        self._compiled = {}
+
+    def function_for(self, entries: Entries) -> Callable[[Entries], ResultDict]:
+        key = shape(entries)
+        f = self._compiled.get(key)
+        if f is None:
+            (f, _) = compile_result_dict(self.facts_and_assumptions, entries)
+            self._compiled[key] = f
+        return f
+
+    def result_dict(self, entries: Entries) -> ResultDict:
+        """The same as calculate(...).result_dict() for these entries."""
+        return self.function_for(entries)(entries)
@@ -0,0 +1,138 @@
+# pyright: strict
+
+"""Formulas are numbers that record how they were computed.
+
+In contrast to tracing.number.TracedNumber a Formula does not know its value.
+It only knows the operation and the arguments it was computed from. Running
+the generator with formulas instead of the numeric entries therefore gives us
+all formulas from the entries to every value in Result.
+
+Facts and assumptions are ordinary numbers during that run, so everything
+that only depends on them is computed right away (constant folding). All
+formulas live in a Formulas table which returns the same Formula for the
+same operation on the same arguments (common subexpression elimination).
+"""
+
+from typing import Any, Union
+
+from ..generator.utils import Symbolic
+
+# What can be an argument of an operation.
+Arg = Union["Formula", int, float]
+
+
+class Formula(Symbolic):
+    __slots__ = ["table", "ndx", "op", "args"]
+
+    table: "Formulas"
+    # Index into table.formulas, the formulas are in the order they were created.
+    ndx: int
+    # "input", one of the python operators "+", "-", "*", "/", "neg", "<", ...
+    # or the name of a helper in utils ("div", "maximum", "minimum", "where").
+    op: str
+    # For "input" this is the name of the entry.
+    args: tuple[Any, ...]
+
+    def __init__(self, table: "Formulas", ndx: int, op: str, args: tuple[Any, ...]):
+        self.table = table
+        self.ndx = ndx
+        self.op = op
+        self.args = args
+
+    def apply(self, op: str, *args: Any) -> "Formula":
+        return self.table.make(op, *args)
+
+    def __add__(self, other: Arg) -> "Formula":
+        return self.table.make("+", self, other)
+
+    def __radd__(self, other: Arg) -> "Formula":
+        return self.table.make("+", other, self)
+
+    def __sub__(self, other: Arg) -> "Formula":
+        return self.table.make("-", self, other)
+
+    def __rsub__(self, other: Arg) -> "Formula":
+        return self.table.make("-", other, self)
+
+    def __mul__(self, other: Arg) -> "Formula":
+        return self.table.make("*", self, other)
+
+    def __rmul__(self, other: Arg) -> "Formula":
+        return self.table.make("*", other, self)
+
+    def __truediv__(self, other: Arg) -> "Formula":
+        return self.table.make("/", self, other)
+
+    def __rtruediv__(self, other: Arg) -> "Formula":
+        return self.table.make("/", other, self)
+
+    def __neg__(self) -> "Formula":
+        return self.table.make("neg", self)
+
+    def __lt__(self, other: Arg) -> "Formula":  # type: ignore
+        return self.table.make("<", self, other)
+
+    def __le__(self, other: Arg) -> "Formula":  # type: ignore
+        return self.table.make("<=", self, other)
+
+    def __gt__(self, other: Arg) -> "Formula":  # type: ignore
+        return self.table.make(">", self, other)
+
+    def __ge__(self, other: Arg) -> "Formula":  # type: ignore
+        return self.table.make(">=", self, other)
+
+    def __eq__(self, other: object) -> "Formula":  # type: ignore
+        return self.table.make("==", self, other)
+
+    def __ne__(self, other: object) -> "Formula":  # type: ignore
+        return self.table.make("!=", self, other)
+
+    __hash__ = object.__hash__
+
+    # Formulas are immutable and must stay in their table (dataclasses.asdict
+    # in Result.result_dict deep copies all values).
+    def __copy__(self) -> "Formula":
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> "Formula":
+        return self
+
+    def __bool__(self) -> bool:
+        raise TypeError(
+            "A formula can not be used as a condition, use utils.where instead"
+        )
+
+    def __float__(self) -> float:
+        raise TypeError("A formula has no value")
+
+    def __repr__(self) -> str:
+        return f"Formula({self.ndx}, {self.op}, {self.args})"
+
+
+def _key(arg: Any) -> Any:
+    if isinstance(arg, Formula):
+        return ("f", arg.ndx)
+    else:
+        # Keep 0 and 0.0 (and -0.0) apart.
+        return (type(arg), repr(arg))
+
+
+class Formulas:
+    formulas: list[Formula]
+    _by_key: dict[tuple[Any, ...], Formula]
+
+    def __init__(self):
+        self.formulas = []
+        self._by_key = {}
+
+    def make(self, op: str, *args: Any) -> Formula:
+        key = (op, *(_key(a) for a in args))
+        f = self._by_key.get(key)
+        if f is None:
+            f = Formula(self, len(self.formulas), op, args)
+            self.formulas.append(f)
+            self._by_key[key] = f
+        return f
+
+    def input(self, name: str) -> Formula:
+        return self.make("input", name)
@@ -6,7 +6,13 @@ from . import ags
 from .refdata import RefData
 from .makeentries import make_entries, Entries
 from .inputs import Inputs
-from .generator import calculate, calculate_with_default_inputs, Result
+from .generator import (
+    calculate,
+    calculate_with_default_inputs,
+    sectors_of_paths,
+    select_paths,
+    Result,
+)
 
 __all__ = [
     "ags",
@@ -16,5 +22,7 @@ __all__ = [
     "Inputs",
     "calculate",
     "calculate_with_default_inputs",
+    "sectors_of_paths",
+    "select_paths",
     "Result",
 ]
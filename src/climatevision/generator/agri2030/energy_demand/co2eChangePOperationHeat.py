@@ -3,7 +3,7 @@
 from dataclasses import dataclass, InitVar
 
 from ...inputs import Inputs
-from ...utils import div
+from ...utils import div, maximum, minimum
 from ...agri2018.a18 import A18
 
 from .co2eChangeEnergy import CO2eChangeEnergy
@@ -99,11 +99,11 @@ class CO2eChangePOperationHeat(CO2eChangeEnergy):
         )
         self.demand_heatpump = self.demand_heat_rehab
         self.demand_emplo = div(self.cost_wage, self.ratio_wage_to_emplo)
-        self.demand_emplo_new = max(0, self.demand_emplo - self.emplo_existing)
+        self.demand_emplo_new = maximum(0, self.demand_emplo - self.emplo_existing)
 
         self.energy = self.demand_heat_nonrehab + self.demand_heat_rehab
 
-        self.demand_biomass = min(
+        self.demand_biomass = minimum(
             a18.s_biomass.energy, self.energy - self.demand_heatpump
         )
         self.demand_emethan = self.energy - self.demand_biomass - self.demand_heatpump
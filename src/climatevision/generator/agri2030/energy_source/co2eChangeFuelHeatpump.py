@@ -2,7 +2,7 @@
 from dataclasses import dataclass, InitVar
 
 from ...inputs import Inputs
-from ...utils import div, MILLION
+from ...utils import div, maximum, MILLION
 from ...agri2018.a18 import A18
 
 from .co2eChangeEnergyPerMWh import CO2eChangeEnergyPerMWh
@@ -39,7 +39,7 @@ class CO2eChangeFuelHeatpump(CO2eChangeEnergyPerMWh):
 
         self.full_load_hour = inputs.fact("Fact_B_S_full_usage_hours_buildings")
         self.power_installed = div(getattr(a18, what).energy, self.full_load_hour)
-        self.power_to_be_installed = max(
+        self.power_to_be_installed = maximum(
             div(self.energy, self.full_load_hour) - self.power_installed, 0
         )
 
@@ -63,7 +63,7 @@ class CO2eChangeFuelHeatpump(CO2eChangeEnergyPerMWh):
             * inputs.ass("Ass_B_D_install_heating_emplo_pct_of_A_heatpump")
         )
 
-        self.demand_emplo_new = max(0, self.demand_emplo - self.emplo_existing)
+        self.demand_emplo_new = maximum(0, self.demand_emplo - self.emplo_existing)
 
         parent = CO2eChangeEnergyPerMWh(
             inputs=inputs,
@@ -0,0 +1,151 @@
+"""Calculate the results for many AGS in one go.
+
+Instead of calling calculate once per AGS we stack the entries of many AGS
+into numpy arrays (one array per field of Entries) and run calculate once.
+Every float in the calculation then becomes an array with one value per
+AGS. The few places where the calculation branches on a value use the
+helpers in utils (div, maximum, minimum, where) which work element wise on
+arrays.
+
+Branches that select a different code path instead of a different value
+(the region types t_rt7 and t_rt3 and the special handling of DG000000 in
+electricity2030) can not be vectorized that way. So we first group the AGS by
+those and calculate every group on its own.
+
+A division by zero that would raise in a single calculation produces inf or
+nan for the affected AGS instead.
+"""
+
+# pyright: strict
+
+from collections import defaultdict
+from copy import copy
+from dataclasses import fields, is_dataclass
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+
+from .refdata import RefData, FactsAndAssumptions
+from .makeentries import make_entries, Entries
+from .inputs import Inputs
+from .generator import calculate, Result
+
+
+def stack_entries(entries: Sequence[Entries]) -> Entries:
+    """Combine the entries of several AGS into one Entries, whose fields are arrays.
+
+    str fields are only turned into arrays if they differ between the AGS.
+    """
+    stacked: dict[str, Any] = {}
+    for f in fields(Entries):
+        values = [getattr(e, f.name) for e in entries]
+        if all(isinstance(v, str) for v in values):
+            if all(v == values[0] for v in values):
+                stacked[f.name] = values[0]
+            else:
+                stacked[f.name] = np.array(values)
+        elif all(type(v) is int for v in values):
+            stacked[f.name] = np.array(values, dtype=np.int64)
+        else:
+            stacked[f.name] = np.array(values, dtype=np.float64)
+    return Entries(**stacked)
+
+
+def _pick(v: Any, ndx: int) -> Any:
+    if isinstance(v, np.ndarray):
+        return v[ndx].item()  # type: ignore
+    elif is_dataclass(v) and not isinstance(v, type):
+        # Not using dataclasses.replace as that would run __init__ again.
+        picked = copy(v)
+        for f in fields(v):
+            object.__setattr__(picked, f.name, _pick(getattr(v, f.name), ndx))
+        return picked
+    elif isinstance(v, list):
+        return [_pick(x, ndx) for x in v]  # type: ignore
+    elif isinstance(v, dict):
+        return {k: _pick(x, ndx) for (k, x) in v.items()}  # type: ignore
+    else:
+        return v
+
+
+def unstack_result(result: Result, count: int) -> list[Result]:
+    """Split the result of a calculation on stacked entries into one result per AGS."""
+    return [_pick(result, ndx) for ndx in range(count)]
+
+
+def _group_key(e: Entries) -> tuple[bool, str, str]:
+    return (e.m_AGS_com == "DG000000", e.t_rt7, e.t_rt3)
+
+
+def _groups(entries: Sequence[Entries]) -> list[list[int]]:
+    """The indexes of the entries that can be calculated together."""
+    groups: dict[tuple[bool, str, str], list[int]] = defaultdict(list)
+    for ndx, e in enumerate(entries):
+        groups[_group_key(e)].append(ndx)
+    return list(groups.values())
+
+
+def _calculate_group(
+    facts_and_assumptions: FactsAndAssumptions, entries: Sequence[Entries]
+) -> list[Result]:
+    """Calculate entries that all have the same group key."""
+    inputs = Inputs(
+        facts_and_assumptions=facts_and_assumptions,
+        entries=stack_entries(entries),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return unstack_result(calculate(inputs), len(entries))
+
+
+def calculate_batch(
+    facts_and_assumptions: FactsAndAssumptions, entries: Sequence[Entries]
+) -> list[Result]:
+    """Calculate the results for the given entries (in the same order)."""
+    results: list[Result | None] = [None] * len(entries)
+    for ndxs in _groups(entries):
+        group_results = _calculate_group(
+            facts_and_assumptions, [entries[ndx] for ndx in ndxs]
+        )
+        for ndx, result in zip(ndxs, group_results):
+            results[ndx] = result
+    return [r for r in results if r is not None]
+
+
+def calculate_all_ags(
+    refdata: RefData, *, year: int, agss: Iterable[str] | None = None
+) -> tuple[dict[str, Result], dict[str, Exception]]:
+    """Calculate the results for the given AGS (default: all AGS in the reference data).
+
+    Returns (results, errors). An AGS whose entries or calculation fail ends up
+    in errors and the other AGS are still calculated: When a group fails its AGS
+    are calculated one by one to find the ones that fail.
+    """
+    if agss is None:
+        agss = refdata.ags_master().keys()
+    facts_and_assumptions = refdata.facts_and_assumptions()
+    entries: dict[str, Entries] = {}
+    errors: dict[str, Exception] = {}
+    for ags in agss:
+        try:
+            entries[ags] = make_entries(refdata, ags, year)
+        except Exception as e:
+            errors[ags] = e
+
+    keys = list(entries.keys())
+    results: dict[str, Result] = {}
+    for ndxs in _groups(list(entries.values())):
+        group = [keys[ndx] for ndx in ndxs]
+        try:
+            group_results = _calculate_group(
+                facts_and_assumptions, [entries[ags] for ags in group]
+            )
+            results.update(zip(group, group_results))
+        except Exception:
+            for ags in group:
+                try:
+                    [results[ags]] = _calculate_group(
+                        facts_and_assumptions, [entries[ags]]
+                    )
+                except Exception as e:
+                    errors[ags] = e
+    return ({ags: results[ags] for ags in keys if ags in results}, errors)
@@ -6,7 +6,7 @@ https://localzero-generator.readthedocs.io/de/latest/sectors/hh_ghd.html
 # pyright: strict
 
 from ..inputs import Inputs
-from ..utils import div, MILLION
+from ..utils import div, where, maximum, minimum, MILLION
 from ..business2018.b18 import B18
 from ..residences2018.r18 import R18
 from ..residences2030.r30 import R30
@@ -78,7 +78,7 @@ def calc(
 
     # Calculation
     p_nonresi.rate_rehab_pa = entries.r_rehab_rate_pa
-    p_nonresi.pct_rehab = min(
+    p_nonresi.pct_rehab = minimum(
         1.0,
         fact("Fact_B_P_ratio_renovated_to_not_renovated_2021")
         + p_nonresi.rate_rehab_pa * entries.m_duration_target,
@@ -183,7 +183,7 @@ def calc(
         * 10000
     )
     s_solarth.power_to_be_installed_pct = entries.h_solartherm_to_be_inst
-    s_solarth.energy = max(
+    s_solarth.energy = maximum(
         div(
             b18.p_nonresi.area_m2, r18.p_buildings_total.area_m2 + b18.p_nonresi.area_m2
         )
@@ -192,7 +192,7 @@ def calc(
         b18.s_solarth.energy,
     )
 
-    s_heatpump.energy = min(
+    s_heatpump.energy = minimum(
         p_nonresi.demand_heat_rehab - s_solarth.energy,
         (
             b18.p_nonresi.energy
@@ -216,44 +216,44 @@ def calc(
         p_elec_elcon.demand_electricity + p_elec_heatpump.demand_electricity
     )
 
-    if (
+    s_biomass.energy = where(
         p_nonresi.energy - s_heatpump.energy - s_solarth.energy
-        < b18.s_biomass.energy + b18.s_heatnet.energy + b18.s_elec_heating.energy
-    ):
-        s_biomass.energy = b18.s_biomass.energy * div(
+        < b18.s_biomass.energy + b18.s_heatnet.energy + b18.s_elec_heating.energy,
+        b18.s_biomass.energy
+        * div(
             p_nonresi.energy - s_heatpump.energy - s_solarth.energy,
             b18.s_biomass.energy + b18.s_heatnet.energy + b18.s_elec_heating.energy,
-        )
-    else:
-        s_biomass.energy = b18.s_biomass.energy
+        ),
+        b18.s_biomass.energy,
+    )
 
-    if (
+    s_heatnet.energy = where(
         p_nonresi.energy - s_heatpump.energy - s_solarth.energy
-        < b18.s_biomass.energy + b18.s_heatnet.energy + b18.s_elec_heating.energy
-    ):
-        s_heatnet.energy = b18.s_heatnet.energy * div(
+        < b18.s_biomass.energy + b18.s_heatnet.energy + b18.s_elec_heating.energy,
+        b18.s_heatnet.energy
+        * div(
             p_nonresi.energy - s_heatpump.energy - s_solarth.energy,
             b18.s_biomass.energy + b18.s_heatnet.energy + b18.s_elec_heating.energy,
-        )
-    else:
-        s_heatnet.energy = b18.s_heatnet.energy
+        ),
+        b18.s_heatnet.energy,
+    )
 
-    if (
+    s_elec_heating.energy = where(
         p_nonresi.energy - s_heatpump.energy - s_solarth.energy
-        < b18.s_biomass.energy + b18.s_heatnet.energy + b18.s_elec_heating.energy
-    ):
-        s_elec_heating.energy = b18.s_elec_heating.energy * div(
+        < b18.s_biomass.energy + b18.s_heatnet.energy + b18.s_elec_heating.energy,
+        b18.s_elec_heating.energy
+        * div(
             p_nonresi.energy - s_heatpump.energy - s_solarth.energy,
             b18.s_biomass.energy + b18.s_heatnet.energy + b18.s_elec_heating.energy,
-        )
-    else:
-        s_elec_heating.energy = b18.s_elec_heating.energy
+        ),
+        b18.s_elec_heating.energy,
+    )
 
     p_nonresi.demand_electricity = s_elec_heating.energy
     p.demand_electricity = p_other.demand_electricity + p_nonresi.demand_electricity
     s_elec.energy = p.demand_electricity
 
-    s_emethan.energy = max(
+    s_emethan.energy = maximum(
         0,
         p_nonresi.energy
         - s_biomass.energy
@@ -571,7 +571,7 @@ def calc(
     s_gas.full_load_hour = fact("Fact_B_S_full_usage_hours_buildings")
     s_heatpump.full_load_hour = fact("Fact_B_S_full_usage_hours_buildings")
     s_heatpump.power_installed = div(b18.s_heatpump.energy, s_heatpump.full_load_hour)
-    s_heatpump.power_to_be_installed = max(
+    s_heatpump.power_to_be_installed = maximum(
         div(s_heatpump.energy, s_heatpump.full_load_hour) - s_heatpump.power_installed,
         0,
     )
@@ -668,7 +668,7 @@ def calc(
     p_nonresi.invest_com = p_nonresi_com.invest_com
     p.cost_wage = p_nonresi.cost_wage
     p.demand_emplo = p_nonresi.demand_emplo
-    p_nonresi.demand_emplo_new = max(
+    p_nonresi.demand_emplo_new = maximum(
         0, p_nonresi.demand_emplo - p_nonresi.emplo_existing
     )
     p.demand_heatnet = s_heatnet.energy
@@ -684,7 +684,7 @@ def calc(
     p.invest_com = p_nonresi.invest_com
     s.cost_wage = s_heatpump.cost_wage + s_solarth.cost_wage
     s.demand_emplo = s_heatpump.demand_emplo + s_solarth.demand_emplo
-    s_heatpump.demand_emplo_new = max(
+    s_heatpump.demand_emplo_new = maximum(
         0, s_heatpump.demand_emplo - s_heatpump.emplo_existing
     )
     p.invest_pa_com = p_nonresi.invest_pa_com
@@ -754,7 +754,7 @@ def calc(
     s_coal.change_CO2e_pct = div(s_coal.change_CO2e_t, b18.s_coal.CO2e_combustion_based)
     s_heatnet.CO2e_total = s_heatnet.CO2e_combustion_based
     s_heatpump.CO2e_total = s_heatpump.CO2e_combustion_based
-    s_solarth.demand_emplo_new = max(
+    s_solarth.demand_emplo_new = maximum(
         0, s_solarth.demand_emplo - s_solarth.emplo_existing
     )
     s_solarth.CO2e_total = s_solarth.CO2e_combustion_based
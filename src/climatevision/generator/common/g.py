@@ -3,7 +3,7 @@
 from dataclasses import dataclass
 
 from ..inputs import Inputs
-from ..utils import div
+from ..utils import div, maximum
 
 
 @dataclass(kw_only=True)
@@ -52,7 +52,7 @@ class GConsult(G):
         ratio_wage_to_emplo = fact("Fact_R_G_energy_consulting_cost_personel")
         demand_emplo = div(cost_wage, ratio_wage_to_emplo)
 
-        demand_emplo_new = max(0, demand_emplo - emplo_existing)
+        demand_emplo_new = maximum(0, demand_emplo - emplo_existing)
         demand_emplo_commune = demand_emplo_new
 
         return cls(
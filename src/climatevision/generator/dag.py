@@ -0,0 +1,252 @@
+"""The sector calculations as a graph of dependencies.
+
+Every node is one calculation step (usually the calc function of a sector).
+It is called with the inputs and, as keyword arguments, the values of the
+nodes it depends on. Some steps do not create a new value but complete a
+value created earlier (e.g. lulucf2030_pyr.calc fills in l30.pyr). Those
+nodes name the node they update and are then passed along in its place.
+
+While a node runs we record which fields of the entries it reads. That
+allows to rerun only the nodes affected by a change of some entries.
+"""
+
+# pyright: strict
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Iterable, Sequence
+
+from .inputs import Inputs
+from .instrumentation import Hook, timed
+from .makeentries import Entries
+
+
+@dataclass(kw_only=True, frozen=True)
+class Node:
+    name: str
+    fn: Callable[..., Any]
+    deps: tuple[str, ...] = ()
+    # The name of a node (which must also be in deps) that fn updates in place.
+    # fn returns None in that case.
+    updates: str | None = None
+    # Nodes (also in deps) whose values fn fills in further while creating its own value.
+    completes: tuple[str, ...] = ()
+
+
+@dataclass(kw_only=True)
+class Evaluation:
+    inputs: Inputs
+    # node name -> value. For nodes that update another node that is the updated value.
+    values: dict[str, Any]
+    # node name -> wall clock time spent in the node (only for the nodes that ran).
+    seconds: dict[str, float]
+    # node name -> the fields of the entries that the node read.
+    entries_read: dict[str, frozenset[str]]
+
+
+class _RecordingEntries:
+    """Passed to a node instead of the entries to find out which fields it reads."""
+
+    def __init__(self, entries: Entries, read: set[str]):
+        self._entries = entries
+        self._read = read
+
+    def __getattr__(self, name: str) -> Any:
+        self._read.add(name)
+        return getattr(self._entries, name)
+
+
+class Graph:
+    """The nodes of a graph must be given in an order in which they can be
+    calculated one after the other (so every node comes after its dependencies).
+    """
+
+    nodes: dict[str, Node]
+    # The name under which the value of a node is passed to the nodes that depend on it.
+    _arg_name: dict[str, str]
+    # arg name -> the last node that produces / updates it.
+    _final: dict[str, str]
+
+    def __init__(self, nodes: Iterable[Node]):
+        self.nodes = {}
+        self._arg_name = {}
+        self._final = {}
+        for node in nodes:
+            assert node.name not in self.nodes, f"Duplicate node {node.name}"
+            for dep in node.deps:
+                assert dep in self.nodes, f"{node.name} depends on unknown node {dep}"
+            for completed in node.completes:
+                assert (
+                    completed in node.deps
+                ), f"{node.name} completes {completed} so it must depend on it"
+            if node.updates is None:
+                arg_name = node.name
+            else:
+                assert (
+                    node.updates in node.deps
+                ), f"{node.name} updates {node.updates} so it must depend on it"
+                arg_name = self._arg_name[node.updates]
+            self.nodes[node.name] = node
+            self._arg_name[node.name] = arg_name
+            self._final[arg_name] = node.name
+        self._check_changes_come_last()
+
+    def _changed_by(self, node: Node) -> list[str]:
+        """The nodes whose values are changed when node runs."""
+        if node.updates is None:
+            return list(node.completes)
+        else:
+            return [node.updates, *node.completes]
+
+    def _check_changes_come_last(self):
+        """Everything else that uses a value must be done before it is changed in place.
+        Otherwise the result would depend on the order in which we run the nodes.
+        """
+        for node in self.nodes.values():
+            before = self.required([node.name])
+            for changed in self._changed_by(node):
+                for other in self.nodes.values():
+                    if other is not node and changed in other.deps:
+                        assert (
+                            other.name in before
+                        ), f"{other.name} uses {changed} but might run after {node.name} changed it"
+
+    def final(self, arg_name: str) -> str:
+        """The name of the node that completes the value called arg_name."""
+        return self._final[arg_name]
+
+    def required(self, targets: Iterable[str]) -> list[str]:
+        """The given nodes and everything they depend on (in graph order)."""
+        needed: set[str] = set()
+        todo = list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in needed:
+                needed.add(name)
+                todo.extend(self.nodes[name].deps)
+        return [name for name in self.nodes if name in needed]
+
+    def _run_node(
+        self, inputs: Inputs, name: str, values: dict[str, Any], read: set[str]
+    ) -> Any:
+        node = self.nodes[name]
+        kwargs = {self._arg_name[dep]: values[dep] for dep in node.deps}
+        recording: Any = _RecordingEntries(inputs.entries, read)
+        value = node.fn(inputs.with_entries(recording), **kwargs)
+        if node.updates is not None:
+            value = values[node.updates]
+        return value
+
+    def _evaluate(
+        self,
+        evaluation: Evaluation,
+        names: list[str],
+        max_workers: int,
+        hooks: Sequence[Hook],
+    ):
+        hook_list = list(hooks)
+
+        def run_node(name: str) -> Any:
+            read: set[str] = set()
+            (value, timing) = timed(
+                hook_list,
+                name,
+                lambda: self._run_node(
+                    evaluation.inputs, name, evaluation.values, read
+                ),
+            )
+            evaluation.seconds[name] = timing.wall
+            evaluation.entries_read[name] = frozenset(read)
+            return value
+
+        if max_workers <= 1:
+            for name in names:
+                evaluation.values[name] = run_node(name)
+            return
+
+        waiting = set(names)
+        running: dict[Future[Any], str] = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while waiting or running:
+                for name in [n for n in names if n in waiting]:
+                    if all(dep in evaluation.values for dep in self.nodes[name].deps):
+                        waiting.remove(name)
+                        running[pool.submit(run_node, name)] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    # This reraises the exception of a failed node.
+                    evaluation.values[running.pop(future)] = future.result()
+
+    def run(
+        self,
+        inputs: Inputs,
+        *,
+        targets: Iterable[str] | None = None,
+        max_workers: int = 1,
+        hooks: Sequence[Hook] = (),
+    ) -> Evaluation:
+        """Calculate the targets (default all nodes) and what they depend on.
+
+        With max_workers > 1 nodes that do not depend on each other run
+        concurrently in a thread pool. The hooks are told about every node
+        that runs (see instrumentation).
+        """
+        names = list(self.nodes) if targets is None else self.required(targets)
+        evaluation = Evaluation(inputs=inputs, values={}, seconds={}, entries_read={})
+        self._evaluate(evaluation, names, max_workers, hooks)
+        return evaluation
+
+    def rerun(
+        self,
+        previous: Evaluation,
+        inputs: Inputs,
+        *,
+        targets: Iterable[str] | None = None,
+        max_workers: int = 1,
+        hooks: Sequence[Hook] = (),
+    ) -> Evaluation:
+        """Like run, but reuse the values of all nodes of the previous evaluation
+        that do not depend on a field of the entries that differs in inputs.
+
+        previous is not modified (nodes that change values of other nodes in
+        place are rerun together with those).
+        """
+        names = list(self.nodes) if targets is None else self.required(targets)
+        if (
+            inputs.facts_and_assumptions()
+            is not previous.inputs.facts_and_assumptions()
+        ):
+            return self.run(
+                inputs,
+                targets=targets,
+                max_workers=max_workers,
+                hooks=hooks,
+            )
+        old_entries = previous.inputs.entries
+        changed = {
+            f.name
+            for f in fields(inputs.entries)
+            if getattr(inputs.entries, f.name) != getattr(old_entries, f.name)
+        }
+        dirty = {
+            name
+            for name in self.nodes
+            if name not in previous.values or previous.entries_read[name] & changed
+        }
+        while True:
+            count = len(dirty)
+            for node in self.nodes.values():
+                if node.name in dirty:
+                    dirty.update(self._changed_by(node))
+                elif any(dep in dirty for dep in node.deps):
+                    dirty.add(node.name)
+            if len(dirty) == count:
+                break
+
+        evaluation = Evaluation(inputs=inputs, values={}, seconds={}, entries_read={})
+        for name in names:
+            if name not in dirty:
+                evaluation.values[name] = previous.values[name]
+                evaluation.entries_read[name] = previous.entries_read[name]
+        self._evaluate(evaluation, [n for n in names if n in dirty], max_workers, hooks)
+        return evaluation
@@ -1,15 +1,28 @@
 """Module diffs -- Utility module to compare to result dictionaries.
 
 During testing and development it is often necessary to compare two result dictionaries.
+
+all walks both dicts and yields every Diff. compare does the same comparison on
+the result vectors of both dicts (see resultvector), which is much faster when
+many results are compared, and only reports the largest changes and a summary
+per sector.
 """
 
 # pyright: strict
 
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Any, Iterator
 from collections.abc import Mapping
 from math import isnan, fabs
 from numbers import Number
+import threading
+
+import numpy as np
+import numpy.typing as npt
+
+from . import resultvector
+from .resultvector import Schema, Vector
 
 
 def float_matches(actual: Any, expected: Any, rel: Any):
@@ -81,3 +94,173 @@ def all_helper(path: str, actual: Any, expected: Any, *, rel: Any) -> Iterator[D
 
 def all(*, actual, expected, rel=1e-9):  # type: ignore
     return all_helper("", actual, expected, rel=rel)
+
+
+@dataclass(kw_only=True)
+class SectorSummary:
+    leaves: int
+    changed: int
+    # The largest absolute and relative difference of the changed leaves.
+    max_abs: float
+    max_rel: float
+
+
+@dataclass(kw_only=True)
+class Report:
+    compared: int
+    changed: int
+    # The changed leaves with the largest relative differences, largest first.
+    # Leaves that are only in one of the results come first.
+    top: list[Diff]
+    sectors: dict[str, SectorSummary]
+
+
+# The sector (first name of the path) of every leaf of the schemas used last
+# (at most resultvector.MAX_SCHEMAS, least recently used first).
+_sectors_of_schema: OrderedDict[
+    str, tuple[list[str], npt.NDArray[np.intp]]
+] = OrderedDict()
+_sectors_lock = threading.Lock()
+
+
+def _sectors(schema: Schema) -> tuple[list[str], npt.NDArray[np.intp]]:
+    with _sectors_lock:
+        sectors = _sectors_of_schema.get(schema.id)
+        if sectors is not None:
+            _sectors_of_schema.move_to_end(schema.id)
+            return sectors
+    (names, ndx) = np.unique(
+        [p.split(".", maxsplit=1)[0] for p in schema.paths], return_inverse=True
+    )
+    sectors = (names.tolist(), ndx)
+    with _sectors_lock:
+        _sectors_of_schema[schema.id] = sectors
+        if len(_sectors_of_schema) > resultvector.MAX_SCHEMAS:
+            _sectors_of_schema.popitem(last=False)
+    return sectors
+
+
+def _value(v: float, null: bool) -> object:
+    return None if null else v
+
+
+def _leaf(vector: Vector, ndx: int) -> object:
+    return _value(
+        float(vector[ndx]), bool(resultvector.is_null(vector[ndx : ndx + 1])[0])
+    )
+
+
+def compare_vectors(
+    schema: Schema,
+    actual: Vector,
+    expected: Vector,
+    *,
+    rel: float = 1e-9,
+    abs_tol: float = 1e-12,
+    top: int = 20,
+) -> Report:
+    """Compare two result vectors of schema like all compares result dicts.
+
+    Two values match if they are equal, both NaN (or both None) or differ by
+    less than rel relative to expected or less than abs_tol.
+    """
+    a_null = resultvector.is_null(actual)
+    e_null = resultvector.is_null(expected)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        diff = np.abs(actual - expected)
+        matches = (
+            (actual == expected)
+            | (diff < np.abs(expected) * rel)
+            | (diff < abs_tol)
+            | (np.isnan(actual) & np.isnan(expected))
+        ) & (a_null == e_null)
+        changed = ~matches
+        # Leaves that changed from or to None or NaN get an infinite difference.
+        diff = np.where(changed & np.isnan(diff), np.inf, diff)
+        reldiff = np.where(
+            changed,
+            np.nan_to_num(diff / np.abs(expected), nan=np.inf, posinf=np.inf),
+            0.0,
+        )
+    diff = np.where(changed, diff, 0.0)
+
+    changed_ndx = np.flatnonzero(changed)
+    order = np.lexsort((-diff[changed_ndx], -reldiff[changed_ndx]))
+    top_ndx: list[int] = changed_ndx[order[:top]].tolist()
+    a_list = actual.tolist()
+    e_list = expected.tolist()
+    diffs = [
+        Diff(
+            path=schema.paths[ndx],
+            actual=_value(a_list[ndx], bool(a_null[ndx])),
+            expected=_value(e_list[ndx], bool(e_null[ndx])),
+        )
+        for ndx in top_ndx
+    ]
+
+    (names, sector_ndx) = _sectors(schema)
+    leaves = np.bincount(sector_ndx, minlength=len(names))
+    changed_count = np.bincount(sector_ndx, weights=changed, minlength=len(names))
+    max_abs = np.zeros(len(names))
+    max_rel = np.zeros(len(names))
+    np.maximum.at(max_abs, sector_ndx, diff)
+    np.maximum.at(max_rel, sector_ndx, reldiff)
+    sectors = {
+        name: SectorSummary(
+            leaves=int(leaves[i]),
+            changed=int(changed_count[i]),
+            max_abs=float(max_abs[i]),
+            max_rel=float(max_rel[i]),
+        )
+        for (i, name) in enumerate(names)
+    }
+    return Report(
+        compared=len(schema),
+        changed=len(changed_ndx),
+        top=diffs,
+        sectors=sectors,
+    )
+
+
+def compare(
+    *,
+    actual: Mapping[str, Any],
+    expected: Mapping[str, Any],
+    rel: float = 1e-9,
+    abs_tol: float = 1e-12,
+    top: int = 20,
+) -> Report:
+    """Compare two result dicts (see compare_vectors).
+
+    Leaves that are only in one of them are reported as changed (with
+    MISSING_SENTINEL on the other side), but are not part of the sector summary.
+    """
+    (a_schema, a_vector) = resultvector.vector_of_result_dict(actual)
+    (e_schema, e_vector) = resultvector.vector_of_result_dict(expected)
+    if a_schema.id == e_schema.id:
+        return compare_vectors(
+            e_schema, a_vector, e_vector, rel=rel, abs_tol=abs_tol, top=top
+        )
+
+    shared = [p for p in e_schema.paths if p in a_schema.offsets]
+    schema = Schema(paths=tuple(shared))
+    report = compare_vectors(
+        schema,
+        a_vector[[a_schema.offsets[p] for p in shared]],
+        e_vector[[e_schema.offsets[p] for p in shared]],
+        rel=rel,
+        abs_tol=abs_tol,
+        top=top,
+    )
+    missing = [
+        Diff(path=p, actual=MISSING_SENTINEL, expected=_leaf(e_vector, ndx))
+        for (ndx, p) in enumerate(e_schema.paths)
+        if p not in a_schema.offsets
+    ] + [
+        Diff(path=p, actual=_leaf(a_vector, ndx), expected=MISSING_SENTINEL)
+        for (ndx, p) in enumerate(a_schema.paths)
+        if p not in e_schema.offsets
+    ]
+    report.changed += len(missing)
+    report.top = (missing + report.top)[:top]
+    return report
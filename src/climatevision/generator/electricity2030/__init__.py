@@ -6,6 +6,7 @@ https://localzero-generator.readthedocs.io/de/latest/sectors/electricity.html
 # pyright: strict
 
 from ..inputs import Inputs
+from ..utils import uniform
 from ..electricity2018.e18 import E18
 from ..residences2018.r18 import R18
 from ..business2018.b18 import B18
@@ -43,7 +44,7 @@ def calc(
     than else sides. Hence  we have to hold two files for the 2 situations
     Each change of variable calculus has to be consistently edited within the 2 files"""
 
-    if inputs.entries.m_AGS_com == "DG000000":
+    if uniform(inputs.entries.m_AGS_com == "DG000000"):
         return electricity2030_ger.calc(
             inputs,
             e18=e18,
@@ -1,7 +1,7 @@
 # pyright: strict
 
 from ..inputs import Inputs
-from ..utils import div, MILLION
+from ..utils import div, maximum, MILLION
 from ..electricity2018.e18 import E18
 from ..residences2018.r18 import R18
 from ..business2018.b18 import B18
@@ -106,8 +106,8 @@ def calc_production_renewable_geothermal(
     full_load_hour = fact("Fact_E_P_geoth_full_load_hours")
 
     invest_pa = invest / Kalkulationszeitraum
-    demand_emplo_new = max(0, demand_emplo - emplo_existing)
-    power_to_be_installed = max(
+    demand_emplo_new = maximum(0, demand_emplo - emplo_existing)
+    power_to_be_installed = maximum(
         0,
         power_installable * power_to_be_installed_pct - power_installed,
     )
@@ -228,7 +228,7 @@ def calc_production_local_pv_roof(
         * p_local_pv_roof.area_ha_available_pct_of_action
         * p_local_pv_roof.ratio_power_to_area_ha
     )
-    p_local_pv_roof.power_to_be_installed = max(
+    p_local_pv_roof.power_to_be_installed = maximum(
         0,
         p_local_pv_roof.power_installable * p_local_pv_roof.power_to_be_installed_pct
         - p_local_pv_roof.power_installed,
@@ -326,7 +326,7 @@ def calc_production_local_pv_facade(
         * p_local_pv_facade.area_ha_available
         * p_local_pv_facade.area_ha_available_pct_of_action
     )
-    p_local_pv_facade.power_to_be_installed = max(
+    p_local_pv_facade.power_to_be_installed = maximum(
         0,
         p_local_pv_facade.power_installable
         * p_local_pv_facade.power_to_be_installed_pct
@@ -418,7 +418,7 @@ def calc_production_local_pv_agri(
         / local_pv_park_full_load_hour  # AGAIN WHAT ?
         * 1000
     )
-    p_local_pv_agri.power_to_be_installed = max(
+    p_local_pv_agri.power_to_be_installed = maximum(
         0,
         p_local_pv_agri.power_installable * p_local_pv_agri.power_to_be_installed_pct
         - p_local_pv_agri.power_installed,
@@ -497,7 +497,7 @@ def calc_production_local_pv_park(
         / p_local_pv_park.full_load_hour
         * 1000
     )
-    p_local_pv_park.power_to_be_installed = max(
+    p_local_pv_park.power_to_be_installed = maximum(
         0,
         p_local_pv_park.power_installable * p_local_pv_park.power_to_be_installed_pct
         - p_local_pv_park.power_installed,
@@ -592,7 +592,7 @@ def calc_production_local_wind_onshore(
         * p_local_wind_onshore.area_ha_available
         * p_local_wind_onshore.area_ha_available_pct_of_action
     )
-    p_local_wind_onshore.power_to_be_installed = max(
+    p_local_wind_onshore.power_to_be_installed = maximum(
         0,
         p_local_wind_onshore.power_installable
         * p_local_wind_onshore.power_to_be_installed_pct
@@ -717,7 +717,7 @@ def calc_production_local_biomass_stage2(
     p_local_biomass.demand_emplo = div(
         p_local_biomass.cost_wage, p_local_biomass.ratio_wage_to_emplo
     )
-    p_local_biomass.demand_emplo_new = max(
+    p_local_biomass.demand_emplo_new = maximum(
         0, p_local_biomass.demand_emplo - p_local_biomass.emplo_existing
     )
 
@@ -803,10 +803,10 @@ def calc_renew_wind_offshore(inputs: Inputs, *, d_energy: float):
     p_renew_wind_offshore.invest_pa = (
         p_renew_wind_offshore.invest / Kalkulationszeitraum
     )
-    p_renew_wind_offshore.demand_emplo_new = max(
+    p_renew_wind_offshore.demand_emplo_new = maximum(
         0, p_renew_wind_offshore.demand_emplo - p_renew_wind_offshore.emplo_existing
     )
-    p_renew_wind_offshore.power_to_be_installed = max(
+    p_renew_wind_offshore.power_to_be_installed = maximum(
         0,
         p_renew_wind_offshore.power_installable
         * p_renew_wind_offshore.power_to_be_installed_pct
@@ -868,7 +868,7 @@ def calc_production_renewable_reverse(inputs: Inputs, *, d_energy: float):
     p_renew_reverse.full_load_hour = ass("Ass_E_P_renew_reverse_full_load_hours")
     p_renew_reverse.invest_pa = p_renew_reverse.invest / Kalkulationszeitraum
     p_renew_reverse.demand_emplo_new = p_renew_reverse.demand_emplo
-    p_renew_reverse.power_to_be_installed = max(
+    p_renew_reverse.power_to_be_installed = maximum(
         0,
         ass("Ass_E_P_renew_reverse_addon_to_demand_2035")
         * ass("Ass_E_P_renew_nep_total_2035")
@@ -1210,7 +1210,7 @@ def calc(
         + p_renew_geoth.demand_emplo
         + p_renew_reverse.demand_emplo
     )
-    p_renew_wind.demand_emplo_new = max(
+    p_renew_wind.demand_emplo_new = maximum(
         0, p_renew_wind.demand_emplo - p_renew_wind.emplo_existing
     )
     p_renew.invest_pa = (
@@ -1474,7 +1474,7 @@ def calc(
         + p_local_hydro.pct_energy
     )
 
-    p_renew.energy = max(0, -p_local_surplus.energy)
+    p_renew.energy = maximum(0, -p_local_surplus.energy)
 
     p_local.CO2e_combustion_based_per_MWh = div(
         p_local.CO2e_combustion_based, p_local.energy
@@ -1494,7 +1494,7 @@ def calc(
     g_grid_onshore.demand_emplo = div(
         g_grid_onshore.cost_wage, g_grid_onshore.ratio_wage_to_emplo
     )
-    p_local_wind_onshore.demand_emplo_new = max(
+    p_local_wind_onshore.demand_emplo_new = maximum(
         0, p_local_wind_onshore.demand_emplo - p_local_wind_onshore.emplo_existing
     )
     e.invest_com = 0 + p.invest_com
@@ -1519,7 +1519,7 @@ def calc(
         + p_local_wind_onshore.demand_emplo
         + p_local_biomass.demand_emplo
     )  # emplo_existing
-    p_local_pv.demand_emplo_new = max(
+    p_local_pv.demand_emplo_new = maximum(
         0, p_local_pv.demand_emplo - p_local_pv.emplo_existing
     )
     g_grid_onshore.demand_emplo_new = g_grid_onshore.demand_emplo
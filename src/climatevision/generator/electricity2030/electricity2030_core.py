@@ -3,7 +3,7 @@
 from dataclasses import dataclass
 
 from ..inputs import Inputs
-from ..utils import div
+from ..utils import div, maximum
 
 
 @dataclass(kw_only=True)
@@ -190,7 +190,7 @@ def calc_biomass(inputs: Inputs) -> EColVars2030:
     )
 
     p_local_biomass.power_installable = entries.e_biomass_local_power_installable_sta
-    p_local_biomass.power_to_be_installed = max(
+    p_local_biomass.power_to_be_installed = maximum(
         0,
         p_local_biomass.power_installable * p_local_biomass.power_to_be_installed_pct
         - p_local_biomass.power_installed,
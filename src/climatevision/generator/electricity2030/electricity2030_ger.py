@@ -1,7 +1,7 @@
 # pyright: strict
 
 from ..inputs import Inputs
-from ..utils import div, MILLION
+from ..utils import div, maximum, MILLION
 from ..electricity2018.e18 import E18
 from ..residences2018.r18 import R18
 from ..business2018.b18 import B18
@@ -600,7 +600,7 @@ def calc(
         * p_renew_wind_offshore.power_installable
         * (1 - ass("Ass_E_P_renew_loss_brutto_to_netto"))
     )
-    p_renew_wind_offshore.power_to_be_installed = max(
+    p_renew_wind_offshore.power_to_be_installed = maximum(
         0,
         p_renew_wind_offshore.power_installable
         * p_renew_wind_offshore.power_to_be_installed_pct
@@ -614,12 +614,12 @@ def calc(
         * p_renew_geoth.power_installable
         * (1 - ass("Ass_E_P_renew_loss_brutto_to_netto"))
     )
-    p_renew_geoth.power_to_be_installed = max(
+    p_renew_geoth.power_to_be_installed = maximum(
         0,
         p_renew_geoth.power_installable * p_renew_geoth.power_to_be_installed_pct
         - p_renew_geoth.power_installed,
     )
-    p_renew_reverse.power_to_be_installed = max(
+    p_renew_reverse.power_to_be_installed = maximum(
         0,
         ass("Ass_E_P_renew_reverse_addon_to_demand_2035")
         * ass("Ass_E_P_renew_nep_total_2035")
@@ -880,7 +880,7 @@ def calc(
     p_renew_reverse.invest = (
         p_renew_reverse.power_to_be_installed * p_renew_reverse.invest_per_x
     )
-    p_local_pv_roof.power_to_be_installed = max(
+    p_local_pv_roof.power_to_be_installed = maximum(
         0,
         p_local_pv_roof.power_installable * p_local_pv_roof.power_to_be_installed_pct
         - p_local_pv_roof.power_installed,
@@ -890,7 +890,7 @@ def calc(
         * p_local_pv_roof.full_load_hour
         * (1 - ass("Ass_E_P_renew_loss_brutto_to_netto"))
     )
-    p_local_pv_facade.power_to_be_installed = max(
+    p_local_pv_facade.power_to_be_installed = maximum(
         0,
         p_local_pv_facade.power_installable
         * p_local_pv_facade.power_to_be_installed_pct
@@ -901,7 +901,7 @@ def calc(
         * p_local_pv_facade.power_installable
         * (1 - ass("Ass_E_P_renew_loss_brutto_to_netto"))
     )
-    p_local_pv_park.power_to_be_installed = max(
+    p_local_pv_park.power_to_be_installed = maximum(
         0,
         p_local_pv_park.power_installable * p_local_pv_park.power_to_be_installed_pct
         - p_local_pv_park.power_installed,
@@ -922,7 +922,7 @@ def calc(
         * p_local_pv_agri.power_installable
         * (1 - ass("Ass_E_P_renew_loss_brutto_to_netto"))
     )
-    p_local_wind_onshore.power_to_be_installed = max(
+    p_local_wind_onshore.power_to_be_installed = maximum(
         0,
         p_local_wind_onshore.power_installable
         * p_local_wind_onshore.power_to_be_installed_pct
@@ -1192,7 +1192,7 @@ def calc(
     g_grid_onshore.invest = (
         g_grid_onshore.power_to_be_installed * g_grid_onshore.invest_per_x
     )
-    p_local_pv_agri.energy = max(
+    p_local_pv_agri.energy = maximum(
         0,
         d.energy
         - (
@@ -1356,7 +1356,7 @@ def calc(
         p_renew_wind.cost_wage + p_renew_geoth.cost_wage + p_renew_reverse.cost_wage
     )
     p_renew_wind.demand_emplo = p_renew_wind_offshore.demand_emplo
-    p_renew_wind_offshore.demand_emplo_new = max(
+    p_renew_wind_offshore.demand_emplo_new = maximum(
         0, p_renew_wind_offshore.demand_emplo - p_renew_wind_offshore.emplo_existing
     )
     p_fossil_and_renew.change_energy_pct = div(
@@ -1469,7 +1469,7 @@ def calc(
     p_local_pv_agri.change_energy_pct = div(
         p_local_pv_agri.change_energy_MWh, e18.p_local_pv_agri.energy
     )
-    p_local_pv_agri.power_to_be_installed = max(
+    p_local_pv_agri.power_to_be_installed = maximum(
         0,
         p_local_pv_agri.power_installable * p_local_pv_agri.power_to_be_installed_pct
         - p_local_pv_agri.power_installed,
@@ -1478,7 +1478,7 @@ def calc(
         p_local_wind_onshore.cost_wage, p_local_wind_onshore.ratio_wage_to_emplo
     )
     p_local.change_CO2e_t = p_local_biomass.change_CO2e_t
-    p_local_biomass.demand_emplo_new = max(
+    p_local_biomass.demand_emplo_new = maximum(
         0, p_local_biomass.demand_emplo - p_local_biomass.emplo_existing
     )
     g_grid_offshore.demand_emplo_new = g_grid_offshore.demand_emplo
@@ -1488,7 +1488,7 @@ def calc(
         + p_renew_geoth.demand_emplo
         + p_renew_reverse.demand_emplo
     )
-    p_renew_wind.demand_emplo_new = max(
+    p_renew_wind.demand_emplo_new = maximum(
         0, p_renew_wind.demand_emplo - p_renew_wind.emplo_existing
     )
     p_renew.pct_energy = (
@@ -1534,7 +1534,7 @@ def calc(
         p_renew_biomass.CO2e_total - e18.p_renew_biomass.CO2e_total
     )
     p_renew.cost_climate_saved = p_renew_biomass.cost_climate_saved
-    p_renew_geoth.demand_emplo_new = max(
+    p_renew_geoth.demand_emplo_new = maximum(
         0, p_renew_geoth.demand_emplo - p_renew_geoth.emplo_existing
     )
     p.invest_com = p_fossil_and_renew.invest_com + p_local.invest_com
@@ -1574,7 +1574,7 @@ def calc(
     p_local_pv_agri.invest = (
         p_local_pv_agri.power_to_be_installed * p_local_pv_agri.invest_per_x
     )
-    p_local_wind_onshore.demand_emplo_new = max(
+    p_local_wind_onshore.demand_emplo_new = maximum(
         0, p_local_wind_onshore.demand_emplo - p_local_wind_onshore.emplo_existing
     )
     p_fossil_and_renew.demand_emplo = p_renew.demand_emplo
@@ -1772,7 +1772,7 @@ def calc(
         + p_local_wind_onshore.demand_emplo
         + p_local_biomass.demand_emplo
     )  # emplo_existing
-    p_local_pv.demand_emplo_new = max(
+    p_local_pv.demand_emplo_new = maximum(
         0, p_local_pv.demand_emplo - p_local_pv.emplo_existing
     )
     g.demand_emplo = (
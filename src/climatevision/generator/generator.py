@@ -1,14 +1,17 @@
 # pyright: strict
 
-from dataclasses import dataclass, fields, is_dataclass
-from time import time
-from sys import stderr
+from dataclasses import dataclass, fields
+from typing import Any, Iterable
+import fnmatch
 
+from . import dag
+from .instrumentation import Hook, active_hooks
 from .inputs import Inputs
 from .refdata import RefData
 from .makeentries import make_entries
 from .bisko import Bisko
 from .methodology183x import M183X
+from .resultdict import dataclass_to_result_dict
 from .lulucf2030 import lulucf2030_pyr
 from .electricity2030 import electricity2030_core
 
@@ -57,37 +60,6 @@ from . import industry2030
 from . import methodology183x
 
 
-def _convert_item(v: object) -> object:
-    if is_dataclass(v) and not isinstance(v, type):
-        return dataclass_to_result_dict(v)
-    else:
-        return v
-
-
-def dataclass_to_result_dict(v: object) -> dict[str, object]:
-    """This does basically the same as asdict from dataclasses does.
-
-    The most important difference is that classes can contain a list
-    called LIFT_INTO_RESULT_DICT and will list all values contained
-    in that dictionary into the resulting dictionary.
-    """
-    result = {f.name: _convert_item(getattr(v, f.name)) for f in fields(v)}
-    names_to_lift: list[str] = getattr(v, "LIFT_INTO_RESULT_DICT", [])
-    values_to_lift: list[dict[str, object]] = []
-    for name in names_to_lift:
-        v = result[name]
-        if isinstance(v, dict):
-            values_to_lift.append(v)  # type: ignore
-            del result[name]
-        else:
-            assert (
-                False
-            ), f"LIFT_INTO_RESULT_DICT encountered {v} at {name} -- which is not a dictionary"
-    for v in values_to_lift:
-        result.update(v)
-    return result
-
-
 @dataclass(kw_only=True)
 class Result:
     # 2018
@@ -119,197 +91,222 @@ class Result:
         return dataclass_to_result_dict(self)
 
 
-def calculate(inputs: Inputs) -> Result:
-    """This is the entry point to the actual calculation."""
-    start_t = time()
-    # 2018
-    print("Residence2018_calc", file=stderr)
-    r18 = residences2018.calc(inputs)
-
-    print("Business2018_calc", file=stderr)
-    b18 = business2018.calc(inputs, r18=r18)
-
-    print("Industry2018_calc", file=stderr)
-    i18 = industry2018.calc(inputs)
-
-    print("Transport2018_calc", file=stderr)
-    t18 = transport2018.calc(inputs)
-
-    print("Fuels2018_calc", file=stderr)
-    f18 = fuels2018.calc(inputs, t18=t18)
-
-    print("Lulucf2018_calc", file=stderr)
-    l18 = lulucf2018.calc(inputs)
-
-    print("Agri2018_calc", file=stderr)
-    a18 = agri2018.calc(inputs, l18=l18, b18=b18)
-
-    print("Electricity2018_calc", file=stderr)
-    e18 = electricity2018.calc(inputs, t18=t18)
-
-    print("Heat2018_calc", file=stderr)
-    h18 = heat2018.calc(inputs, t18=t18, e18=e18)
-
-    end_t = time()
-    print(
-        "elapsed time for 18-sectors: {:5.3f}s".format(end_t - start_t),
-        file=stderr,
-    )
-
-    # target year
-    print("Transport2030", file=stderr)
-    t30 = transport2030.calc(inputs, t18=t18)
-
-    print("Industry2030", file=stderr)
-    i30 = industry2030.calc(inputs, i18=i18)
-
-    print("Residenctial2030", file=stderr)
-    r30 = residences2030.calc(inputs, r18=r18, b18=b18)
-
-    print("Business2030_calc", file=stderr)
-    b30 = business2030.calc(inputs, b18=b18, r18=r18, r30=r30)
-
-    print("Lulucf2030_calc", file=stderr)
-    l30 = lulucf2030.calc(inputs, l18=l18)
-
-    print("Agri2030_calc", file=stderr)
-    a30 = agri2030.calc(inputs, a18=a18, l30=l30)
-
-    print("Electricity2030_calc_biomass", file=stderr)
-    p_local_biomass = electricity2030_core.calc_biomass(inputs)
-    p_local_biomass_cogen = electricity2030_core.calc_biomass_cogen(
-        inputs, p_local_biomass=p_local_biomass
-    )
-
-    print("Heat2030_calc", file=stderr)
-    h30 = heat2030.calc(
-        inputs,
-        h18=h18,
-        r30=r30,
-        b30=b30,
-        a30=a30,
-        i30=i30,
-        p_local_biomass_cogen=p_local_biomass_cogen,
-    )
-
-    print("Fuels2030_calc", file=stderr)
-    f30 = fuels2030.calc(
-        inputs, f18=f18, a30=a30, b30=b30, h30=h30, i30=i30, r30=r30, t30=t30
-    )
-
-    print("Electricity2030_calc", file=stderr)
-    e30 = electricity2030.calc(
-        inputs,
-        e18=e18,
-        r18=r18,
-        b18=b18,
-        a30=a30,
-        b30=b30,
-        f30=f30,
-        h30=h30,
-        i30=i30,
-        r30=r30,
-        t30=t30,
-        p_local_biomass_cogen=p_local_biomass_cogen,
-        p_local_biomass=p_local_biomass,
-    )
-
-    print("Methodology2030_calc", file=stderr)
-    m183X = methodology183x.calc_budget(
-        inputs,
-        a18=a18,
-        b18=b18,
-        e18=e18,
-        f18=f18,
-        h18=h18,
-        i18=i18,
-        l18=l18,
-        r18=r18,
-        t18=t18,
-    )
-
-    print("Lulucf2030_calcPyr", file=stderr)
-    lulucf2030_pyr.calc(
-        inputs,
-        l18=l18,
-        l30=l30,
-        a30=a30,
-        b30=b30,
-        e30=e30,
-        f30=f30,
-        h30=h30,
-        i30=i30,
-        r30=r30,
-        t30=t30,
-    )
-
-    print("Methodology2030_calcZ", file=stderr)
-    methodology183x.calc_z(
-        inputs,
-        m183X=m183X,
-        a18=a18,
-        b18=b18,
-        e18=e18,
-        f18=f18,
-        h18=h18,
-        i18=i18,
-        l18=l18,
-        r18=r18,
-        t18=t18,
-        a30=a30,
-        b30=b30,
-        e30=e30,
-        f30=f30,
-        h30=h30,
-        i30=i30,
-        l30=l30,
-        r30=r30,
-        t30=t30,
-    )
-
-    print("Bisko_calc", file=stderr)
-    bisko = Bisko.calc(
-        inputs,
-        r18=r18,
-        b18=b18,
-        i18=i18,
-        t18=t18,
-        f18=f18,
-        l18=l18,
-        a18=a18,
-        e18=e18,
-        h18=h18,
+GRAPH = dag.Graph(
+    [
+        # 2018
+        dag.Node(name="r18", fn=residences2018.calc),
+        dag.Node(name="b18", fn=business2018.calc, deps=("r18",)),
+        dag.Node(name="i18", fn=industry2018.calc),
+        dag.Node(name="t18", fn=transport2018.calc),
+        dag.Node(name="f18", fn=fuels2018.calc, deps=("t18",)),
+        dag.Node(name="l18", fn=lulucf2018.calc),
+        dag.Node(name="a18", fn=agri2018.calc, deps=("l18", "b18")),
+        dag.Node(name="e18", fn=electricity2018.calc, deps=("t18",)),
+        dag.Node(name="h18", fn=heat2018.calc, deps=("t18", "e18")),
+        # target year
+        dag.Node(name="t30", fn=transport2030.calc, deps=("t18",)),
+        dag.Node(name="i30", fn=industry2030.calc, deps=("i18",)),
+        dag.Node(name="r30", fn=residences2030.calc, deps=("r18", "b18")),
+        dag.Node(name="b30", fn=business2030.calc, deps=("b18", "r18", "r30")),
+        dag.Node(name="l30", fn=lulucf2030.calc, deps=("l18",)),
+        dag.Node(name="a30", fn=agri2030.calc, deps=("a18", "l30")),
+        dag.Node(name="p_local_biomass", fn=electricity2030_core.calc_biomass),
+        dag.Node(
+            name="p_local_biomass_cogen",
+            fn=electricity2030_core.calc_biomass_cogen,
+            deps=("p_local_biomass",),
+        ),
+        dag.Node(
+            name="h30",
+            fn=heat2030.calc,
+            deps=("h18", "r30", "b30", "a30", "i30", "p_local_biomass_cogen"),
+        ),
+        dag.Node(
+            name="f30",
+            fn=fuels2030.calc,
+            deps=("f18", "a30", "b30", "h30", "i30", "r30", "t30"),
+        ),
+        dag.Node(
+            name="e30",
+            fn=electricity2030.calc,
+            deps=(
+                "e18",
+                "r18",
+                "b18",
+                "a30",
+                "b30",
+                "f30",
+                "h30",
+                "i30",
+                "r30",
+                "t30",
+                "p_local_biomass_cogen",
+                "p_local_biomass",
+            ),
+            completes=("p_local_biomass_cogen", "p_local_biomass"),
+        ),
+        dag.Node(
+            name="m183X",
+            fn=methodology183x.calc_budget,
+            deps=("a18", "b18", "e18", "f18", "h18", "i18", "l18", "r18", "t18"),
+        ),
+        dag.Node(
+            name="l30_pyr",
+            fn=lulucf2030_pyr.calc,
+            deps=("l18", "l30", "a30", "b30", "e30", "f30", "h30", "i30", "r30", "t30"),
+            updates="l30",
+        ),
+        dag.Node(
+            name="m183X_z",
+            fn=methodology183x.calc_z,
+            deps=(
+                "m183X",
+                "a18",
+                "b18",
+                "e18",
+                "f18",
+                "h18",
+                "i18",
+                "l18",
+                "r18",
+                "t18",
+                "a30",
+                "b30",
+                "e30",
+                "f30",
+                "h30",
+                "i30",
+                "l30_pyr",
+                "r30",
+                "t30",
+            ),
+            updates="m183X",
+        ),
+        dag.Node(
+            name="bisko",
+            fn=Bisko.calc,
+            deps=("r18", "b18", "i18", "t18", "f18", "l18", "a18", "e18", "h18"),
+        ),
+    ]
+)
+
+
+def sectors_of_paths(paths: Iterable[str]) -> set[str]:
+    """The fields of Result that are needed for the given result paths.
+
+    A path is a dot separated list of names as in the result dict,
+    each of which may use wildcards. E.g. "bisko.*" or "r18.r.CO2e_total".
+    """
+    names = [f.name for f in fields(Result)]
+    sectors: set[str] = set()
+    for path in paths:
+        matched = fnmatch.filter(names, path.split(".", maxsplit=1)[0])
+        if not matched:
+            raise ValueError(f"{path} does not select anything in Result")
+        sectors.update(matched)
+    return sectors
+
+
+def _select_path(d: dict[str, Any], path: list[str], into: dict[str, Any]):
+    for name in fnmatch.filter(d.keys(), path[0]):
+        v = d[name]
+        if len(path) == 1:
+            into[name] = v
+        elif isinstance(v, dict):
+            _select_path(v, path[1:], into.setdefault(name, {}))  # type: ignore
+
+
+def select_paths(result_dict: dict[str, Any], paths: Iterable[str]) -> dict[str, Any]:
+    """Only keep the given paths (see sectors_of_paths) of a result dict."""
+    selected: dict[str, Any] = {}
+    for path in paths:
+        _select_path(result_dict, path.split("."), selected)
+    return selected
+
+
+def evaluate(
+    inputs: Inputs,
+    *,
+    paths: Iterable[str] | None = None,
+    max_workers: int = 1,
+    previous: dag.Evaluation | None = None,
+    hooks: Iterable[Hook] = (),
+) -> dag.Evaluation:
+    """Run the nodes of GRAPH needed for the given paths (default: everything).
+
+    If a previous evaluation is given, only the nodes affected by the entries
+    that differ between previous.inputs and inputs are recalculated.
+
+    The given hooks and the registered ones (see instrumentation.register)
+    are told about every node that runs.
+    """
+    if paths is None:
+        targets = None
+    else:
+        targets = [GRAPH.final(sector) for sector in sectors_of_paths(paths)]
+    all_hooks = active_hooks(hooks)
+    if previous is None:
+        return GRAPH.run(
+            inputs,
+            targets=targets,
+            max_workers=max_workers,
+            hooks=all_hooks,
+        )
+    else:
+        return GRAPH.rerun(
+            previous,
+            inputs,
+            targets=targets,
+            max_workers=max_workers,
+            hooks=all_hooks,
+        )
+
+
+def result_of_evaluation(evaluation: dag.Evaluation) -> Result:
+    """The fields of Result that were not evaluated are None."""
+    sectors: dict[str, Any] = {
+        f.name: evaluation.values.get(GRAPH.final(f.name)) for f in fields(Result)
+    }
+    return Result(**sectors)
+
+
+def calculate(
+    inputs: Inputs,
+    *,
+    paths: Iterable[str] | None = None,
+    max_workers: int = 1,
+    hooks: Iterable[Hook] = (),
+) -> Result:
+    """This is the entry point to the actual calculation.
+
+    If paths are given (see sectors_of_paths) only the sectors needed for them
+    are calculated. All other fields of the returned Result are None.
+
+    With max_workers > 1 the sectors that do not depend on each other are
+    calculated concurrently (see dag.Graph.run).
+
+    The hooks (see instrumentation) are told when every sector starts and ends.
+    """
+    return result_of_evaluation(
+        evaluate(inputs, paths=paths, max_workers=max_workers, hooks=hooks)
     )
 
-    return Result(
-        r18=r18,
-        b18=b18,
-        i18=i18,
-        t18=t18,
-        f18=f18,
-        l18=l18,
-        a18=a18,
-        e18=e18,
-        h18=h18,
-        t30=t30,
-        i30=i30,
-        r30=r30,
-        b30=b30,
-        f30=f30,
-        e30=e30,
-        l30=l30,
-        a30=a30,
-        h30=h30,
-        m183X=m183X,
-        bisko=bisko,
-    )
 
+def calculate_with_default_inputs(
+    ags: str,
+    year: int,
+    *,
+    paths: Iterable[str] | None = None,
+    refdata: RefData | None = None,
+) -> Result:
+    """Calculate without the ability to override entries.
 
-def calculate_with_default_inputs(ags: str, year: int) -> Result:
-    """Calculate without the ability to override entries."""
-    refdata = RefData.load()
+    The reference data is loaded unless given (e.g. a tracing view of it).
+    """
+    if refdata is None:
+        refdata = RefData.load()
     entries = make_entries(refdata, ags=ags, year=year)
     inputs = Inputs(
         facts_and_assumptions=refdata.facts_and_assumptions(), entries=entries
     )
-    return calculate(inputs)
+    return calculate(inputs, paths=paths)
@@ -0,0 +1,165 @@
+"""A store of the results of many (AGS, year) combinations in one file.
+
+The end to end tests compare a few results with the JSONs in
+tests/end_to_end_expected. To also catch regressions in the other AGS the
+golden store keeps the result vectors (see resultvector) of all AGS for a few
+years as one matrix with a row per (AGS, year). AGS whose calculation failed
+keep the error instead (and a row of NULLs).
+
+The columns of the matrix are the leaves of the most common schema. The few
+results with another shape keep their own schema and vector next to the
+matrix (and a row of NULLs in it).
+
+The file is an npz (numpy's zip of arrays). The matrix is saved column by
+column, so that the values of a leaf for all AGS, which are often the same or
+similar, are next to each other and compress well.
+"""
+
+# pyright: strict
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+import numpy as np
+
+from .refdata import Version
+from .resultvector import NULL, Schema, Vector
+
+
+@dataclass(kw_only=True)
+class GoldenStore:
+    schema: Schema
+    # The (ags, year) of every row.
+    keys: list[tuple[str, int]]
+    # One row per key.
+    values: Vector
+    # The error of every row, empty if the calculation succeeded.
+    errors: list[str]
+    # The version of the reference data the results were calculated with.
+    data_version: Version | None = None
+    # The schema and vector of the rows whose result has another shape.
+    other_shapes: dict[int, tuple[Schema, Vector]] = field(
+        default_factory=dict[int, tuple[Schema, Vector]]
+    )
+    _rows: dict[tuple[str, int], int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if self.values.shape != (len(self.keys), len(self.schema)):
+            raise ValueError(
+                f"Expected {len(self.keys)} x {len(self.schema)} values, got {self.values.shape}"
+            )
+        if len(self.errors) != len(self.keys):
+            raise ValueError(
+                f"Expected {len(self.keys)} errors, got {len(self.errors)}"
+            )
+        for (row, (schema, vector)) in self.other_shapes.items():
+            if not 0 <= row < len(self.keys) or vector.shape != (len(schema),):
+                raise ValueError(f"Row {row} of another shape does not fit")
+        self._rows = {key: ndx for (ndx, key) in enumerate(self.keys)}
+
+    @classmethod
+    def of_rows(
+        cls,
+        rows: Sequence[tuple[str, int, tuple[Schema, Vector] | None, str]],
+        data_version: Version | None = None,
+    ) -> "GoldenStore":
+        """A store of (ags, year, (schema, vector) or None, error) rows, sorted by key.
+
+        The schema of the store is the most common one (of the first key if
+        several are as common).
+        """
+        rows = sorted(rows, key=lambda r: (r[0], r[1]))
+        schemas = {r[2][0].id: r[2][0] for r in rows if r[2] is not None}
+        counts = Counter(r[2][0].id for r in rows if r[2] is not None)
+        schema = schemas[counts.most_common(1)[0][0]] if counts else Schema(paths=())
+        values = np.full((len(rows), len(schema)), NULL, dtype=np.float64)
+        other_shapes: dict[int, tuple[Schema, Vector]] = {}
+        for (ndx, (_, _, shaped, _)) in enumerate(rows):
+            if shaped is None:
+                continue
+            elif shaped[0].id == schema.id:
+                values[ndx] = shaped[1]
+            else:
+                other_shapes[ndx] = shaped
+        return cls(
+            schema=schema,
+            keys=[(ags, year) for (ags, year, _, _) in rows],
+            values=values,
+            errors=[error for (_, _, _, error) in rows],
+            data_version=data_version,
+            other_shapes=other_shapes,
+        )
+
+    def row(self, ags: str, year: int) -> int:
+        """The index of the row of ags and year. Raises KeyError if there is none."""
+        return self._rows[(ags, year)]
+
+    def result_vector(self, row: int) -> tuple[Schema, Vector]:
+        """The schema and values of the result of row."""
+        return self.other_shapes.get(row, (self.schema, self.values[row]))
+
+    def save(self, fname: str):
+        # The other shapes are saved as their distinct schemas (all paths one
+        # after the other and the number of paths of each) and all their
+        # vectors one after the other.
+        other_rows = sorted(self.other_shapes)
+        other_schemas = list(dict.fromkeys(self.other_shapes[r][0] for r in other_rows))
+        other_schema_ndxs = {s: ndx for (ndx, s) in enumerate(other_schemas)}
+        np.savez_compressed(
+            fname,
+            paths=np.array(self.schema.paths),
+            ags=np.array([ags for (ags, _) in self.keys]),
+            years=np.array([year for (_, year) in self.keys], dtype=np.int32),
+            errors=np.array(self.errors),
+            columns=np.ascontiguousarray(self.values.T, dtype="<f8"),
+            data_version=np.array(
+                []
+                if self.data_version is None
+                else [self.data_version.public, self.data_version.proprietary]
+            ),
+            other_rows=np.array(other_rows, dtype=np.int64),
+            other_schemas=np.array(
+                [other_schema_ndxs[self.other_shapes[r][0]] for r in other_rows],
+                dtype=np.int64,
+            ),
+            other_path_counts=np.array([len(s) for s in other_schemas], dtype=np.int64),
+            other_paths=np.array([p for s in other_schemas for p in s.paths]),
+            other_values=np.concatenate(
+                [self.other_shapes[r][1] for r in other_rows]
+                + [np.zeros(0, dtype=np.float64)]
+            ).astype("<f8"),
+        )
+
+    @classmethod
+    def load(cls, fname: str) -> "GoldenStore":
+        with np.load(fname) as npz:
+            arrays: dict[str, Any] = dict(npz)
+        schema = Schema(paths=tuple(arrays["paths"].tolist()))
+        keys = list(zip(arrays["ags"].tolist(), arrays["years"].tolist()))
+        version = arrays["data_version"].tolist()
+        other_shapes: dict[int, tuple[Schema, Vector]] = {}
+        if "other_rows" in arrays:
+            # Stores written before there were other shapes have none.
+            other_schemas: list[Schema] = []
+            paths: list[str] = arrays["other_paths"].tolist()
+            for count in arrays["other_path_counts"].tolist():
+                other_schemas.append(Schema(paths=tuple(paths[:count])))
+                paths = paths[count:]
+            values = arrays["other_values"].astype(np.float64)
+            rows: list[int] = arrays["other_rows"].tolist()
+            ndxs: list[int] = arrays["other_schemas"].tolist()
+            for (row, ndx) in zip(rows, ndxs):
+                other = other_schemas[ndx]
+                other_shapes[row] = (other, values[: len(other)])
+                values = values[len(other) :]
+        return cls(
+            schema=schema,
+            keys=keys,
+            values=np.ascontiguousarray(arrays["columns"].T, dtype=np.float64),
+            errors=arrays["errors"].tolist(),
+            data_version=(
+                Version(public=version[0], proprietary=version[1]) if version else None
+            ),
+            other_shapes=other_shapes,
+        )
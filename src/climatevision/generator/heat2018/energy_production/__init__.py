@@ -3,6 +3,7 @@
 from dataclasses import dataclass
 
 from ...inputs import Inputs
+from ...utils import where
 from ...transport2018.t18 import T18
 from ...electricity2018.e18 import E18
 
@@ -88,23 +89,16 @@ def calc_production(
         CO2e_combustion_based_per_MWh=fact("Fact_H_P_coal_ratio_CO2e_cb_to_fec_2018"),
     )
 
-    if (
+    cogen_energy = (
         e18.p_fossil_coal_brown_cogen.energy
         + e18.p_fossil_coal_black_cogen.energy
         + e18.p_fossil_gas_cogen.energy
         + e18.p_fossil_ofossil_cogen.energy
         + e18.p_renew_biomass_cogen.energy
-        < p_heatnet_energy
-    ):
-        heatnet_cogen_energy = (
-            e18.p_fossil_coal_brown_cogen.energy
-            + e18.p_fossil_coal_black_cogen.energy
-            + e18.p_fossil_gas_cogen.energy
-            + e18.p_fossil_ofossil_cogen.energy
-            + e18.p_renew_biomass_cogen.energy
-        )
-    else:
-        heatnet_cogen_energy = p_heatnet_energy
+    )
+    heatnet_cogen_energy = where(
+        cogen_energy < p_heatnet_energy, cogen_energy, p_heatnet_energy
+    )
 
     heatnet_cogen = EnergyWithCO2ePerMWh.calcFromEnergyAndCO2eBasedPerMWh(
         energy=heatnet_cogen_energy,
@@ -6,7 +6,7 @@ https://localzero-generator.readthedocs.io/de/latest/sectors/heat.html
 # pyright: strict
 
 from ..inputs import Inputs
-from ..utils import div
+from ..utils import div, where
 from ..heat2018.h18 import H18
 from ..residences2030.r30 import R30
 from ..business2030.b30 import B30
@@ -65,11 +65,11 @@ def calc(
 
     p_heatnet_lheatpump.invest_per_x = fact("Fact_H_P_heatnet_lheatpump_invest_203X")
 
-    p_heatnet_plant.energy = (
+    p_heatnet_plant.energy = where(
+        production.heatnet_cogen.energy < p_heatnet.energy,
         (p_heatnet.energy - production.heatnet_cogen.energy)
-        * p_heatnet_plant.pct_energy
-        if (production.heatnet_cogen.energy < p_heatnet.energy)
-        else 0
+        * p_heatnet_plant.pct_energy,
+        0,
     )
     p_heatnet_plant.area_ha_available = p_heatnet_plant.energy / fact(
         "Fact_H_P_heatnet_solarth_park_yield_2025"
@@ -82,11 +82,11 @@ def calc(
     p_heatnet_lheatpump.full_load_hour = fact(
         "Fact_H_P_heatnet_lheatpump_full_load_hours"
     )
-    p_heatnet_lheatpump.energy = (
+    p_heatnet_lheatpump.energy = where(
+        production.heatnet_cogen.energy < p_heatnet.energy,
         (p_heatnet.energy - production.heatnet_cogen.energy)
-        * p_heatnet_lheatpump.pct_energy
-        if (production.heatnet_cogen.energy < p_heatnet.energy)
-        else 0
+        * p_heatnet_lheatpump.pct_energy,
+        0,
     )
     p_heatnet_geoth.invest_per_x = fact("Fact_H_P_heatnet_geoth_invest_203X")
     p_heatnet_geoth.full_load_hour = fact("Fact_H_P_heatnet_geoth_full_load_hours")
@@ -134,11 +134,11 @@ def calc(
         * fact("Fact_M_cost_per_CO2e_2020")
     )
     p_heatnet_geoth.pct_energy = ass("Ass_H_P_heatnet_fraction_geoth_2050")
-    p_heatnet_geoth.energy = (
+    p_heatnet_geoth.energy = where(
+        production.heatnet_cogen.energy < p_heatnet.energy,
         (p_heatnet.energy - production.heatnet_cogen.energy)
-        * p_heatnet_geoth.pct_energy
-        if (production.heatnet_cogen.energy < p_heatnet.energy)
-        else 0
+        * p_heatnet_geoth.pct_energy,
+        0,
     )
     p_heatnet_geoth.power_to_be_installed = div(
         p_heatnet_geoth.energy, p_heatnet_geoth.full_load_hour
@@ -3,6 +3,7 @@
 from dataclasses import dataclass
 
 from ...inputs import Inputs
+from ...utils import where
 from ...heat2018.h18 import H18
 from ...residences2030.r30 import R30
 from ...business2030.b30 import B30
@@ -110,10 +111,10 @@ def calc_production(
         CO2e_combustion_based_per_MWh=h18.p_opetpro.CO2e_combustion_based_per_MWh,
     )
 
-    heatnet_cogen_energy = (
-        p_local_biomass_cogen_energy
-        if (p_local_biomass_cogen_energy < p_heatnet_energy)
-        else p_heatnet_energy
+    heatnet_cogen_energy = where(
+        p_local_biomass_cogen_energy < p_heatnet_energy,
+        p_local_biomass_cogen_energy,
+        p_heatnet_energy,
     )
     heatnet_cogen = Vars9(
         inputs=inputs,
@@ -6,7 +6,7 @@ https://localzero-generator.readthedocs.io/de/latest/sectors/industry.html
 # pyright: strict
 
 from ..inputs import Inputs
-from ..utils import div
+from ..utils import div, maximum
 from ..industry2018.i18 import I18
 
 from .i30 import I30
@@ -1364,7 +1364,7 @@ def calc(inputs: Inputs, *, i18: I18) -> I30:
     p_metal_steel.cost_wage = (
         p_metal_steel_primary.cost_wage + p_metal_steel_secondary.cost_wage
     )
-    p.demand_emplo_new = max(0, p.demand_emplo - p.emplo_existing)
+    p.demand_emplo_new = maximum(0, p.demand_emplo - p.emplo_existing)
     i.demand_emplo = general.g.demand_emplo + p.demand_emplo
     i.demand_emplo_new = general.g.demand_emplo_new + p.demand_emplo_new
     p_metal_steel.demand_electricity = (
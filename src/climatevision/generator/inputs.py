@@ -32,6 +32,15 @@ class Inputs:
         self._facts_and_assumptions = facts_and_assumptions
         self.entries = entries
 
+    def facts_and_assumptions(self) -> FactsAndAssumptions:
+        return self._facts_and_assumptions
+
+    def with_entries(self, entries: Entries) -> "Inputs":
+        """The same facts and assumptions but different entries."""
+        return Inputs(
+            facts_and_assumptions=self._facts_and_assumptions, entries=entries
+        )
+
     def fact(self, keyname: str) -> float:
         """Statistics about the past. Must be able to give a source for each fact."""
         return self._facts_and_assumptions.fact(keyname)
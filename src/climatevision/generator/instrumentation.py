@@ -0,0 +1,207 @@
+"""Hooks that are told when a stage (a node of the graph, see dag) of the
+calculation starts and ends.
+
+A hook is passed to calculate (or dag.Graph.run) or registered globally with
+register, in which case it sees every calculation of the process. When a stage
+ends the hooks get its wall clock time, the CPU time of the thread that ran it
+and, if tracemalloc is tracing, the net change of the allocated memory. As
+tracemalloc counts the memory of the whole process, the latter is only
+meaningful when the stages run one after the other.
+
+Every stage_started is followed by exactly one stage_done (the stage returned)
+or stage_failed (it raised), so hooks can pair them (e.g. for spans).
+
+Hook itself does nothing. LoggingHook logs every stage, HistogramHook collects
+the times of every stage in histograms.
+"""
+
+# pyright: strict
+
+from dataclasses import dataclass, field
+from threading import Lock
+from time import perf_counter, thread_time
+from typing import Callable, Iterable, TypeVar
+import bisect
+import logging
+import tracemalloc
+
+T = TypeVar("T")
+
+
+@dataclass(kw_only=True, frozen=True)
+class Timing:
+    # Seconds.
+    wall: float
+    cpu: float
+    # Bytes, None if tracemalloc was not tracing.
+    allocated: int | None = None
+
+
+class Hook:
+    """The default hook, it ignores all events."""
+
+    def stage_started(self, stage: str):
+        pass
+
+    def stage_done(self, stage: str, timing: Timing):
+        pass
+
+    def stage_failed(self, stage: str, timing: Timing, error: BaseException):
+        pass
+
+
+class LoggingHook(Hook):
+    def __init__(
+        self, logger: logging.Logger | None = None, level: int = logging.DEBUG
+    ):
+        self.logger = logger or logging.getLogger("climatevision.generator")
+        self.level = level
+
+    def stage_done(self, stage: str, timing: Timing):
+        if timing.allocated is None:
+            allocated = ""
+        else:
+            allocated = f" {timing.allocated / 1024:.1f}KiB"
+        self.logger.log(
+            self.level,
+            "%s_calc: %5.3fs (cpu %5.3fs)%s",
+            stage,
+            timing.wall,
+            timing.cpu,
+            allocated,
+        )
+
+
+# Upper bounds (in seconds) of the buckets of a histogram, from 100µs to 10s.
+DEFAULT_BOUNDS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+@dataclass(kw_only=True)
+class Histogram:
+    bounds: tuple[float, ...] = DEFAULT_BOUNDS
+    # counts[i] is the number of values v with bounds[i-1] < v <= bounds[i].
+    # The last count is for the values larger than all bounds.
+    counts: list[int] = field(default_factory=lambda: [])
+    count: int = 0
+    sum: float = 0.0
+
+    def __post_init__(self):
+        if not self.counts:
+            self.counts = [0] * (len(self.bounds) + 1)
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def copy(self) -> "Histogram":
+        return Histogram(
+            bounds=self.bounds, counts=list(self.counts), count=self.count, sum=self.sum
+        )
+
+
+@dataclass(kw_only=True)
+class StageHistograms:
+    wall: Histogram
+    cpu: Histogram
+
+
+class HistogramHook(Hook):
+    """Histograms of the wall clock and CPU time of every stage.
+
+    Can be used by several threads at once.
+    """
+
+    def __init__(self, bounds: tuple[float, ...] = DEFAULT_BOUNDS):
+        self.bounds = bounds
+        self._stages: dict[str, StageHistograms] = {}
+        self._lock = Lock()
+
+    def stage_done(self, stage: str, timing: Timing):
+        with self._lock:
+            h = self._stages.get(stage)
+            if h is None:
+                h = StageHistograms(
+                    wall=Histogram(bounds=self.bounds),
+                    cpu=Histogram(bounds=self.bounds),
+                )
+                self._stages[stage] = h
+            h.wall.add(timing.wall)
+            h.cpu.add(timing.cpu)
+
+    def snapshot(self) -> dict[str, StageHistograms]:
+        """A copy of the histograms of every stage seen so far."""
+        with self._lock:
+            return {
+                stage: StageHistograms(wall=h.wall.copy(), cpu=h.cpu.copy())
+                for (stage, h) in self._stages.items()
+            }
+
+
+_registered: list[Hook] = []
+
+
+def register(hook: Hook):
+    """Tell hook about the stages of every calculation from now on."""
+    if hook not in _registered:
+        _registered.append(hook)
+
+
+def unregister(hook: Hook):
+    if hook in _registered:
+        _registered.remove(hook)
+
+
+def active_hooks(hooks: Iterable[Hook] = ()) -> list[Hook]:
+    """The registered hooks followed by the given ones."""
+    return [*_registered, *hooks]
+
+
+def timed(hooks: list[Hook], stage: str, f: Callable[[], T]) -> tuple[T, Timing]:
+    """Call f and tell the hooks about it (with stage_failed if f raises)."""
+    for hook in hooks:
+        hook.stage_started(stage)
+    tracing = tracemalloc.is_tracing()
+    allocated_before = tracemalloc.get_traced_memory()[0] if tracing else 0
+    cpu_start = thread_time()
+    start = perf_counter()
+
+    def timing() -> Timing:
+        wall = perf_counter() - start
+        cpu = thread_time() - cpu_start
+        return Timing(
+            wall=wall,
+            cpu=cpu,
+            allocated=tracemalloc.get_traced_memory()[0] - allocated_before
+            if tracing
+            else None,
+        )
+
+    try:
+        value = f()
+    except BaseException as e:
+        failed = timing()
+        for hook in hooks:
+            hook.stage_failed(stage, failed, e)
+        raise
+    done = timing()
+    for hook in hooks:
+        hook.stage_done(stage, done)
+    return (value, done)
@@ -1,7 +1,7 @@
 # pyright: strict
 
 from ..inputs import Inputs
-from ..utils import div
+from ..utils import div, minimum
 from ..lulucf2018.l18 import L18
 from ..lulucf2030.l30 import L30
 from ..agri2030.a30 import A30
@@ -38,7 +38,7 @@ def calc(
     l = l30.l
     g = l30.g
 
-    pyr.CO2e_total = min(
+    pyr.CO2e_total = minimum(
         -(
             h30.h.CO2e_total
             + e30.e.CO2e_total
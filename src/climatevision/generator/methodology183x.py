@@ -3,7 +3,7 @@
 from dataclasses import dataclass, field
 
 from .inputs import Inputs
-from .utils import div
+from .utils import div, where
 
 from .electricity2018.e18 import E18
 from .business2018.b18 import B18
@@ -336,244 +336,214 @@ def calc_budget(
     # reducing the yearly emissions year by year, starting with 2022
 
     # INFO  '> 1' instead '> 0' to avoid having very small numbers such as 0.00000001 and unwanted additional substraction of CO2e_w_lulucf_change_pa
-    if m183X.CO2e_w_lulucf_2021 > 1:
-        m183X.CO2e_w_lulucf_2022 = (
-            m183X.CO2e_w_lulucf_2021 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2022 = 0
+    m183X.CO2e_w_lulucf_2022 = where(
+        m183X.CO2e_w_lulucf_2021 > 1,
+        m183X.CO2e_w_lulucf_2021 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2023
-    if m183X.CO2e_w_lulucf_2022 > 1:
-        m183X.CO2e_w_lulucf_2023 = (
-            m183X.CO2e_w_lulucf_2022 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2023 = 0
+    m183X.CO2e_w_lulucf_2023 = where(
+        m183X.CO2e_w_lulucf_2022 > 1,
+        m183X.CO2e_w_lulucf_2022 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2024
-    if m183X.CO2e_w_lulucf_2023 > 1:
-        m183X.CO2e_w_lulucf_2024 = (
-            m183X.CO2e_w_lulucf_2023 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2024 = 0
+    m183X.CO2e_w_lulucf_2024 = where(
+        m183X.CO2e_w_lulucf_2023 > 1,
+        m183X.CO2e_w_lulucf_2023 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2025
-    if m183X.CO2e_w_lulucf_2024 > 1:
-        m183X.CO2e_w_lulucf_2025 = (
-            m183X.CO2e_w_lulucf_2024 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2025 = 0
+    m183X.CO2e_w_lulucf_2025 = where(
+        m183X.CO2e_w_lulucf_2024 > 1,
+        m183X.CO2e_w_lulucf_2024 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2026
-    if m183X.CO2e_w_lulucf_2025 > 1:
-        m183X.CO2e_w_lulucf_2026 = (
-            m183X.CO2e_w_lulucf_2025 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2026 = 0
+    m183X.CO2e_w_lulucf_2026 = where(
+        m183X.CO2e_w_lulucf_2025 > 1,
+        m183X.CO2e_w_lulucf_2025 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2027
-    if m183X.CO2e_w_lulucf_2026 > 1:
-        m183X.CO2e_w_lulucf_2027 = (
-            m183X.CO2e_w_lulucf_2026 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2027 = 0
+    m183X.CO2e_w_lulucf_2027 = where(
+        m183X.CO2e_w_lulucf_2026 > 1,
+        m183X.CO2e_w_lulucf_2026 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2028
-    if m183X.CO2e_w_lulucf_2027 > 1:
-        m183X.CO2e_w_lulucf_2028 = (
-            m183X.CO2e_w_lulucf_2027 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2028 = 0
+    m183X.CO2e_w_lulucf_2028 = where(
+        m183X.CO2e_w_lulucf_2027 > 1,
+        m183X.CO2e_w_lulucf_2027 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2029
-    if m183X.CO2e_w_lulucf_2028 > 1:
-        m183X.CO2e_w_lulucf_2029 = (
-            m183X.CO2e_w_lulucf_2028 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2029 = 0
+    m183X.CO2e_w_lulucf_2029 = where(
+        m183X.CO2e_w_lulucf_2028 > 1,
+        m183X.CO2e_w_lulucf_2028 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2030
-    if m183X.CO2e_w_lulucf_2029 > 1:
-        m183X.CO2e_w_lulucf_2030 = (
-            m183X.CO2e_w_lulucf_2029 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2030 = 0
+    m183X.CO2e_w_lulucf_2030 = where(
+        m183X.CO2e_w_lulucf_2029 > 1,
+        m183X.CO2e_w_lulucf_2029 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2031
-    if m183X.CO2e_w_lulucf_2030 > 1:
-        m183X.CO2e_w_lulucf_2031 = (
-            m183X.CO2e_w_lulucf_2030 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2031 = 0
+    m183X.CO2e_w_lulucf_2031 = where(
+        m183X.CO2e_w_lulucf_2030 > 1,
+        m183X.CO2e_w_lulucf_2030 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2032
-    if m183X.CO2e_w_lulucf_2031 > 1:
-        m183X.CO2e_w_lulucf_2032 = (
-            m183X.CO2e_w_lulucf_2031 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2032 = 0
+    m183X.CO2e_w_lulucf_2032 = where(
+        m183X.CO2e_w_lulucf_2031 > 1,
+        m183X.CO2e_w_lulucf_2031 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2033
-    if m183X.CO2e_w_lulucf_2032 > 1:
-        m183X.CO2e_w_lulucf_2033 = (
-            m183X.CO2e_w_lulucf_2032 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2033 = 0
+    m183X.CO2e_w_lulucf_2033 = where(
+        m183X.CO2e_w_lulucf_2032 > 1,
+        m183X.CO2e_w_lulucf_2032 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2034
-    if m183X.CO2e_w_lulucf_2033 > 1:
-        m183X.CO2e_w_lulucf_2034 = (
-            m183X.CO2e_w_lulucf_2033 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2034 = 0
+    m183X.CO2e_w_lulucf_2034 = where(
+        m183X.CO2e_w_lulucf_2033 > 1,
+        m183X.CO2e_w_lulucf_2033 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2035
-    if m183X.CO2e_w_lulucf_2034 > 1:
-        m183X.CO2e_w_lulucf_2035 = (
-            m183X.CO2e_w_lulucf_2034 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2035 = 0
+    m183X.CO2e_w_lulucf_2035 = where(
+        m183X.CO2e_w_lulucf_2034 > 1,
+        m183X.CO2e_w_lulucf_2034 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2036
-    if m183X.CO2e_w_lulucf_2035 > 1:
-        m183X.CO2e_w_lulucf_2036 = (
-            m183X.CO2e_w_lulucf_2035 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2036 = 0
+    m183X.CO2e_w_lulucf_2036 = where(
+        m183X.CO2e_w_lulucf_2035 > 1,
+        m183X.CO2e_w_lulucf_2035 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2037
-    if m183X.CO2e_w_lulucf_2036 > 1:
-        m183X.CO2e_w_lulucf_2037 = (
-            m183X.CO2e_w_lulucf_2036 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2037 = 0
+    m183X.CO2e_w_lulucf_2037 = where(
+        m183X.CO2e_w_lulucf_2036 > 1,
+        m183X.CO2e_w_lulucf_2036 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2038
-    if m183X.CO2e_w_lulucf_2037 > 1:
-        m183X.CO2e_w_lulucf_2038 = (
-            m183X.CO2e_w_lulucf_2037 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2038 = 0
+    m183X.CO2e_w_lulucf_2038 = where(
+        m183X.CO2e_w_lulucf_2037 > 1,
+        m183X.CO2e_w_lulucf_2037 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2039
-    if m183X.CO2e_w_lulucf_2038 > 1:
-        m183X.CO2e_w_lulucf_2039 = (
-            m183X.CO2e_w_lulucf_2038 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2039 = 0
+    m183X.CO2e_w_lulucf_2039 = where(
+        m183X.CO2e_w_lulucf_2038 > 1,
+        m183X.CO2e_w_lulucf_2038 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2040
-    if m183X.CO2e_w_lulucf_2039 > 1:
-        m183X.CO2e_w_lulucf_2040 = (
-            m183X.CO2e_w_lulucf_2039 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2040 = 0
+    m183X.CO2e_w_lulucf_2040 = where(
+        m183X.CO2e_w_lulucf_2039 > 1,
+        m183X.CO2e_w_lulucf_2039 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2041
-    if m183X.CO2e_w_lulucf_2040 > 1:
-        m183X.CO2e_w_lulucf_2041 = (
-            m183X.CO2e_w_lulucf_2040 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2041 = 0
+    m183X.CO2e_w_lulucf_2041 = where(
+        m183X.CO2e_w_lulucf_2040 > 1,
+        m183X.CO2e_w_lulucf_2040 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2042
-    if m183X.CO2e_w_lulucf_2041 > 1:
-        m183X.CO2e_w_lulucf_2042 = (
-            m183X.CO2e_w_lulucf_2041 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2042 = 0
+    m183X.CO2e_w_lulucf_2042 = where(
+        m183X.CO2e_w_lulucf_2041 > 1,
+        m183X.CO2e_w_lulucf_2041 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2043
-    if m183X.CO2e_w_lulucf_2042 > 1:
-        m183X.CO2e_w_lulucf_2043 = (
-            m183X.CO2e_w_lulucf_2042 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2043 = 0
+    m183X.CO2e_w_lulucf_2043 = where(
+        m183X.CO2e_w_lulucf_2042 > 1,
+        m183X.CO2e_w_lulucf_2042 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2044
-    if m183X.CO2e_w_lulucf_2043 > 1:
-        m183X.CO2e_w_lulucf_2044 = (
-            m183X.CO2e_w_lulucf_2043 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2044 = 0
+    m183X.CO2e_w_lulucf_2044 = where(
+        m183X.CO2e_w_lulucf_2043 > 1,
+        m183X.CO2e_w_lulucf_2043 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2045
-    if m183X.CO2e_w_lulucf_2044 > 1:
-        m183X.CO2e_w_lulucf_2045 = (
-            m183X.CO2e_w_lulucf_2044 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2045 = 0
+    m183X.CO2e_w_lulucf_2045 = where(
+        m183X.CO2e_w_lulucf_2044 > 1,
+        m183X.CO2e_w_lulucf_2044 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2046
-    if m183X.CO2e_w_lulucf_2045 > 1:
-        m183X.CO2e_w_lulucf_2046 = (
-            m183X.CO2e_w_lulucf_2045 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2046 = 0
+    m183X.CO2e_w_lulucf_2046 = where(
+        m183X.CO2e_w_lulucf_2045 > 1,
+        m183X.CO2e_w_lulucf_2045 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2047
-    if m183X.CO2e_w_lulucf_2046 > 1:
-        m183X.CO2e_w_lulucf_2047 = (
-            m183X.CO2e_w_lulucf_2046 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2047 = 0
+    m183X.CO2e_w_lulucf_2047 = where(
+        m183X.CO2e_w_lulucf_2046 > 1,
+        m183X.CO2e_w_lulucf_2046 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2048
-    if m183X.CO2e_w_lulucf_2047 > 1:
-        m183X.CO2e_w_lulucf_2048 = (
-            m183X.CO2e_w_lulucf_2047 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2048 = 0
+    m183X.CO2e_w_lulucf_2048 = where(
+        m183X.CO2e_w_lulucf_2047 > 1,
+        m183X.CO2e_w_lulucf_2047 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2049
-    if m183X.CO2e_w_lulucf_2048 > 1:
-        m183X.CO2e_w_lulucf_2049 = (
-            m183X.CO2e_w_lulucf_2048 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2049 = 0
+    m183X.CO2e_w_lulucf_2049 = where(
+        m183X.CO2e_w_lulucf_2048 > 1,
+        m183X.CO2e_w_lulucf_2048 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2050
-    if m183X.CO2e_w_lulucf_2049 > 1:
-        m183X.CO2e_w_lulucf_2050 = (
-            m183X.CO2e_w_lulucf_2049 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2050 = 0
+    m183X.CO2e_w_lulucf_2050 = where(
+        m183X.CO2e_w_lulucf_2049 > 1,
+        m183X.CO2e_w_lulucf_2049 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     # 2051
-    if m183X.CO2e_w_lulucf_2050 > 1:
-        m183X.CO2e_w_lulucf_2051 = (
-            m183X.CO2e_w_lulucf_2050 - m183X.CO2e_w_lulucf_change_pa
-        )
-    else:
-        m183X.CO2e_w_lulucf_2051 = 0
+    m183X.CO2e_w_lulucf_2051 = where(
+        m183X.CO2e_w_lulucf_2050 > 1,
+        m183X.CO2e_w_lulucf_2050 - m183X.CO2e_w_lulucf_change_pa,
+        0,
+    )
 
     ##############################################################################################
     ### remaining local greenhouse gas budget after reaching climate neutrality in target year ###
@@ -3,11 +3,16 @@
 """
 # pyright: strict
 
+from array import array
 from dataclasses import dataclass
-from typing import Any, Generic, TypeVar, Callable, Iterable
+from math import nan
+from typing import Any, Generic, TypeVar, Callable, Iterable, Union
 from os import path, getcwd
 import csv
 import json
+import os
+import pickle
+import sys
 
 # TODO: Write small wrappers classes for each data source so that we can document
 # the columns and get better type checking from pylance.
@@ -16,6 +21,10 @@ import json
 # be used when the generator is run by members of GermanZero
 PROPRIETARY_DATA_SOURCES = frozenset(["traffic"])
 
+# Bump this whenever the in memory representation of RefData (or anything it
+# contains) changes, so that snapshots written by older code are not picked up.
+SNAPSHOT_FORMAT = 4
+
 KeyT = TypeVar("KeyT")
 
 
@@ -38,8 +47,55 @@ class MalformedCsv(Exception):
         return f"Excluding the key column row {self.row} of {self.dataset} has {self.row_columns} but row 0 (header) has {self.header_columns} columns"
 
 
+# A column of a DataFrame. Columns that only contain numbers are stored as
+# compact arrays of doubles, everything else as strings (see _typed_column).
+Column = Union["array[float]", list[str]]
+
+
+def _format_float(v: float) -> str:
+    """Format a number from a numeric column the way it (most likely) was written in the CSV."""
+    if v.is_integer():
+        return str(int(v))
+    else:
+        return str(v)
+
+
+def _typed_column(
+    cells: list[str], force_str: bool
+) -> tuple[Column, set[int], dict[int, str]]:
+    """Convert the raw cells of a column. Returns the column, the row numbers of all
+    empty cells (those are stored as NaN in numeric columns) and the text of the
+    numeric cells that _format_float would not give back (e.g. "1.0" or "1e3")."""
+    if force_str:
+        return (cells, set(), {})
+    try:
+        values = array("d", (nan if c == "" else float(c) for c in cells))
+    except ValueError:
+        return (cells, set(), {})
+    return (
+        values,
+        {ndx for ndx, c in enumerate(cells) if c == ""},
+        {
+            ndx: c
+            for ndx, (c, v) in enumerate(zip(cells, values))
+            if c != "" and _format_float(v) != c
+        },
+    )
+
+
 class DataFrame(Generic[KeyT]):
-    _rows: dict[KeyT, list[str]]  # the list does NOT contain the reference value
+    """A table of reference data, indexed by the key column.
+
+    The cells are parsed once when the data is loaded. Columns that contain only
+    numbers (or nothing) are stored as arrays of doubles, all other columns and
+    those explicitly listed in str_columns when loading are kept as strings.
+    """
+
+    _ndx_of_key: dict[KeyT, int]  # row number of each key
+    _columns: list[Column]  # this does NOT contain the key column
+    _empty: list[set[int]]  # per column the row numbers of the empty cells
+    # per column the CSV text of numeric cells that _format_float does not reproduce
+    _raw: list[dict[int, str]]
     header: dict[str, int]
     dataset: str
     key_column: str
@@ -53,6 +109,7 @@ class DataFrame(Generic[KeyT]):
         key_from_raw: Callable[[str], KeyT],
         filename: str = "2018",
         set_nans_to_0_in_columns: list[str] = [],
+        str_columns: list[str] = [],
     ) -> "DataFrame[KeyT]":
         repo = "proprietary" if what in PROPRIETARY_DATA_SOURCES else "public"
         with open(
@@ -63,7 +120,8 @@ class DataFrame(Generic[KeyT]):
         ) as file:
             reader = csv.reader(file)
             header = {}
-            rows = {}
+            rows: list[list[str]] = []
+            ndx_of_key: dict[KeyT, int] = {}
             set_nans_to_0_in_columns_indices = []
             key_column_ndx = 0  # in the original row without the key removed
             for row_num, r in enumerate(reader):
@@ -90,23 +148,38 @@ class DataFrame(Generic[KeyT]):
                             dataset=what,
                         )
                     key = key_from_raw(raw_key)
-                    rows[key] = r
                     for c in set_nans_to_0_in_columns_indices:
                         if r[c] == "":
                             r[c] = "0"
+                    if key in ndx_of_key:
+                        rows[ndx_of_key[key]] = r
+                    else:
+                        ndx_of_key[key] = len(rows)
+                        rows.append(r)
 
         res = cls()
-        res._rows = rows
         if header is not None:
             res.header = header
         else:
             assert False, "Loading DataFrame failed. File was empty"
+        str_column_indices = frozenset(header[k] for k in str_columns)
+        res._ndx_of_key = ndx_of_key
+        res._columns = []
+        res._empty = []
+        res._raw = []
+        for ndx in range(len(header)):
+            column, empty, raw = _typed_column(
+                [r[ndx] for r in rows], force_str=ndx in str_column_indices
+            )
+            res._columns.append(column)
+            res._empty.append(empty)
+            res._raw.append(raw)
         res.dataset = what
         res.key_column = key_column
         return res
 
-    def rows(self) -> Iterable[tuple[KeyT, list[str]]]:
-        return self._rows.items()
+    def keys(self) -> Iterable[KeyT]:
+        return self._ndx_of_key.keys()
 
     @classmethod
     def load_ags(
@@ -115,6 +188,7 @@ class DataFrame(Generic[KeyT]):
         what: str,
         filename: str = "2018",
         set_nans_to_0_in_columns: list[str] = [],
+        str_columns: list[str] = [],
     ):
         return cls.load(
             datadir=datadir,
@@ -123,19 +197,65 @@ class DataFrame(Generic[KeyT]):
             key_from_raw=lambda i: i,
             filename=filename,
             set_nans_to_0_in_columns=set_nans_to_0_in_columns,
+            str_columns=str_columns,
         )
 
-    def get(self, key: KeyT) -> list[str]:
-        return self._rows[key]
+    def ndx_of_key(self, key: KeyT) -> int:
+        """Row number of key. Raises KeyError if there is no such row."""
+        return self._ndx_of_key[key]
+
+    def value(self, row_ndx: int, column_ndx: int) -> float | str | None:
+        """Value of a cell. None if the cell was empty in the CSV."""
+        v = self._columns[column_ndx][row_ndx]
+        if v == "" or (v != v and row_ndx in self._empty[column_ndx]):
+            return None
+        return v
+
+    def str_value(self, row_ndx: int, column_ndx: int) -> str:
+        """Value of a cell as a string (the empty string if the cell was empty).
+
+        For cells read from the CSV that is the text in the CSV.
+        """
+        v = self.value(row_ndx, column_ndx)
+        if v is None:
+            return ""
+        elif isinstance(v, str):
+            return v
+        else:
+            return self._raw[column_ndx].get(row_ndx) or _format_float(v)
 
     def to_dict(self) -> dict[KeyT, dict[str, str]]:
         return {
-            key: {k: row[ndx] for k, ndx in self.header.items()}
-            for (key, row) in self._rows.items()
+            key: {k: self.str_value(row_ndx, ndx) for k, ndx in self.header.items()}
+            for (key, row_ndx) in self._ndx_of_key.items()
         }
 
-    def append_rows(self, rows: dict[KeyT, list[str]]):
-        self._rows.update(rows)
+    def nbytes(self) -> int:
+        """Approximately how much memory the keys and cells take (in bytes)."""
+        size = sys.getsizeof(self._ndx_of_key) + sum(
+            sys.getsizeof(key) for key in self._ndx_of_key
+        )
+        for column, empty, raw in zip(self._columns, self._empty, self._raw):
+            size += sys.getsizeof(column) + sys.getsizeof(empty) + sys.getsizeof(raw)
+            if not isinstance(column, array):
+                size += sum(sys.getsizeof(v) for v in column)
+        return size
+
+    def append_rows(self, rows: dict[KeyT, list[float]]):
+        """Add (or replace) rows."""
+        for key, r in rows.items():
+            if key in self._ndx_of_key:
+                row_ndx = self._ndx_of_key[key]
+                for column, empty, raw, v in zip(
+                    self._columns, self._empty, self._raw, r
+                ):
+                    column[row_ndx] = v if isinstance(column, array) else _format_float(v)  # type: ignore
+                    empty.discard(row_ndx)
+                    raw.pop(row_ndx, None)
+            else:
+                self._ndx_of_key[key] = len(self._ndx_of_key)
+                for column, v in zip(self._columns, r):
+                    column.append(v if isinstance(column, array) else _format_float(v))  # type: ignore
 
 
 def _add_derived_rows_for_summable(df: DataFrame[str]) -> None:
@@ -147,18 +267,20 @@ def _add_derived_rows_for_summable(df: DataFrame[str]) -> None:
     data, we do NOT override or duplicate it.
     """
 
-    def add_to(d: dict[str, list[float]], ags: str, e: list[str]):
+    def add_to(d: dict[str, list[float]], ags: str, e: list[float]):
         if ags in d:
             for column, value in enumerate(e):
-                d[ags][column] += float(value)
+                d[ags][column] += value
         else:
-            d[ags] = [float(x) for x in e]
+            d[ags] = list(e)
 
     sums_by_sta = {}
     sums_by_dis = {}
     already_in_raw_data: set[str] = set()
 
-    for ags, row in df.rows():
+    for ags in df.keys():
+        row_ndx = df.ndx_of_key(ags)
+        row = [float(df.str_value(row_ndx, c)) for c in range(len(df.header))]
         ags_sta = ags[:2] + "000000"
         ags_dis = ags[:5] + "000"
         if ags == ags_sta or ags == ags_dis:
@@ -177,11 +299,8 @@ def _add_derived_rows_for_summable(df: DataFrame[str]) -> None:
         if a in sums_by_sta:
             del sums_by_sta[a]
 
-    def values_as_strs(d: dict[str, list[float]]):
-        return {k: [str(v) for v in r] for (k, r) in d.items()}
-
-    df.append_rows(values_as_strs(sums_by_dis))
-    df.append_rows(values_as_strs(sums_by_sta))
+    df.append_rows(sums_by_dis)
+    df.append_rows(sums_by_sta)
 
 
 @dataclass(kw_only=True)
@@ -239,15 +358,16 @@ class Row(Generic[KeyT]):
         self.key_value = key_value
         self.dataset = df.dataset
         self.header = df.header
+        self.df = df
         try:
-            self.data = df.get(key_value)
+            self.ndx = df.ndx_of_key(key_value)
         except:
             raise RowNotFound(key_column=self.key_column, key_value=key_value, df=df)
 
     def float(self, attr: str) -> float:
         """Access a float attribute."""
-        value = self.data[self.header[attr]]
-        if value == "":
+        value = self.df.value(self.ndx, self.header[attr])
+        if value is None:
             raise FieldNotPopulated(
                 key_column=self.key_column,
                 key_value=self.key_value,
@@ -260,7 +380,7 @@ class Row(Generic[KeyT]):
         """Access an integer attribute."""
         f = self.float(attr)
         if f.is_integer():
-            if isinstance(f, float):  # type: ignore When we monkey patch this for tracing it might actually not be a float
+            if isinstance(f, float):  # type: ignore When tracing this might actually not be a float
                 return int(f)
             else:
                 return f
@@ -274,18 +394,30 @@ class Row(Generic[KeyT]):
 
     def str(self, attr: str) -> str:
         """Access a str attribute."""
-        return str(self.data[self.header[attr]])
+        return self.df.str_value(self.ndx, self.header[attr])
 
     def __str__(self):
         max_key_length = max((len(k) for k in self.header.keys()))
         return "\n".join(
             (
-                k.rjust(max_key_length) + "  " + str(self.data[ndx])
+                k.rjust(max_key_length) + "  " + self.df.str_value(self.ndx, ndx)
                 for (k, ndx) in self.header.items()
             )
         )
 
 
+# Everything but the value of a fact or assumption is text, even if it might look like
+# a number (e.g. a group called "1").
+FACTS_AND_ASSUMPTIONS_STR_COLUMNS = [
+    "group",
+    "description",
+    "unit",
+    "rationale",
+    "reference",
+    "link",
+]
+
+
 @dataclass(kw_only=True)
 class FactOrAssumptionCompleteRow:
     label: str
@@ -311,15 +443,70 @@ class FactOrAssumptionCompleteRow:
         )
 
 
+class ConstantTable:
+    """The values of all facts (or all assumptions) as a flat read-only table of floats.
+
+    The values are resolved once when the reference data is loaded, so a lookup is
+    just a dict access (by label) or a tuple access (by id). Code that uses the same
+    value very often can get the id of the label once and then use by_id.
+    """
+
+    labels: tuple[str, ...]  # label of each id
+    _values: tuple[float, ...]
+    _id_of_label: dict[str, int]
+    _df: DataFrame[str]
+
+    def __init__(self, df: DataFrame[str]):
+        column = df.header["value"]
+        self.labels = tuple(sorted(df.keys(), key=df.ndx_of_key))
+        self._values = tuple(
+            nan if (v := df.value(df.ndx_of_key(label), column)) is None else float(v)
+            for label in self.labels
+        )
+        self._id_of_label = {label: id for (id, label) in enumerate(self.labels)}
+        self._df = df
+
+    def id_of(self, label: str) -> int:
+        try:
+            return self._id_of_label[label]
+        except KeyError:
+            raise RowNotFound(
+                key_column=self._df.key_column, key_value=label, df=self._df
+            )
+
+    def by_id(self, id: int) -> float:
+        v = self._values[id]
+        if v != v:
+            # Raise FieldNotPopulated if the value was not given in the CSV.
+            return Row(self._df, self.labels[id]).float("value")
+        return v
+
+    def by_label(self, label: str) -> float:
+        try:
+            v = self._values[self._id_of_label[label]]
+        except KeyError:
+            raise RowNotFound(
+                key_column=self._df.key_column, key_value=label, df=self._df
+            )
+        if v != v:
+            return Row(self._df, label).float("value")
+        return v
+
+
 @dataclass(kw_only=True)
 class FactsAndAssumptions:
+    facts: ConstantTable
+    assumptions: ConstantTable
+
     def __init__(self, facts: DataFrame[str], assumptions: DataFrame[str]):
         self._facts = facts
         self._assumptions = assumptions
+        self.facts = ConstantTable(facts)
+        self.assumptions = ConstantTable(assumptions)
 
     def fact(self, keyname: str) -> float:
         """Statistics about the past. Must be able to give a source for each fact."""
-        return Row(self._facts, keyname).float("value")
+        return self.facts.by_label(keyname)
 
     def complete_fact(self, keyname: str) -> FactOrAssumptionCompleteRow:
         r = Row(self._facts, keyname)
@@ -331,7 +518,7 @@ class FactsAndAssumptions:
 
     def ass(self, keyname: str) -> float:
         """Similar to fact, but these try to describe the future. And are therefore based on various assumptions."""
-        return Row(self._assumptions, keyname).float("value")
+        return self.assumptions.by_label(keyname)
 
 
 def datadir_or_default(datadir: str | None = None) -> str:
@@ -377,6 +564,7 @@ class RefData:
     _population: DataFrame[str]
     _renewable_energy: DataFrame[str]
     _traffic: DataFrame[str]
+    _version: Version | None
 
     def __init__(
         self,
@@ -398,6 +586,7 @@ class RefData:
         renewable_energy: DataFrame[str],
         traffic: DataFrame[str],
         fix_missing_entries: bool,
+        version: Version | None = None,
     ):
 
         self._area = area
@@ -417,6 +606,7 @@ class RefData:
         self._population = population
         self._renewable_energy = renewable_energy
         self._traffic = traffic
+        self._version = version
 
         if fix_missing_entries:
             self._fix_missing_gemfr_ags()
@@ -435,8 +625,8 @@ class RefData:
 
         def add_zero_rows(df: DataFrame[str]):
             num_columns = len(df.header)
-            missing_ags = all_gemfr - frozenset(df.to_dict().keys())
-            new_rows = {ags: ["0"] * num_columns for ags in missing_ags}
+            missing_ags = all_gemfr - frozenset(df.keys())
+            new_rows = {ags: [0.0] * num_columns for ags in missing_ags}
             df.append_rows(new_rows)
 
         # Some gemeindefreie Communes are not listed in the buildings list.
@@ -455,6 +645,28 @@ class RefData:
     def _fix_add_derived_rows_for_traffic(self):
         _add_derived_rows_for_summable(self._traffic)
 
+    def version(self) -> Version | None:
+        """The version of the reference data as given in production.json (None if there
+        was no production.json in the data directory)."""
+        return self._version
+
+    def nbytes(self) -> int:
+        """Approximately how much memory the reference data takes (in bytes)."""
+        # By id, as the ConstantTables share the frames of FactsAndAssumptions.
+        dfs: dict[int, DataFrame[Any]] = {}
+
+        def collect(obj: object):
+            for v in vars(obj).values():
+                if isinstance(v, DataFrame):
+                    dfs[id(v)] = v  # type: ignore
+                elif isinstance(v, (FactsAndAssumptions, ConstantTable)):
+                    collect(v)
+
+        collect(self)
+        return sum(df.nbytes() for df in dfs.values()) + sum(
+            sys.getsizeof(k) + sys.getsizeof(v) for (k, v) in self._ags_master.items()
+        )
+
     def ags_master(self) -> dict[str, str]:
         """Returns the complete dictionary of AGS, where no big
         changes have happened to the relevant commune. Key is AGS value is description"""
@@ -469,59 +681,68 @@ class RefData:
     def ass(self, keyname: str) -> float:
         return self._facts_and_assumptions.ass(keyname)
 
+    def _row(self, df: DataFrame[KeyT], key_value: KeyT) -> Row[KeyT]:
+        """All rows are created here, so that views of the data can return other rows
+        (see tracing)."""
+        return Row(df, key_value)
+
     def area(self, ags: str):
         """How many hectare of land are used for what (e.g. farmland, traffic, ...) in each community / administrative district and federal state."""
-        return Row(self._area, ags)
+        return self._row(self._area, ags)
 
     def area_kinds(self, ags: str):
-        return Row(self._area_kinds, ags)
+        return self._row(self._area_kinds, ags)
 
     def buildings(self, ags: str):
         """Number of flats. Number of buildings of different age brackets. Connections to heatnet."""
-        return Row(self._buildings, ags)
+        return self._row(self._buildings, ags)
 
     def co2path(self, year: int):
-        return Row(self._co2path, year)
+        return self._row(self._co2path, year)
 
     def destatis(self, ags: str):
         """TODO"""
-        return Row(self._destatis, ags)
+        return self._row(self._destatis, ags)
 
     def flats(self, ags: str):
         """TODO"""
-        return Row(self._flats, ags)
+        return self._row(self._flats, ags)
 
     def nat_agri(self, ags: str):
         """TODO"""
-        return Row(self._nat_agri, ags)
+        return self._row(self._nat_agri, ags)
 
     def nat_organic_agri(self, ags: str):
         """TODO"""
-        return Row(self._nat_organic_agri, ags)
+        return self._row(self._nat_organic_agri, ags)
 
     def nat_energy(self, ags: str):
         """TODO"""
-        return Row(self._nat_energy, ags)
+        return self._row(self._nat_energy, ags)
 
     def nat_res_buildings(self, ags: str):
         """TODO"""
-        return Row(self._nat_res_buildings, ags)
+        return self._row(self._nat_res_buildings, ags)
 
     def population(self, ags: str):
         """How many residents live in each commmunity / administrative district and federal state."""
-        return Row(self._population, ags)
+        return self._row(self._population, ags)
 
     def renewable_energy(self, ags: str):
         """TODO"""
-        return Row(self._renewable_energy, ags)
+        return self._row(self._renewable_energy, ags)
 
     def traffic(self, ags: str):
         """TODO"""
-        return Row(self._traffic, ags)
+        return self._row(self._traffic, ags)
 
     @classmethod
     def load(
-        cls, datadir: str | None = None, *, fix_missing_entries: bool = True
+        cls,
+        datadir: str | None = None,
+        *,
+        fix_missing_entries: bool = True,
+        use_snapshot: bool = True,
     ) -> "RefData":
         """Load all the reference data into memory.  This assumes that the working directory has a subdirectory
         called 'data' that contains the reference data in two subfolders one called 'public' and the other
@@ -529,10 +750,40 @@ class RefData:
 
         If your data directory is somewhere else provide the full path to it.
 
+        Parsing and fixing up the CSV files is by far the most expensive part of starting the generator.
+        So unless use_snapshot is False, the result is written to a snapshot in 'data/snapshots' the first
+        time and read from there on every later call. See `_snapshot_path` for when a snapshot is reused.
+
         TODO: Provide a way to run this even when no proprietary data is available. As of right now unnecessary
         as we can't yet run the generator without the data.
         """
         datadir = datadir_or_default(datadir)
+        try:
+            version = Version.load("production", datadir)
+        except FileNotFoundError:
+            version = None
+
+        if not use_snapshot or version is None:
+            return cls._load_from_csv(
+                datadir, fix_missing_entries=fix_missing_entries, version=version
+            )
+
+        snapshot = _snapshot_path(
+            datadir, version=version, fix_missing_entries=fix_missing_entries
+        )
+        sources = _source_fingerprint(datadir)
+        d = _read_snapshot(snapshot, sources)
+        if d is None:
+            d = cls._load_from_csv(
+                datadir, fix_missing_entries=fix_missing_entries, version=version
+            )
+            _write_snapshot(snapshot, sources, d)
+        return d
+
+    @classmethod
+    def _load_from_csv(
+        cls, datadir: str, *, fix_missing_entries: bool, version: Version | None
+    ) -> "RefData":
         area_0_columns = (
             [
                 "land_settlement",
@@ -568,9 +819,15 @@ class RefData:
             area=DataFrame.load_ags(
                 datadir, "area", set_nans_to_0_in_columns=area_0_columns
             ),
-            area_kinds=DataFrame.load_ags(datadir, "area_kinds"),
+            area_kinds=DataFrame.load_ags(
+                datadir, "area_kinds", str_columns=["rt7", "rt3"]
+            ),
             assumptions=DataFrame.load(
-                datadir, "assumptions", key_column="label", key_from_raw=lambda k: k
+                datadir,
+                "assumptions",
+                key_column="label",
+                key_from_raw=lambda k: k,
+                str_columns=FACTS_AND_ASSUMPTIONS_STR_COLUMNS,
             ),
             buildings=DataFrame.load_ags(datadir, "buildings"),
             co2path=DataFrame.load(
@@ -578,7 +835,11 @@ class RefData:
             ),
             destatis=DataFrame.load_ags(datadir, "destatis"),
             facts=DataFrame.load(
-                datadir, "facts", key_column="label", key_from_raw=lambda k: k
+                datadir,
+                "facts",
+                key_column="label",
+                key_from_raw=lambda k: k,
+                str_columns=FACTS_AND_ASSUMPTIONS_STR_COLUMNS,
             ),
             flats=DataFrame.load_ags(
                 datadir, "flats", set_nans_to_0_in_columns=flats_0_columns
@@ -595,5 +856,85 @@ class RefData:
             renewable_energy=DataFrame.load_ags(datadir, "renewable_energy"),
             traffic=DataFrame.load_ags(datadir, "traffic"),
             fix_missing_entries=fix_missing_entries,
+            version=version,
         )
         return d
+
+
+def _snapshot_path(datadir: str, *, version: Version, fix_missing_entries: bool) -> str:
+    """Where to store the snapshot of the reference data.
+
+    The snapshot is keyed by the hashes in production.json, so switching to a different
+    revision of the data never picks up a stale snapshot.  Local edits to the data
+    repositories are caught by the fingerprint stored inside the snapshot (see
+    `_source_fingerprint`).
+    """
+    fixed_or_raw = "fixed" if fix_missing_entries else "raw"
+    return path.join(
+        datadir,
+        "snapshots",
+        f"refdata-{version.public}-{version.proprietary}-{fixed_or_raw}.pickle",
+    )
+
+
+def _source_fingerprint(datadir: str) -> list[tuple[str, int, int]]:
+    """Path, size and modification time of every CSV file in the data repositories."""
+    res: list[tuple[str, int, int]] = []
+    for repo in ["public", "proprietary"]:
+        repo_dir = path.join(datadir, repo)
+        if not path.isdir(repo_dir):
+            continue
+        for dataset in sorted(os.listdir(repo_dir)):
+            dataset_dir = path.join(repo_dir, dataset)
+            if dataset.startswith(".") or not path.isdir(dataset_dir):
+                continue
+            for filename in sorted(os.listdir(dataset_dir)):
+                if filename.endswith(".csv"):
+                    st = os.stat(path.join(dataset_dir, filename))
+                    res.append(
+                        (path.join(repo, dataset, filename), st.st_size, st.st_mtime_ns)
+                    )
+    return res
+
+
+def _snapshot_header(sources: list[tuple[str, int, int]]) -> dict[str, object]:
+    return {"format": SNAPSHOT_FORMAT, "sources": sources}
+
+
+def _read_snapshot(fname: str, sources: list[tuple[str, int, int]]) -> RefData | None:
+    """Return the snapshot stored in fname, or None if there is no usable snapshot."""
+    try:
+        with open(fname, "rb") as fp:
+            # The header is pickled separately, so we do not have to unpickle
+            # the (much larger) reference data to find out that it is outdated.
+            if pickle.load(fp) != _snapshot_header(sources):
+                return None
+            d = pickle.load(fp)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # A truncated or otherwise unreadable snapshot is not an error, we just
+        # load the data from the CSV files again (and overwrite the snapshot).
+        return None
+    if not isinstance(d, RefData):
+        return None
+    return d
+
+
+def _write_snapshot(
+    fname: str, sources: list[tuple[str, int, int]], refdata: RefData
+) -> None:
+    # Write to a temporary file first and then rename, so that concurrently
+    # starting processes never see a half written snapshot.
+    tmp_fname = f"{fname}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(path.dirname(fname), exist_ok=True)
+        with open(tmp_fname, "wb") as fp:
+            pickle.dump(_snapshot_header(sources), fp, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(refdata, fp, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_fname, fname)
+    except OSError:
+        # E.g. a read only data directory. Not being able to cache the data
+        # only makes the next start slower.
+        if path.exists(tmp_fname):
+            os.remove(tmp_fname)
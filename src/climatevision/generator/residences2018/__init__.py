@@ -564,6 +564,13 @@ def calc(inputs: Inputs) -> R18:
         (p_buildings_total.factor_adapted_to_fec * p_buildings_total.area_m2),
     )
 
+    # These are not reported for 2018 (r30 relies on that). This used to be
+    # done by residences2030.calc, which meant r18 depended on whether r30
+    # was calculated.
+    s_heatnet.CO2e_combustion_based = 0
+    s_solarth.CO2e_combustion_based = 0
+    s_heatpump.CO2e_combustion_based = 0
+
     return R18(
         r=r,
         p=p,
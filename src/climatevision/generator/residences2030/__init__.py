@@ -6,7 +6,7 @@ https://localzero-generator.readthedocs.io/de/latest/sectors/hh_ghd.html
 # pyright: strict
 
 from ..inputs import Inputs
-from ..utils import div, MILLION
+from ..utils import div, where, maximum, minimum, MILLION
 from ..residences2018.r18 import R18
 from ..business2018.b18 import B18
 
@@ -76,7 +76,7 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
         + p_buildings_1996_2004.area_m2
     )  # SUM(p_buildings_until_1919.area_m2:p_buildings_1996_2004.area_m2)
 
-    p_buildings_until_1919.pct_rehab = min(
+    p_buildings_until_1919.pct_rehab = minimum(
         1.0,
         fact("Fact_R_P_ratio_renovated_buildings to_not_renovated_2021")
         + p_buildings_total.rate_rehab_pa
@@ -84,7 +84,7 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
         * r18.p_buildings_until_1919.relative_heat_ratio_buildings_until_2004
         * div(p_buildings_total.area_m2, p_buildings_until_1919.area_m2),
     )
-    p_buildings_1919_1948.pct_rehab = min(
+    p_buildings_1919_1948.pct_rehab = minimum(
         1.0,
         fact("Fact_R_P_ratio_renovated_buildings to_not_renovated_2021")
         + p_buildings_total.rate_rehab_pa
@@ -92,7 +92,7 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
         * r18.p_buildings_1919_1948.relative_heat_ratio_buildings_until_2004
         * div(p_buildings_total.area_m2, p_buildings_1919_1948.area_m2),
     )
-    p_buildings_1919_1948.pct_rehab = min(
+    p_buildings_1919_1948.pct_rehab = minimum(
         1.0,
         fact("Fact_R_P_ratio_renovated_buildings to_not_renovated_2021")
         + p_buildings_total.rate_rehab_pa
@@ -104,7 +104,7 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
         ),
     )
 
-    p_buildings_1949_1978.pct_rehab = min(
+    p_buildings_1949_1978.pct_rehab = minimum(
         1.0,
         fact("Fact_R_P_ratio_renovated_buildings to_not_renovated_2021")
         + p_buildings_total.rate_rehab_pa
@@ -112,7 +112,7 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
         * r18.p_buildings_1949_1978.relative_heat_ratio_buildings_until_2004
         * div(p_buildings_total.area_m2, p_buildings_1949_1978.area_m2),
     )
-    p_buildings_1949_1978.pct_rehab = min(
+    p_buildings_1949_1978.pct_rehab = minimum(
         1.0,
         fact("Fact_R_P_ratio_renovated_buildings to_not_renovated_2021")
         + p_buildings_total.rate_rehab_pa
@@ -123,7 +123,7 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
             p_buildings_1949_1978.area_m2,
         ),
     )
-    p_buildings_1979_1995.pct_rehab = min(
+    p_buildings_1979_1995.pct_rehab = minimum(
         1.0,
         fact("Fact_R_P_ratio_renovated_buildings to_not_renovated_2021")
         + p_buildings_total.rate_rehab_pa
@@ -131,7 +131,7 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
         * r18.p_buildings_1979_1995.relative_heat_ratio_buildings_until_2004
         * div(p_buildings_total.area_m2, p_buildings_1979_1995.area_m2),
     )
-    p_buildings_1996_2004.pct_rehab = min(
+    p_buildings_1996_2004.pct_rehab = minimum(
         1.0,
         fact("Fact_R_P_ratio_renovated_buildings to_not_renovated_2021")
         + p_buildings_total.rate_rehab_pa
@@ -144,7 +144,7 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
     p_buildings_2005_2011.pct_rehab = 1 - p_buildings_2005_2011.pct_nonrehab
     p_buildings_2011_today.pct_rehab = 1 - p_buildings_2011_today.pct_nonrehab
 
-    p_buildings_new.pct_x = max(
+    p_buildings_new.pct_x = maximum(
         div(entries.m_population_com_203X, entries.m_population_com_2018) - 1, 0
     )
 
@@ -517,7 +517,7 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
     )
     s_solarth.power_to_be_installed_pct = entries.h_solartherm_to_be_inst
 
-    s_solarth.energy = max(
+    s_solarth.energy = maximum(
         div(
             r18.p_buildings_total.number_of_buildings,
             r18.p_buildings_total.number_of_buildings
@@ -528,7 +528,7 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
         r18.s_solarth.energy,
     )
 
-    s_heatpump.energy = min(
+    s_heatpump.energy = minimum(
         p_buildings_total.demand_heat_rehab - s_solarth.energy,
         (
             r18.p_buildings_total.energy
@@ -543,16 +543,16 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
         - s_solarth.energy,
     )
 
-    if (
+    s_biomass.energy = where(
         p_buildings_total.energy - s_solarth.energy - s_heatpump.energy
-        < r18.s_biomass.energy + r18.s_heatnet.energy + r18.s_elec_heating.energy
-    ):
-        s_biomass.energy = r18.s_biomass.energy * div(
+        < r18.s_biomass.energy + r18.s_heatnet.energy + r18.s_elec_heating.energy,
+        r18.s_biomass.energy
+        * div(
             p_buildings_total.energy - s_solarth.energy - s_heatpump.energy,
             r18.s_biomass.energy + r18.s_heatnet.energy + r18.s_elec_heating.energy,
-        )
-    else:
-        s_biomass.energy = r18.s_biomass.energy
+        ),
+        r18.s_biomass.energy,
+    )
 
     p_elec_heatpump.demand_electricity = s_heatpump.energy / fact(
         "Fact_R_S_heatpump_mean_annual_performance_factor_all"
@@ -566,16 +566,16 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
         p_elec_heatpump.demand_electricity + p_elec_elcon.demand_electricity
     )  # SUM(p_elec_heatpump.demand_electricity:p_elec_elcon.demand_electricity)
 
-    if (
+    s_elec_heating.energy = where(
         p_buildings_total.energy - s_solarth.energy - s_heatpump.energy
-        < r18.s_biomass.energy + r18.s_heatnet.energy + r18.s_elec_heating.energy
-    ):
-        s_elec_heating.energy = r18.s_elec_heating.energy * div(
+        < r18.s_biomass.energy + r18.s_heatnet.energy + r18.s_elec_heating.energy,
+        r18.s_elec_heating.energy
+        * div(
             p_buildings_total.energy - s_solarth.energy - s_heatpump.energy,
             r18.s_biomass.energy + r18.s_heatnet.energy + r18.s_elec_heating.energy,
-        )
-    else:
-        s_elec_heating.energy = r18.s_elec_heating.energy
+        ),
+        r18.s_elec_heating.energy,
+    )
 
     p_buildings_total.demand_electricity = s_elec_heating.energy
     p.demand_electricity = (
@@ -589,16 +589,16 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
     s_coal.energy = s_coal.pct_energy * s.energy
     s_petrol.energy = s_petrol.pct_energy * s.energy
 
-    if (
+    s_heatnet.energy = where(
         p_buildings_total.energy - s_solarth.energy - s_heatpump.energy
-        < r18.s_biomass.energy + r18.s_heatnet.energy + r18.s_elec_heating.energy
-    ):
-        s_heatnet.energy = r18.s_heatnet.energy * div(
+        < r18.s_biomass.energy + r18.s_heatnet.energy + r18.s_elec_heating.energy,
+        r18.s_heatnet.energy
+        * div(
             p_buildings_total.energy - s_solarth.energy - s_heatpump.energy,
             r18.s_biomass.energy + r18.s_heatnet.energy + r18.s_elec_heating.energy,
-        )
-    else:
-        s_heatnet.energy = r18.s_heatnet.energy
+        ),
+        r18.s_heatnet.energy,
+    )
 
     s_heatnet.pct_energy = div(s_heatnet.energy, s.energy)
     s_solarth.pct_energy = div(s_solarth.energy, s.energy)
@@ -617,7 +617,7 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
 
     s_elec_heating.pct_energy = div(s_elec_heating.energy, s.energy)
 
-    s_emethan.energy = max(
+    s_emethan.energy = maximum(
         0,
         p_buildings_total.energy
         - (sum_fueloil_to_heatpump_energy + s_elec_heating.energy),
@@ -780,10 +780,6 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
         s_petrol.CO2e_combustion_based - r18.s_petrol.CO2e_combustion_based
     )
 
-    # not set in r18
-    r18.s_heatnet.CO2e_combustion_based = (
-        r18.s_solarth.CO2e_combustion_based
-    ) = r18.s_heatpump.CO2e_combustion_based = 0
     s_heatnet.change_CO2e_t = (
         s_heatnet.CO2e_combustion_based - r18.s_heatnet.CO2e_combustion_based
     )
@@ -1087,13 +1083,13 @@ def calc(inputs: Inputs, *, r18: R18, b18: B18) -> R30:
         * entries.m_population_com_2018
         / entries.m_population_nat
     )
-    p_buildings_total.demand_emplo_new = max(
+    p_buildings_total.demand_emplo_new = maximum(
         0, p_buildings_total.demand_emplo - p_buildings_total.emplo_existing
     )
-    s_solarth.demand_emplo_new = max(
+    s_solarth.demand_emplo_new = maximum(
         0, s_solarth.demand_emplo - s_solarth.emplo_existing
     )
-    s_heatpump.demand_emplo_new = max(
+    s_heatpump.demand_emplo_new = maximum(
         0, s_heatpump.demand_emplo - s_heatpump.emplo_existing
     )
     s.demand_emplo_new = s_solarth.demand_emplo_new + s_heatpump.demand_emplo_new
@@ -0,0 +1,111 @@
+"""Convert a Result into the result dict.
+
+This does basically the same as asdict from dataclasses does. The most
+important difference is that classes can contain a list called
+LIFT_INTO_RESULT_DICT and the items of the dicts of the listed fields are
+lifted into the resulting dictionary.
+
+Instead of inspecting every dataclass again and again we generate one
+serializer function per class on first use. It reads the fields in order
+(which matters for tracing, where the first path to a number becomes its name,
+see tracing/views.py) and already knows which fields are dataclasses and which
+are lifted.
+"""
+
+# pyright: strict
+
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable
+
+Serializer = Callable[[Any], dict[str, object]]
+
+# The names of the fields that become items of the result dict (in the order
+# of the fields) and of those that are lifted into it (in the order of
+# LIFT_INTO_RESULT_DICT).
+Layout = tuple[tuple[str, ...], tuple[str, ...]]
+
+# Fields with these types are copied as is (they may also contain
+# TracedNumbers, Formulas or numpy arrays, which are never dataclasses).
+_PLAIN_TYPES = (float, int, str, bool)
+
+_serializers: dict[type, Serializer] = {}
+_layouts: dict[type, Layout] = {}
+
+
+def layout(cls: type) -> Layout:
+    """The layout of the result dict of the dataclass cls."""
+    result = _layouts.get(cls)
+    if result is None:
+        names = tuple(f.name for f in fields(cls))
+        names_to_lift = tuple(getattr(cls, "LIFT_INTO_RESULT_DICT", []))
+        for name in names_to_lift:
+            assert name in names, f"{cls.__name__} has no field {name} to lift"
+        result = (tuple(n for n in names if n not in names_to_lift), names_to_lift)
+        _layouts[cls] = result
+    return result
+
+
+def _convert_item(v: object) -> object:
+    if is_dataclass(v) and not isinstance(v, type):
+        return serializer(type(v))(v)
+    else:
+        return v
+
+
+def not_a_dict(name: str, v: object):
+    assert (
+        False
+    ), f"LIFT_INTO_RESULT_DICT encountered {v} at {name} -- which is not a dictionary"
+
+
+def _source_of_serializer(cls: type, namespace: dict[str, Any]) -> str:
+    lines = ["def serialize(v):"]
+    items: list[str] = []
+    (_, names_to_lift) = layout(cls)
+    for (ndx, f) in enumerate(fields(cls)):
+        local = f"f{ndx}"
+        t: object = f.type
+        if isinstance(t, type) and is_dataclass(t):
+            # Still check the type of the value, it might be a subclass.
+            namespace[f"_t{ndx}"] = t
+            namespace[f"_s{ndx}"] = serializer(t)
+            lines.append(f"    {local} = v.{f.name}")
+            lines.append(
+                f"    {local} = _s{ndx}({local}) if type({local}) is _t{ndx}"
+                f" else _convert_item({local})"
+            )
+        elif t in _PLAIN_TYPES:
+            lines.append(f"    {local} = v.{f.name}")
+        else:
+            lines.append(f"    {local} = _convert_item(v.{f.name})")
+        if f.name in names_to_lift:
+            lines.append(f"    if not isinstance({local}, dict):")
+            lines.append(f"        _not_a_dict({f.name!r}, {local})")
+        else:
+            items.append(f"{f.name!r}: {local}")
+    # Lifted values are added in the order of LIFT_INTO_RESULT_DICT.
+    names = [f.name for f in fields(cls)]
+    for name in names_to_lift:
+        items.append(f"**f{names.index(name)}")
+    lines.append("    return {" + ", ".join(items) + "}")
+    return "\n".join(lines) + "\n"
+
+
+def serializer(cls: type) -> Serializer:
+    """The function that converts instances of the dataclass cls to dicts."""
+    s = _serializers.get(cls)
+    if s is None:
+        namespace: dict[str, Any] = {
+            "_convert_item": _convert_item,
+            "_not_a_dict": not_a_dict,
+        }
+        source = _source_of_serializer(cls, namespace)
+        code = compile(source, f"<result dict of {cls.__qualname__}>", "exec")
+        exec(code, namespace)
+        s = namespace["serialize"]
+        _serializers[cls] = s
+    return s
+
+
+def dataclass_to_result_dict(v: object) -> dict[str, object]:
+    return serializer(type(v))(v)
@@ -0,0 +1,223 @@
+"""Write a Result (or any JSON ready value) as JSON without building the result dict.
+
+The output is the same as json.dump(result.result_dict(), ...) would produce,
+but we walk the dataclasses directly and write the JSON in chunks as we go.
+Only one path of the tree is held in memory at any time, which matters for
+traced results where every number carries a large trace (see tracing).
+"""
+
+# pyright: strict
+
+from dataclasses import is_dataclass
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Iterator, Protocol, Sequence
+
+from . import resultdict
+
+# Chunks are written once they reach this many characters.
+CHUNK_SIZE = 64 * 1024
+
+Default = Callable[[Any], Any]
+
+
+class Writer(Protocol):
+    def write(self, s: str, /) -> Any:
+        ...
+
+
+def items(v: object) -> dict[str, object]:
+    """The items of the result dict of the dataclass v, without converting the
+    values (see resultdict.py for the handling of LIFT_INTO_RESULT_DICT).
+    """
+    (names, names_to_lift) = resultdict.layout(type(v))
+    result = {name: getattr(v, name) for name in names}
+    for name in names_to_lift:
+        x = getattr(v, name)
+        if is_dataclass(x) and not isinstance(x, type):
+            result.update(items(x))
+        elif isinstance(x, dict):
+            result.update(x)  # type: ignore
+        else:
+            resultdict.not_a_dict(name, x)
+    return result
+
+
+def _children(v: object) -> dict[str, object] | None:
+    if isinstance(v, dict):
+        return v  # type: ignore
+    elif is_dataclass(v) and not isinstance(v, type):
+        return items(v)
+    else:
+        return None
+
+
+def leaves(
+    v: object, path: tuple[str, ...] = ()
+) -> Iterator[tuple[tuple[str, ...], Any]]:
+    """All values in v that are neither dicts nor dataclasses and their paths.
+
+    The order is the order of the keys in the result dict.
+    """
+    children = _children(v)
+    if children is None:
+        yield (path, v)
+    else:
+        for (k, x) in children.items():
+            yield from leaves(x, path + (k,))
+
+
+def _float(v: float) -> str:
+    if v != v:
+        return "NaN"
+    elif v == float("inf"):
+        return "Infinity"
+    elif v == -float("inf"):
+        return "-Infinity"
+    else:
+        return float.__repr__(v)
+
+
+class _Encoder:
+    write: Callable[[str], Any]
+    indent: str | None
+    item_separator: str
+    key_separator: str
+    default: Default | None
+    _parts: list[str]
+    _size: int
+
+    def __init__(
+        self,
+        write: Callable[[str], Any],
+        *,
+        indent: int | None,
+        compact: bool,
+        default: Default | None,
+    ):
+        self.write = write
+        self.indent = None if indent is None or compact else " " * indent
+        if compact:
+            (self.item_separator, self.key_separator) = (",", ":")
+        elif indent is not None:
+            (self.item_separator, self.key_separator) = (",", ": ")
+        else:
+            (self.item_separator, self.key_separator) = (", ", ": ")
+        self.default = default
+        self._parts = []
+        self._size = 0
+
+    def emit(self, s: str):
+        self._parts.append(s)
+        self._size += len(s)
+        if self._size >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self.write("".join(self._parts))
+            self._parts = []
+            self._size = 0
+
+    def _open(self, bracket: str, level: int) -> str:
+        if self.indent is None:
+            return bracket
+        return bracket + "\n" + self.indent * (level + 1)
+
+    def _separator(self, level: int) -> str:
+        if self.indent is None:
+            return self.item_separator
+        return self.item_separator + "\n" + self.indent * (level + 1)
+
+    def _close(self, bracket: str, level: int) -> str:
+        if self.indent is None:
+            return bracket
+        return "\n" + self.indent * level + bracket
+
+    def value(self, v: Any, level: int):
+        if isinstance(v, str):
+            self.emit(encode_basestring_ascii(v))
+        elif v is None:
+            self.emit("null")
+        elif v is True:
+            self.emit("true")
+        elif v is False:
+            self.emit("false")
+        elif isinstance(v, int):
+            self.emit(int.__repr__(v))
+        elif isinstance(v, float):
+            self.emit(_float(v))
+        elif isinstance(v, (list, tuple)):
+            self.sequence(v, level)  # type: ignore
+        else:
+            children = _children(v)
+            if children is not None:
+                self.mapping(children, level)
+            elif self.default is not None:
+                self.value(self.default(v), level)
+            else:
+                raise TypeError(
+                    f"Object of type {type(v).__name__} is not JSON serializable"
+                )
+
+    def mapping(self, d: dict[str, object], level: int):
+        if not d:
+            self.emit("{}")
+            return
+        self.emit(self._open("{", level))
+        separator = self._separator(level)
+        first = True
+        for (k, x) in d.items():
+            if not first:
+                self.emit(separator)
+            first = False
+            if not isinstance(k, str):  # type: ignore
+                raise TypeError(f"keys must be str, not {type(k).__name__}")
+            self.emit(encode_basestring_ascii(k) + self.key_separator)
+            self.value(x, level + 1)
+        self.emit(self._close("}", level))
+
+    def sequence(self, a: Sequence[Any], level: int):
+        if not a:
+            self.emit("[]")
+            return
+        self.emit(self._open("[", level))
+        separator = self._separator(level)
+        for (ndx, x) in enumerate(a):
+            if ndx > 0:
+                self.emit(separator)
+            self.value(x, level + 1)
+        self.emit(self._close("]", level))
+
+
+def dump(
+    v: object,
+    fp: Writer,
+    *,
+    indent: int | None = None,
+    compact: bool = False,
+    default: Default | None = None,
+):
+    """Write v as JSON to fp. Dataclasses are written as their result dict.
+
+    Without compact the output is the same as that of json.dump with the given
+    indent, with compact no whitespace is written. default is called for values
+    that can not be written otherwise and should return something that can.
+    """
+    encoder = _Encoder(fp.write, indent=indent, compact=compact, default=default)
+    encoder.value(v, 0)
+    encoder.flush()
+
+
+def dumps(
+    v: object,
+    *,
+    indent: int | None = None,
+    compact: bool = False,
+    default: Default | None = None,
+) -> str:
+    """Like dump, but returns the JSON."""
+    parts: list[str] = []
+    encoder = _Encoder(parts.append, indent=indent, compact=compact, default=default)
+    encoder.value(v, 0)
+    encoder.flush()
+    return "".join(parts)
@@ -0,0 +1,151 @@
+"""Results as flat vectors of float64.
+
+The result dicts of all AGS have the same shape: The same few thousand
+leaves, each of which is a number or None. A Schema lists the paths of those
+leaves (e.g. "h30.p_heatnet.CO2e_total") and so assigns every leaf a fixed
+offset. A result is then just one vector of float64 plus the id of its schema.
+
+The schema is taken from the dataclasses of the result (and not only from
+the annotations of Result), as some fields hold subclasses of their declared
+type. Ints are stored as floats and None as NULL (a NaN that is distinguishable
+from the NaN the calculation might produce). Empty dicts are not kept.
+"""
+
+# pyright: strict
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Mapping
+import hashlib
+import struct
+import threading
+
+import numpy as np
+import numpy.typing as npt
+
+Vector = npt.NDArray[np.float64]
+
+# The bit pattern of NULL, a quiet NaN with a payload.
+NULL_BITS = 0x7FF8_0000_0000_0001
+NULL: float = struct.unpack("<d", struct.pack("<Q", NULL_BITS))[0]
+
+# Header of a packed vector: magic, schema id, number of values.
+_MAGIC = b"CVR1"
+_HEADER = struct.Struct("<4s32sI")
+
+
+@dataclass(kw_only=True, frozen=True)
+class Schema:
+    paths: tuple[str, ...]
+    id: str = field(init=False)
+    offsets: dict[str, int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        digest = hashlib.sha256("\n".join(self.paths).encode()).hexdigest()
+        object.__setattr__(self, "id", digest[:32])
+        offsets = {p: ndx for (ndx, p) in enumerate(self.paths)}
+        object.__setattr__(self, "offsets", offsets)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def result_dict(self, vector: Vector) -> dict[str, Any]:
+        """The result dict of vector (with floats instead of ints)."""
+        if vector.shape != (len(self.paths),):
+            raise ValueError(f"Expected {len(self.paths)} values, got {vector.shape}")
+        null = is_null(vector).tolist()
+        result: dict[str, Any] = {}
+        for (path, v, n) in zip(self.paths, vector.tolist(), null):
+            *parents, name = path.split(".")
+            d = result
+            for p in parents:
+                d = d.setdefault(p, {})
+            d[name] = None if n else v
+        return result
+
+
+# The schemas kept by _schema. There is usually only one, but results of
+# calculations that failed half way (or of old code) may have others.
+MAX_SCHEMAS = 16
+
+# The schemas seen last, least recently used first.
+_schemas: OrderedDict[tuple[str, ...], Schema] = OrderedDict()
+_schemas_lock = threading.Lock()
+
+
+def _flatten(d: Mapping[str, Any], prefix: str, paths: list[str], values: list[object]):
+    for (k, v) in d.items():
+        if isinstance(v, dict):
+            _flatten(v, prefix + k + ".", paths, values)  # type: ignore
+        else:
+            paths.append(prefix + k)
+            values.append(v)
+
+
+def _schema(paths: list[str]) -> Schema:
+    key = tuple(paths)
+    with _schemas_lock:
+        schema = _schemas.get(key)
+        if schema is not None:
+            _schemas.move_to_end(key)
+            return schema
+    schema = Schema(paths=key)
+    with _schemas_lock:
+        _schemas[key] = schema
+        if len(_schemas) > MAX_SCHEMAS:
+            _schemas.popitem(last=False)
+    return schema
+
+
+def schema_by_id(id: str) -> Schema | None:
+    """A schema returned by vector_of_result_dict before (in this process), if
+    it is one of the last MAX_SCHEMAS schemas."""
+    with _schemas_lock:
+        for schema in _schemas.values():
+            if schema.id == id:
+                return schema
+    return None
+
+
+def vector_of_result_dict(result_dict: Mapping[str, Any]) -> tuple[Schema, Vector]:
+    """The schema and the values of a result dict (see Result.result_dict).
+
+    Raises TypeError if a leaf is neither a number nor None.
+    """
+    paths: list[str] = []
+    values: list[object] = []
+    _flatten(result_dict, "", paths, values)
+    for (path, v) in zip(paths, values):
+        if v is not None and not isinstance(v, (int, float)):
+            raise TypeError(f"{path} is a {type(v).__name__} and not a number")
+    vector = np.array([NULL if v is None else v for v in values], dtype=np.float64)
+    return (_schema(paths), vector)
+
+
+def is_null(vector: Vector) -> npt.NDArray[np.bool_]:
+    return vector.view(np.uint64) == NULL_BITS
+
+
+def stack(schema: Schema, vectors: Iterable[tuple[Schema, Vector]]) -> Vector:
+    """A matrix with one row per vector, all of which must have the given schema."""
+    rows: list[Vector] = []
+    for (s, v) in vectors:
+        if s.id != schema.id:
+            raise ValueError(f"Expected schema {schema.id}, got {s.id}")
+        rows.append(v)
+    return np.stack(rows) if rows else np.zeros((0, len(schema)), dtype=np.float64)
+
+
+def pack(schema: Schema, vector: Vector) -> bytes:
+    """The schema id and values of vector as bytes (the values little endian)."""
+    header = _HEADER.pack(_MAGIC, schema.id.encode(), len(vector))
+    return header + vector.astype("<f8").tobytes()
+
+
+def unpack(data: bytes) -> tuple[str, Vector]:
+    """The schema id and the values packed by pack."""
+    (magic, id, count) = _HEADER.unpack_from(data)
+    if magic != _MAGIC or len(data) != _HEADER.size + 8 * count:
+        raise ValueError("Not a packed result vector")
+    vector = np.frombuffer(data, dtype="<f8", offset=_HEADER.size)
+    return (id.decode(), vector.astype(np.float64))
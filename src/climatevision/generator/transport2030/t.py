@@ -3,6 +3,7 @@
 from dataclasses import dataclass
 
 from ..transport2018.t18 import T18
+from ..utils import always
 
 from .energy_demand import (
     Air,
@@ -117,7 +118,7 @@ class T:
                 transport2018=t18.t,
             ),
         )
-        assert (
+        assert always(
             required_domestic_transport_capacity_pkm
             <= res.transport.transport_capacity_pkm
         ), "We should know have at least as much provided transport capacity as we required initially"
@@ -1,23 +1,108 @@
 """Module utils -- some useful classes or functions.
 
+Most of the helpers here come in pairs: the plain python behaviour for a
+single calculation and an element wise numpy behaviour for when the values
+are arrays with one entry per AGS (see batch.py). The scalar branch must stay
+the one we had before so that single (and traced) runs are not affected.
+
+They also hand Symbolic values (see climatevision.compiler) to the value
+itself, as there the operation has to be recorded instead of done.
 """
 # pyright: strict
 
+from abc import ABC, abstractmethod
 from dataclasses import fields
-from typing import TypeVar
+from typing import Any, TypeVar
+
+import numpy as np
 
 MILLION = 1000000
 
 
+class Symbolic(ABC):
+    """Base class of values that stand for a formula rather than a number."""
+
+    @abstractmethod
+    def apply(self, op: str, *args: Any) -> Any:
+        """Record the helper op (e.g. "div" or "maximum") applied to args."""
+
+
 def div(a: float, b: float) -> float:
     """
     Percentage calculations usually imply a division. For some municipalities, however,
     the data may be incomplete or irrelevant and the denominator happens to be zero.
     In this case, a result of 0 is returned, also to avoid an exception.
     """
+    if isinstance(b, np.ndarray):
+        zero: Any = b == 0.0
+        return np.where(zero, 0.0, a / np.where(zero, 1.0, b))  # type: ignore
+    if isinstance(b, Symbolic):
+        return b.apply("div", a, b)
     return 0.0 if b == 0.0 else a / b
 
 
+def maximum(a: float, b: float) -> float:
+    """max(a, b), but element wise if either of them is an array."""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.maximum(a, b)  # type: ignore
+    if isinstance(a, Symbolic):
+        return a.apply("maximum", a, b)
+    if isinstance(b, Symbolic):
+        return b.apply("maximum", a, b)
+    return max(a, b)
+
+
+def minimum(a: float, b: float) -> float:
+    """min(a, b), but element wise if either of them is an array."""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.minimum(a, b)  # type: ignore
+    if isinstance(a, Symbolic):
+        return a.apply("minimum", a, b)
+    if isinstance(b, Symbolic):
+        return b.apply("minimum", a, b)
+    return min(a, b)
+
+
+def where(cond: object, if_true: float, if_false: float) -> float:
+    """`if_true if cond else if_false`, but element wise if cond is an array.
+
+    Note that unlike the conditional expression both sides are always evaluated.
+    """
+    if isinstance(cond, np.ndarray):
+        return np.where(cond, if_true, if_false)  # type: ignore
+    if isinstance(cond, Symbolic):
+        return cond.apply("where", cond, if_true, if_false)
+    return if_true if cond else if_false
+
+
+def uniform(cond: object) -> bool:
+    """Use this for conditions that select a different code path (rather than a
+    different value). When cond is an array all entries must agree, which is
+    why batch.py groups the AGS by those conditions before calculating.
+    """
+    if isinstance(cond, np.ndarray):
+        if cond.all():
+            return True
+        if not cond.any():
+            return False
+        raise ValueError("condition is not the same for all AGS of the batch")
+    if isinstance(cond, Symbolic):
+        raise ValueError("condition depends on the entries")
+    return bool(cond)
+
+
+def always(cond: object) -> bool:
+    """For asserts: does cond hold (for all AGS of the batch if cond is an array)?
+
+    Symbolic conditions can not be checked and are assumed to hold.
+    """
+    if isinstance(cond, np.ndarray):
+        return bool(cond.all())
+    if isinstance(cond, Symbolic):
+        return True
+    return bool(cond)
+
+
 T = TypeVar("T")
 
 
@@ -0,0 +1,706 @@
+# pyright: strict
+"""A concurrent HTTP server for the generator RPCs.
+
+Every HTTP request is handled in its own thread. The expensive RPCs
+(calculate, calculate-vector, explain, dependents and make-entries) are passed
+on to a bounded set of worker processes, the cheap ones are answered directly
+in the request thread.
+Every worker has a pool of its own. calculate and calculate-vector of the same
+(ags, year) always go to the same worker, which keeps the previous evaluation
+of it (see GeneratorRpcs.calculate_incrementally). The other RPCs go to the
+worker with the fewest jobs.
+Results of calculate are cached in the server process (see resultcache), so
+all workers share one cache. So are the indexes of dependents, which are only
+built in a worker if they are not in the cache.
+
+The jobs of calculate-many are spread over the workers and the response is
+streamed: The items of the result are written as soon as their job is done.
+
+GET /metrics returns the request counts, latencies and response sizes per RPC
+and the state of the cache and the workers in the Prometheus text format (see
+metrics).
+
+We use processes and not threads for the workers, because the calculation is
+CPU bound. The workers are forked after the reference data was loaded, so they
+all share one copy of it with the server.
+"""
+
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    TimeoutError,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from typing import Any, Callable, Generator, Iterator, TypeVar
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import zlib
+
+import jsonrpcserver
+
+from ..generator import RefData
+from ..tracing.dependencies import DependencyIndex, dependency_index
+from . import metrics
+from .rpcs import (
+    DEFAULT_CACHE_BYTES,
+    JOB_ERROR,
+    TRACE_FORMATS,
+    GeneratorRpcs,
+    dependents_params,
+    jobs_params,
+)
+
+T = TypeVar("T")
+
+# These are dispatched to the worker processes.
+POOLED_METHODS = frozenset(
+    ["calculate", "calculate-vector", "explain", "dependents", "make-entries"]
+)
+
+# These keep the previous evaluation of their (ags, year) in the worker.
+INCREMENTAL_METHODS = frozenset(["calculate", "calculate-vector"])
+
+# JSON-RPC error codes (-32000 to -32099 are reserved for the server).
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+TIMEOUT_ERROR = -32001
+WORKER_ERROR = -32002
+
+
+@dataclass(kw_only=True)
+class ServerConfig:
+    host: str = ""
+    port: int = 4070
+    # Number of worker processes.
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    # Seconds until we give up on a request. The worker still finishes the
+    # calculation, but the client gets an error right away.
+    timeout: float = 120.0
+    # Requests that are running or waiting for a worker. If there are more we
+    # answer with 503, so that a load balancer can try another instance.
+    max_pending: int = 64
+    max_request_bytes: int = 5 * 1024 * 1024
+    # Budget of the cache of calculate results.
+    cache_bytes: int = DEFAULT_CACHE_BYTES
+    api_path: str = "/localzero/api/v0/"
+    metrics_path: str = "/metrics"
+    # path -> (content type, content) of static files served on GET.
+    static_files: dict[str, tuple[str, bytes]] = field(
+        default_factory=dict[str, tuple[str, bytes]]
+    )
+
+
+# The rpcs of a worker process (see _init_worker).
+_worker_rpcs: GeneratorRpcs | None = None
+
+
+def _init_worker(rd: RefData):
+    global _worker_rpcs
+    # The results are cached by the server process.
+    _worker_rpcs = GeneratorRpcs(rd, cache_bytes=0)
+
+
+def _dispatch_in_worker(request: str) -> str:
+    assert _worker_rpcs is not None
+    try:
+        return jsonrpcserver.dispatch(request, methods=_worker_rpcs.methods())  # type: ignore
+    except Exception as e:
+        # Not all our exceptions can be unpickled in the server (e.g. RowNotFound)
+        # and if that fails the whole pool breaks.
+        raise RuntimeError(repr(e)) from None
+
+
+def _calculate_json_in_worker(params: dict[str, Any]) -> str:
+    assert _worker_rpcs is not None
+    try:
+        return _worker_rpcs.calculate_json(**params)
+    except Exception as e:
+        # Not all our exceptions can be unpickled in the server (e.g. RowNotFound)
+        # and if that fails the whole pool breaks.
+        raise RuntimeError(repr(e)) from None
+
+
+def _dependency_index_in_worker(key: tuple[str, int]) -> DependencyIndex:
+    assert _worker_rpcs is not None
+    (ags, year) = key
+    try:
+        return dependency_index(_worker_rpcs.rd, ags, year)
+    except Exception as e:
+        # Not all our exceptions can be unpickled in the server (e.g. RowNotFound)
+        # and if that fails the whole pool breaks.
+        raise RuntimeError(repr(e)) from None
+
+
+def _ping() -> None:
+    pass
+
+
+def _ags_year_key(params: Any) -> str | None:
+    """The (ags, year) of the params of a method in INCREMENTAL_METHODS as a
+    string, None if they do not have one."""
+    if isinstance(params, dict):
+        ags: Any = params.get("ags")  # type: ignore
+        year: Any = params.get("year")  # type: ignore
+    elif isinstance(params, list) and len(params) >= 2:  # type: ignore
+        (ags, year) = (params[0], params[1])  # type: ignore
+    else:
+        return None
+    return json.dumps([ags, year])
+
+
+def _error_response(request_id: object, code: int, message: str) -> str:
+    return json.dumps(
+        {
+            "jsonrpc": "2.0",
+            "error": {"code": code, "message": message},
+            "id": request_id,
+        }
+    )
+
+
+def _result_response(request_id: object, result_json: str) -> str:
+    return (
+        f'{{"jsonrpc": "2.0", "result": {result_json}, "id": {json.dumps(request_id)}}}'
+    )
+
+
+def _job_result(ndx: int, result_json: str) -> str:
+    return f'{{"job": {ndx}, "result": {result_json}}}'
+
+
+def _job_error(ndx: int, code: int, message: str) -> str:
+    return json.dumps({"job": ndx, "error": {"code": code, "message": message}})
+
+
+# The chunks of a streamed response body.
+Chunks = Generator[str, None, None]
+
+
+class Stream:
+    """A streamed response body.
+
+    on_close is called once the stream is closed, also when that happens before
+    it was iterated (e.g. because sending the headers failed).
+    """
+
+    # Characters (JSON is ASCII, so bytes) of the chunks iterated so far.
+    size: int
+    _chunks: "Chunks | Stream"
+    _on_close: Callable[[], None]
+    _closed: bool
+
+    def __init__(self, chunks: "Chunks | Stream", on_close: Callable[[], None]):
+        self.size = 0
+        self._chunks = chunks
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self._chunks:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._chunks.close()
+        finally:
+            self._on_close()
+
+
+def _parse(request: str) -> Any:
+    """The parsed request or None if it is not valid JSON."""
+    try:
+        return json.loads(request)
+    except ValueError:
+        return None
+
+
+# The position of the trace argument of the methods that have one, for requests
+# that pass the arguments by position.
+_TRACE_POSITION = {"calculate": 3, "make-entries": 2}
+
+
+def _wants_trace(method: str, params: Any) -> bool:
+    if isinstance(params, dict):
+        return params.get("trace") is True  # type: ignore
+    position = _TRACE_POSITION.get(method)
+    if position is not None and isinstance(params, list) and len(params) > position:  # type: ignore
+        return params[position] is True
+    return False
+
+
+class WorkerFailed(Exception):
+    status: int  # HTTP status
+    response: str
+
+    def __init__(self, status: int, request_id: object, code: int, message: str):
+        self.status = status
+        self.response = _error_response(request_id, code, message)
+
+
+class RpcServer(ThreadingHTTPServer):
+    """Serve the GeneratorRpcs (and some static files) at config.api_path.
+
+    Call start_workers before serve_forever.
+    """
+
+    config: ServerConfig
+    rpcs: GeneratorRpcs
+    # One pool with a single worker process per worker.
+    pools: list[ProcessPoolExecutor]
+    draining: bool
+    request_metrics: metrics.RequestMetrics
+    _pending: threading.BoundedSemaphore
+    _pool_lock: threading.Lock
+    # Jobs submitted to each pool that are not done yet.
+    _pool_jobs: list[int]
+    _pool_jobs_lock: threading.Lock
+    _method_names: frozenset[str]
+    _refdata_bytes: int
+
+    # Wait for the running requests in server_close.
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(self, rd: RefData, config: ServerConfig):
+        super().__init__((config.host, config.port), _Handler)
+        self.config = config
+        self.rpcs = GeneratorRpcs(rd, cache_bytes=config.cache_bytes)
+        self.pools = [self._new_pool() for _ in range(config.workers)]
+        self._pool_lock = threading.Lock()
+        self.draining = False
+        self.request_metrics = metrics.RequestMetrics()
+        self._pending = threading.BoundedSemaphore(config.max_pending)
+        self._pool_jobs = [0] * config.workers
+        self._pool_jobs_lock = threading.Lock()
+        self._method_names = frozenset(self.rpcs.methods())
+        self._refdata_bytes = rd.nbytes()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(self.rpcs.rd,),
+        )
+
+    def start_workers(self):
+        """Fork the workers now, before any request threads exist."""
+        for future in [pool.submit(_ping) for pool in self.pools]:
+            future.result()
+
+    def _replace_broken_pool(self, broken: ProcessPoolExecutor):
+        """A pool whose worker died (e.g. killed by the OOM killer) can not be used anymore."""
+        with self._pool_lock:
+            for (ndx, pool) in enumerate(self.pools):
+                if pool is broken:
+                    broken.shutdown(wait=False)
+                    self.pools[ndx] = self._new_pool()
+
+    def _submit(
+        self, fn: Callable[[Any], T], arg: Any, key: str | None = None
+    ) -> "tuple[ProcessPoolExecutor, Future[T]]":
+        """Submit fn(arg) to the pool of key (see _ags_year_key) or, without a key,
+        to the pool with the fewest jobs. Counts the jobs that are not done yet.
+
+        Returns the pool and the future. A broken pool is replaced and
+        BrokenProcessPool raised.
+        """
+        with self._pool_jobs_lock:
+            if key is None:
+                ndx = min(range(len(self.pools)), key=lambda n: self._pool_jobs[n])
+            else:
+                ndx = zlib.crc32(key.encode()) % len(self.pools)
+            self._pool_jobs[ndx] += 1
+        pool = self.pools[ndx]
+
+        def done(_: "Future[T] | None"):
+            with self._pool_jobs_lock:
+                self._pool_jobs[ndx] -= 1
+
+        try:
+            future = pool.submit(fn, arg)
+        except BrokenProcessPool:
+            done(None)
+            self._replace_broken_pool(pool)
+            raise
+        except BaseException:
+            done(None)
+            raise
+        future.add_done_callback(done)
+        return (pool, future)
+
+    def render_metrics(self) -> str:
+        with self._pool_jobs_lock:
+            pool_jobs = list(self._pool_jobs)
+        return metrics.render(
+            self.request_metrics,
+            cache=self.rpcs.result_cache.stats(),
+            workers=self.config.workers,
+            pool_jobs=pool_jobs,
+            refdata_bytes=self._refdata_bytes,
+            data_version=self.rpcs.rd.version(),
+        )
+
+    def _metric_labels(self, parsed: Any) -> tuple[str, bool]:
+        """The method (as reported in the metrics) and whether traces were requested."""
+        if parsed is None:
+            return ("invalid", False)
+        if not isinstance(parsed, dict):
+            return ("batch", False)
+        method = parsed.get("method")  # type: ignore
+        if method not in self._method_names:
+            return ("unknown", False)
+        return (method, _wants_trace(method, parsed.get("params")))  # type: ignore
+
+    def dispatch(self, request: str) -> tuple[int, str | Stream]:
+        """Returns the HTTP status and the body of the response."""
+        start = perf_counter()
+        parsed = _parse(request)
+        (method, traced) = self._metric_labels(parsed)
+        (status, response) = self._dispatch(request, parsed)
+        if isinstance(response, str):
+            # JSON is ASCII, so the length is the size in bytes.
+            self.request_metrics.observe(
+                method,
+                traced=traced,
+                status=status,
+                seconds=perf_counter() - start,
+                response_bytes=len(response),
+            )
+            return (status, response)
+        stream = response
+
+        def observe():
+            self.request_metrics.observe(
+                method,
+                traced=traced,
+                status=status,
+                seconds=perf_counter() - start,
+                response_bytes=stream.size,
+            )
+
+        return (status, Stream(stream, on_close=observe))
+
+    def _dispatch(self, request: str, parsed: Any) -> tuple[int, str | Stream]:
+        request_id: object = None
+        key: str | None = None
+        if isinstance(parsed, dict):
+            single: dict[str, Any] = parsed  # type: ignore
+            method = single.get("method")
+            request_id = single.get("id")
+            params = single.get("params")
+            if method == "calculate" and "id" in single and isinstance(params, dict):
+                return self.calculate(request_id, params)  # type: ignore
+            if method == "calculate-many" and "id" in single:
+                return self.calculate_many(request_id, params)
+            if method == "dependents" and "id" in single:
+                return self.dependents(request_id, params)
+            pooled = method in POOLED_METHODS
+            if method in INCREMENTAL_METHODS:
+                key = _ags_year_key(params)
+        else:
+            # Invalid JSON (jsonrpcserver answers with the right error) or a batch
+            # request (which might contain anything).
+            pooled = parsed is not None
+        if not pooled:
+            response = jsonrpcserver.dispatch(request, methods=self.rpcs.methods())  # type: ignore
+            return (200, response)
+        try:
+            return (
+                200,
+                self.in_worker(request_id, _dispatch_in_worker, request, key=key),
+            )
+        except WorkerFailed as e:
+            return (e.status, e.response)
+
+    def calculate(self, request_id: object, params: dict[str, Any]) -> tuple[int, str]:
+        try:
+            key = self.rpcs.cache_key(**params)
+        except TypeError:
+            return (200, _error_response(request_id, INVALID_PARAMS, "Invalid params"))
+        trace_format = params.get("trace_format", "tree")
+        if trace_format not in TRACE_FORMATS:
+            message = f"Unknown trace_format {trace_format}"
+            return (200, _error_response(request_id, INVALID_PARAMS, message))
+        result = self.rpcs.result_cache.get(key)
+        if result is None:
+            try:
+                result = self.in_worker(
+                    request_id,
+                    _calculate_json_in_worker,
+                    params,
+                    key=_ags_year_key(params),
+                )
+            except WorkerFailed as e:
+                return (e.status, e.response)
+            self.rpcs.result_cache.put(key, result)
+        return (200, _result_response(request_id, result))
+
+    def dependents(self, request_id: object, params: Any) -> tuple[int, str]:
+        try:
+            (ags, year, names) = dependents_params(params)
+        except ValueError as e:
+            return (200, _error_response(request_id, INVALID_PARAMS, str(e)))
+        index = self.rpcs.cached_dependency_index(ags, year)
+        if index is None:
+            try:
+                index = self.in_worker(
+                    request_id, _dependency_index_in_worker, (ags, year)
+                )
+            except WorkerFailed as e:
+                return (e.status, e.response)
+            self.rpcs.keep_dependency_index(ags, year, index)
+        try:
+            dependents = index.query(names)
+        except ValueError as e:
+            return (200, _error_response(request_id, INVALID_PARAMS, str(e)))
+        return (200, _result_response(request_id, json.dumps(dependents)))
+
+    def calculate_many(
+        self, request_id: object, params: Any
+    ) -> tuple[int, str | Stream]:
+        jobs: Any = None
+        if isinstance(params, dict):
+            jobs = params.get("jobs")  # type: ignore
+        elif isinstance(params, list) and len(params) == 1:  # type: ignore
+            jobs = params[0]  # type: ignore
+        try:
+            params = jobs_params(jobs)
+        except ValueError as e:
+            return (200, _error_response(request_id, INVALID_PARAMS, str(e)))
+        if not self._pending.acquire(blocking=False):
+            return (503, _error_response(request_id, WORKER_ERROR, "Server busy"))
+        return (
+            200,
+            Stream(
+                self._stream_jobs(request_id, params), on_close=self._pending.release
+            ),
+        )
+
+    def _stream_jobs(self, request_id: object, jobs: list[dict[str, Any]]) -> Chunks:
+        yield f'{{"jsonrpc": "2.0", "id": {json.dumps(request_id)}, "result": ['
+        separator = ""
+        for item in self._run_jobs(jobs):
+            yield separator + item
+            separator = ", "
+        yield "]}"
+
+    def _run_jobs(self, jobs: list[dict[str, Any]]) -> Chunks:
+        """The items of the result of calculate-many in the order the jobs are done.
+
+        Cached results come first. Of the others at most config.workers run at
+        the same time, so that one batch does not starve all other requests.
+        The timeout applies to every job, counted from when the previous job
+        was done.
+        """
+        keys = [self.rpcs.cache_key(**p) for p in jobs]
+        todo: list[int] = []
+        for (ndx, key) in enumerate(keys):
+            cached = self.rpcs.result_cache.get(key)
+            if cached is None:
+                todo.append(ndx)
+            else:
+                yield _job_result(ndx, cached)
+        todo.reverse()
+        running: dict[Future[str], tuple[ProcessPoolExecutor, int]] = {}
+        try:
+            while todo or running:
+                while todo and len(running) < self.config.workers:
+                    ndx = todo.pop()
+                    try:
+                        (pool, future) = self._submit(
+                            _calculate_json_in_worker,
+                            jobs[ndx],
+                            key=_ags_year_key(jobs[ndx]),
+                        )
+                        running[future] = (pool, ndx)
+                    except BrokenProcessPool:
+                        yield _job_error(ndx, WORKER_ERROR, "Worker process died")
+                if not running:
+                    continue
+                (done, _) = wait(
+                    running, timeout=self.config.timeout, return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    running_ndxs = [ndx for (_, ndx) in running.values()]
+                    for ndx in sorted([*running_ndxs, *todo]):
+                        yield _job_error(ndx, TIMEOUT_ERROR, "Calculation timed out")
+                    return
+                for future in done:
+                    (pool, ndx) = running.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        self._replace_broken_pool(pool)
+                        yield _job_error(ndx, WORKER_ERROR, "Worker process died")
+                    except Exception as e:
+                        yield _job_error(ndx, JOB_ERROR, repr(e))
+                    else:
+                        self.rpcs.result_cache.put(keys[ndx], result)
+                        yield _job_result(ndx, result)
+        finally:
+            # The client went away or we timed out.
+            for future in running:
+                future.cancel()
+
+    def in_worker(
+        self,
+        request_id: object,
+        fn: Callable[[Any], T],
+        arg: Any,
+        key: str | None = None,
+    ) -> T:
+        """Run fn(arg) in a worker (the one of key, see _submit) and return its result.
+
+        Raises WorkerFailed with an error response for request_id if that fails.
+        """
+        if not self._pending.acquire(blocking=False):
+            raise WorkerFailed(503, request_id, WORKER_ERROR, "Server busy")
+        try:
+            (pool, future) = self._submit(fn, arg, key=key)
+        except BrokenProcessPool:
+            self._pending.release()
+            raise WorkerFailed(500, request_id, WORKER_ERROR, "Worker process died")
+        except BaseException:
+            self._pending.release()
+            raise
+        # A job that timed out still keeps its worker busy, so it only gives
+        # back its place once it is done.
+        future.add_done_callback(lambda _: self._pending.release())
+        try:
+            return future.result(timeout=self.config.timeout)
+        except TimeoutError:
+            raise WorkerFailed(504, request_id, TIMEOUT_ERROR, "Calculation timed out")
+        except BrokenProcessPool:
+            self._replace_broken_pool(pool)
+            raise WorkerFailed(500, request_id, WORKER_ERROR, "Worker process died")
+        except Exception as e:
+            # Like jsonrpcserver does for exceptions in a method.
+            raise WorkerFailed(200, request_id, SERVER_ERROR, repr(e))
+
+    def stop(self):
+        """Stop accepting requests (serve_forever returns).
+
+        Must not be called from the thread running serve_forever.
+        """
+        self.draining = True
+        self.shutdown()
+
+    def close(self):
+        """Wait for the running requests and stop the workers."""
+        self.server_close()
+        for pool in self.pools:
+            pool.shutdown(wait=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: RpcServer  # type: ignore (it is always created by an RpcServer)
+
+    def setup(self):
+        super().setup()
+        # Do not let a slow client block a request thread forever.
+        self.connection.settimeout(self.server.config.timeout)
+
+    def send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != self.server.config.api_path:
+            self.send(404, "text/plain", b"")
+            return
+        try:
+            content_len = int(self.headers.get("Content-Length", -1))
+        except ValueError:
+            content_len = -1
+        if content_len < 0 or content_len > self.server.config.max_request_bytes:
+            self.send(400, "text/plain", b"")
+            return
+        try:
+            request = self.rfile.read(content_len).decode()
+        except UnicodeDecodeError:
+            self.send(400, "text/plain", b"")
+            return
+        (status, response) = self.server.dispatch(request)
+        if isinstance(response, str):
+            self.send(status, "application/json", response.encode())
+        else:
+            self.stream(status, "application/json", response)
+
+    def stream(self, status: int, content_type: str, chunks: Stream):
+        """Send the chunks as soon as they are available.
+
+        There is no Content-Length, the client reads until we close the connection.
+        """
+        try:
+            self.send_response(status)
+            self.send_header("Content-type", content_type)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            for chunk in chunks:
+                self.wfile.write(chunk.encode())
+                self.wfile.flush()
+        finally:
+            chunks.close()
+            self.close_connection = True
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Access-Control-Allow-Methods", "POST, GET, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path == self.server.config.metrics_path:
+            self.send(200, metrics.CONTENT_TYPE, self.server.render_metrics().encode())
+            return
+        if self.path == "/health":
+            if self.server.draining:
+                self.send(503, "text/plain", b"shutting down")
+            else:
+                self.send(200, "text/plain", b"ok")
+            return
+        static = self.server.config.static_files.get(self.path)
+        if static is None:
+            self.send(404, "text/plain", b"")
+        else:
+            (content_type, content) = static
+            self.send(200, content_type, content)
+
+
+def serve(rd: RefData, config: ServerConfig):
+    """Run the server until SIGINT or SIGTERM, then shut down gracefully."""
+    server = RpcServer(rd, config)
+    server.start_workers()
+
+    def stop(signum: int, frame: Any):
+        # stop blocks until serve_forever returns, so it can not be called
+        # from the thread that runs serve_forever (which also handles signals).
+        threading.Thread(target=server.stop).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    host = config.host or "localhost"
+    print(
+        f"Serving on http://{host}:{config.port}{config.api_path} with {config.workers} workers"
+    )
+    server.serve_forever()
+    print("Shutting down")
+    server.close()
@@ -0,0 +1,270 @@
+# pyright: strict
+"""Metrics of the RPC server in the Prometheus text format.
+
+The server counts every RPC request by method, whether it asked for traces and
+the HTTP status, and keeps histograms of the latency and response size of each
+(method, traced) combination. Together with the state of the result cache, the
+worker pool and the reference data they are rendered as text on GET /metrics
+(see httpserver), which any Prometheus compatible scraper (or curl) can read.
+"""
+
+from dataclasses import dataclass, field
+from typing import Iterable, Sequence
+import threading
+
+from ..generator.instrumentation import Histogram
+from ..generator.refdata import Version
+from .resultcache import CacheStats
+
+# Upper bounds of the buckets of the latency histograms in seconds.
+LATENCY_BOUNDS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+# Upper bounds of the buckets of the response size histograms in bytes (1KiB to 256MiB).
+SIZE_BOUNDS = tuple(float(1024 * 4**i) for i in range(10))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@dataclass(kw_only=True)
+class MethodMetrics:
+    # HTTP status -> number of requests.
+    requests: dict[int, int] = field(default_factory=lambda: {})
+    latency: Histogram = field(default_factory=lambda: Histogram(bounds=LATENCY_BOUNDS))
+    response_bytes: Histogram = field(
+        default_factory=lambda: Histogram(bounds=SIZE_BOUNDS)
+    )
+
+    def copy(self) -> "MethodMetrics":
+        return MethodMetrics(
+            requests=dict(self.requests),
+            latency=self.latency.copy(),
+            response_bytes=self.response_bytes.copy(),
+        )
+
+
+class RequestMetrics:
+    """The metrics of the requests, can be used by several threads at once."""
+
+    _methods: dict[tuple[str, bool], MethodMetrics]
+    _lock: threading.Lock
+
+    def __init__(self):
+        self._methods = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        method: str,
+        *,
+        traced: bool,
+        status: int,
+        seconds: float,
+        response_bytes: int,
+    ):
+        with self._lock:
+            m = self._methods.get((method, traced))
+            if m is None:
+                m = MethodMetrics()
+                self._methods[(method, traced)] = m
+            m.requests[status] = m.requests.get(status, 0) + 1
+            m.latency.add(seconds)
+            m.response_bytes.add(response_bytes)
+
+    def snapshot(self) -> dict[tuple[str, bool], MethodMetrics]:
+        with self._lock:
+            return {key: m.copy() for (key, m) in self._methods.items()}
+
+
+def _escape(label_value: str) -> str:
+    return label_value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for (k, v) in labels.items()) + "}"
+
+
+def _number(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer() and abs(v) < 2**53:
+        return str(int(v))
+    return repr(float(v))
+
+
+class Exposition:
+    """Collects metrics and renders them in the Prometheus text format."""
+
+    _lines: list[str]
+
+    def __init__(self):
+        self._lines = []
+
+    def _header(self, name: str, kind: str, help: str):
+        self._lines.append(f"# HELP {name} {help}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def _sample(self, name: str, labels: dict[str, str], value: float):
+        self._lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        samples: Iterable[tuple[dict[str, str], float]],
+    ):
+        self._header(name, "gauge", help)
+        for (labels, value) in samples:
+            self._sample(name, labels, value)
+
+    def counter(
+        self,
+        name: str,
+        help: str,
+        samples: Iterable[tuple[dict[str, str], float]],
+    ):
+        """name should end with _total."""
+        self._header(name, "counter", help)
+        for (labels, value) in samples:
+            self._sample(name, labels, value)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        samples: Iterable[tuple[dict[str, str], Histogram]],
+    ):
+        self._header(name, "histogram", help)
+        for (labels, h) in samples:
+            cumulative = 0
+            for (bound, count) in zip([*h.bounds, float("inf")], h.counts):
+                cumulative += count
+                self._sample(
+                    f"{name}_bucket", labels | {"le": _number(bound)}, cumulative
+                )
+            self._sample(f"{name}_sum", labels, h.sum)
+            self._sample(f"{name}_count", labels, h.count)
+
+    def text(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def render(
+    requests: RequestMetrics,
+    *,
+    cache: CacheStats,
+    workers: int,
+    pool_jobs: Sequence[int],
+    refdata_bytes: int,
+    data_version: Version | None,
+) -> str:
+    """All metrics of the server in the Prometheus text format.
+
+    pool_jobs are the jobs submitted to each worker that are not done yet.
+    """
+    methods = sorted(requests.snapshot().items())
+
+    def labels(method: str, traced: bool) -> dict[str, str]:
+        return {"method": method, "traced": "true" if traced else "false"}
+
+    e = Exposition()
+    e.counter(
+        "generator_rpc_requests_total",
+        "RPC requests by method, whether traces were requested and HTTP status.",
+        (
+            (labels(method, traced) | {"status": str(status)}, count)
+            for ((method, traced), m) in methods
+            for (status, count) in sorted(m.requests.items())
+        ),
+    )
+    e.histogram(
+        "generator_rpc_latency_seconds",
+        "Time from receiving an RPC request until its response was complete.",
+        ((labels(method, traced), m.latency) for ((method, traced), m) in methods),
+    )
+    e.histogram(
+        "generator_rpc_response_bytes",
+        "Size of the RPC responses.",
+        (
+            (labels(method, traced), m.response_bytes)
+            for ((method, traced), m) in methods
+        ),
+    )
+    e.counter(
+        "generator_result_cache_hits_total",
+        "Lookups in the cache of calculate results that found a result.",
+        [({}, cache.hits)],
+    )
+    e.counter(
+        "generator_result_cache_misses_total",
+        "Lookups in the cache of calculate results that found nothing.",
+        [({}, cache.misses)],
+    )
+    e.counter(
+        "generator_result_cache_evictions_total",
+        "Results evicted from the cache to stay within its budget.",
+        [({}, cache.evictions)],
+    )
+    e.gauge(
+        "generator_result_cache_entries",
+        "Results in the cache.",
+        [({}, cache.entries)],
+    )
+    e.gauge(
+        "generator_result_cache_bytes",
+        "Bytes held by the results in the cache.",
+        [({}, cache.bytes)],
+    )
+    e.gauge(
+        "generator_result_cache_max_bytes",
+        "Budget of the cache.",
+        [({}, cache.max_bytes)],
+    )
+    e.gauge("generator_pool_workers", "Worker processes.", [({}, workers)])
+    e.gauge(
+        "generator_pool_jobs",
+        "Jobs submitted to the worker pool that are not done yet.",
+        [({}, sum(pool_jobs))],
+    )
+    e.gauge(
+        "generator_pool_queue_depth",
+        "Jobs waiting for a free worker.",
+        [({}, sum(max(0, jobs - 1) for jobs in pool_jobs))],
+    )
+    e.gauge(
+        "generator_refdata_bytes",
+        "Approximate memory taken by the reference data.",
+        [({}, refdata_bytes)],
+    )
+    e.gauge(
+        "generator_data_version_info",
+        "The version of the loaded reference data.",
+        []
+        if data_version is None
+        else [
+            (
+                {
+                    "public": data_version.public,
+                    "proprietary": data_version.proprietary,
+                },
+                1,
+            )
+        ],
+    )
+    return e.text()
@@ -0,0 +1,93 @@
+# pyright: strict
+"""A bounded cache for the results of the calculate RPC.
+
+Many users request the same (ags, year, overrides) combinations, so we keep
+the JSON of the most recently used results up to a budget of bytes and evict
+the least recently used ones. Keeping the JSON (instead of the result dict)
+means a hit can be sent as is and we know exactly how much memory it needs.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+import hashlib
+import json
+import threading
+
+
+def canonical_hash(overrides: dict[str, Any]) -> str:
+    """The same for all dicts with the same items (independent of their order)."""
+    canonical = json.dumps(overrides, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@dataclass(kw_only=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+    max_bytes: int
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResultCache:
+    max_bytes: int
+    _items: OrderedDict[Hashable, str]
+    _bytes: int
+    _hits: int
+    _misses: int
+    _evictions: int
+    _lock: threading.Lock
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> str | None:
+        with self._lock:
+            result = self._items.get(key)
+            if result is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._items.move_to_end(key)
+            return result
+
+    def put(self, key: Hashable, result: str):
+        """Results larger than the whole budget are not cached.
+
+        As json.dumps only produces ASCII the length of result is its size in bytes.
+        """
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            if len(result) > self.max_bytes:
+                return
+            self._items[key] = result
+            self._bytes += len(result)
+            while self._bytes > self.max_bytes:
+                (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._evictions += 1
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._items),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+            )
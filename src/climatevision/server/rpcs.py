@@ -1,19 +1,124 @@
 # pyright: strict reportMissingTypeStubs=true
+import base64
 import dataclasses
-from typing import Callable, Any
+from typing import Callable, Any, Hashable
+import io
+import json
+import threading
 
 import jsonrpcserver
 
 from .. import generator
-from ..tracing import with_tracing
+from ..generator import resultvector
+from ..generator.dag import Evaluation
+from ..generator.generator import evaluate, result_of_evaluation
+from ..tracing import dump_with_tracing, explain, with_tracing
+from ..tracing.dependencies import DependencyIndex, dependency_index
 from . import overridables
+from .resultcache import ResultCache, canonical_hash
+
+
+# How many (ags, year) combinations we remember the last evaluation for (per
+# GeneratorRpcs, so per worker process of the RPC server).
+MAX_PREVIOUS_EVALUATIONS = 16
+
+# Default budget of the cache of calculate results (see resultcache).
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+# The most jobs a single calculate-many request may contain.
+MAX_JOBS = 1000
+
+# The error code of a failed job of calculate-many.
+JOB_ERROR = -32000
+
+# The most paths a single explain request may contain.
+MAX_EXPLAIN_PATHS = 100
+
+# How many (ags, year) combinations we remember the dependency index for.
+MAX_DEPENDENCY_INDEXES = 4
+
+# How calculate writes traces: nested dicts or one list of shared nodes (see
+# tracing.number.DagExport).
+TRACE_FORMATS = ("tree", "dag")
+
+
+def job_params(job: Any) -> dict[str, Any]:
+    """The arguments of calculate for one job of calculate-many.
+
+    A job is either [ags, year, overrides] or {"ags": .., "year": .., "overrides": ..}
+    (overrides are optional there). Raises ValueError for anything else.
+    """
+    if isinstance(job, list) and len(job) == 3:  # type: ignore
+        (ags, year, overrides) = job  # type: ignore
+    elif isinstance(job, dict):
+        ags = job.get("ags")  # type: ignore
+        year = job.get("year")  # type: ignore
+        overrides = job.get("overrides", {})  # type: ignore
+    else:
+        raise ValueError(f"Invalid job {job!r}")
+    if (
+        not isinstance(ags, str)
+        or not isinstance(year, int)
+        or isinstance(year, bool)
+        or not isinstance(overrides, dict)
+    ):
+        raise ValueError(f"Invalid job {job!r}")
+    return {"ags": ags, "year": year, "overrides": overrides, "trace": False}
+
+
+def dependents_params(params: Any) -> tuple[str, int, list[str]]:
+    """The ags, year and names of a dependents request, whose params are either
+    [ags, year, names] or {"ags": .., "year": .., "names": ..}. Raises ValueError
+    for anything else.
+    """
+    if isinstance(params, list) and len(params) == 3:  # type: ignore
+        (ags, year, names) = params  # type: ignore
+    elif isinstance(params, dict) and params.keys() == {"ags", "year", "names"}:  # type: ignore
+        (ags, year, names) = (params["ags"], params["year"], params["names"])  # type: ignore
+    else:
+        raise ValueError("Expected the params ags, year and names")
+    if not isinstance(ags, str) or not isinstance(year, int) or isinstance(year, bool):
+        raise ValueError("ags must be a string and year a number")
+    if (
+        not isinstance(names, list)
+        or not names
+        or not all(isinstance(n, str) for n in names)  # type: ignore
+    ):
+        raise ValueError("names must be a non empty list of names")
+    return (ags, year, names)  # type: ignore
+
+
+def jobs_params(jobs: Any) -> list[dict[str, Any]]:
+    """The arguments of calculate for all jobs. Raises ValueError for invalid jobs."""
+    if not isinstance(jobs, list):
+        raise ValueError("jobs must be a list")
+    if len(jobs) > MAX_JOBS:  # type: ignore
+        raise ValueError(f"At most {MAX_JOBS} jobs per request")
+    return [job_params(job) for job in jobs]  # type: ignore
 
 
 class GeneratorRpcs:
     rd: generator.RefData
+    previous_evaluations: dict[tuple[str, int], Evaluation]
+    _previous_evaluations_lock: threading.Lock
+    dependency_indexes: dict[tuple[str, int], DependencyIndex]
+    _dependency_indexes_lock: threading.Lock
+    result_cache: ResultCache
+    _data_version: tuple[str, str] | None
 
-    def __init__(self, rd: generator.RefData):
+    def __init__(
+        self, rd: generator.RefData, *, cache_bytes: int = DEFAULT_CACHE_BYTES
+    ):
         self.rd = rd
+        self.previous_evaluations = {}
+        self._previous_evaluations_lock = threading.Lock()
+        self.dependency_indexes = {}
+        self._dependency_indexes_lock = threading.Lock()
+        self.result_cache = ResultCache(max_bytes=cache_bytes)
+        version = rd.version()
+        self._data_version = (
+            None if version is None else (version.public, version.proprietary)
+        )
 
     def do_list_ags(self):
         def guess_short_name_from_description(d: str) -> str:
@@ -37,37 +142,281 @@ class GeneratorRpcs:
         return jsonrpcserver.Success(
             with_tracing(
                 enabled=trace,
-                f=lambda: dataclasses.asdict(
-                    generator.make_entries(self.rd, ags, year)
-                ),
+                rd=self.rd,
+                f=lambda rd: dataclasses.asdict(generator.make_entries(rd, ags, year)),
             )
         )
 
     def calculate(
-        self, ags: str, year: int, overrides: dict[str, int | float | str], trace: bool
+        self,
+        ags: str,
+        year: int,
+        overrides: dict[str, int | float | str],
+        trace: bool,
+        trace_format: str = "tree",
+    ) -> jsonrpcserver.Result:
+        """With trace_format "dag" the traced result is {"result": .., "traces": [..]},
+        where every trace is the index of a node in traces.
+        """
+        if trace_format not in TRACE_FORMATS:
+            return jsonrpcserver.InvalidParams(f"Unknown trace_format {trace_format}")
+        return jsonrpcserver.Success(
+            json.loads(self.calculate_json(ags, year, overrides, trace, trace_format))
+        )
+
+    def cache_key(
+        self,
+        ags: str,
+        year: int,
+        overrides: dict[str, int | float | str],
+        trace: bool,
+        trace_format: str = "tree",
+    ) -> Hashable:
+        return (
+            ags,
+            year,
+            canonical_hash(overrides),
+            trace,
+            trace_format,
+            self._data_version,
+        )
+
+    def calculate_json(
+        self,
+        ags: str,
+        year: int,
+        overrides: dict[str, int | float | str],
+        trace: bool,
+        trace_format: str = "tree",
+    ) -> str:
+        """The result of calculate as JSON. Recently requested results are cached."""
+        key = self.cache_key(ags, year, overrides, trace, trace_format)
+        result = self.result_cache.get(key)
+        if result is None:
+            result = self.do_calculate_json(ags, year, overrides, trace, trace_format)
+            self.result_cache.put(key, result)
+        return result
+
+    def do_calculate_json(
+        self,
+        ags: str,
+        year: int,
+        overrides: dict[str, int | float | str],
+        trace: bool,
+        trace_format: str = "tree",
+    ) -> str:
+        """Traced results are written directly from the Result (see resultjson), so
+        that we never hold the result dict with all its finalized traces in memory.
+        Without traces the result dict is small and json's C encoder is faster.
+        """
+
+        if trace:
+            # The traces are only correct if everything is calculated in one go.
+            out = io.StringIO()
+            dump_with_tracing(
+                enabled=True,
+                rd=self.rd,
+                f=lambda rd: generator.calculate(
+                    self.make_inputs(ags, year, overrides, rd)
+                ),
+                fp=out,
+                compact=True,
+                dag=trace_format == "dag",
+            )
+            return out.getvalue()
+        else:
+            result = self.calculate_incrementally(
+                ags, year, self.make_inputs(ags, year, overrides)
+            )
+            return json.dumps(result.result_dict(), separators=(",", ":"))
+
+    def make_inputs(
+        self,
+        ags: str,
+        year: int,
+        overrides: dict[str, int | float | str],
+        rd: generator.RefData | None = None,
+    ) -> generator.Inputs:
+        """The inputs with the given overrides, from rd (default self.rd)."""
+        rd = self.rd if rd is None else rd
+        defaults = dataclasses.asdict(generator.make_entries(rd, ags, year))
+        defaults.update(overrides)
+        entries = generator.Entries(**defaults)
+        return generator.Inputs(
+            facts_and_assumptions=rd.facts_and_assumptions(), entries=entries
+        )
+
+    def calculate_vector(
+        self,
+        ags: str,
+        year: int,
+        overrides: dict[str, int | float | str],
+        schema: str | None = None,
+    ) -> jsonrpcserver.Result:
+        """Like calculate without traces, but the result is a vector (see resultvector).
+
+        Returns {"schema": id, "vector": ..} where vector are the little endian
+        float64 values encoded in base64. If schema is not the id of the schema of
+        the result, the paths of the schema are returned as well.
+        """
+        result = self.calculate_incrementally(
+            ags, year, self.make_inputs(ags, year, overrides)
+        )
+        (result_schema, vector) = resultvector.vector_of_result_dict(
+            result.result_dict()
+        )
+        response: dict[str, Any] = {
+            "schema": result_schema.id,
+            "vector": base64.b64encode(vector.astype("<f8").tobytes()).decode(),
+        }
+        if schema != result_schema.id:
+            response["paths"] = result_schema.paths
+        return jsonrpcserver.Success(response)
+
+    def calculate_incrementally(
+        self, ags: str, year: int, inputs: generator.Inputs
+    ) -> generator.Result:
+        """Usually the explorer changes only a few overrides between two calls, so we
+        only recalculate the sectors affected by the changed entries.
+
+        The previous evaluations are kept by this GeneratorRpcs, so in the RPC
+        server by one worker process. That is why the server sends all
+        calculations of an (ags, year) to the same worker (see httpserver).
+        """
+        key = (ags, year)
+        with self._previous_evaluations_lock:
+            previous = self.previous_evaluations.pop(key, None)
+        evaluation = evaluate(inputs, previous=previous)
+        with self._previous_evaluations_lock:
+            self.previous_evaluations[key] = evaluation
+            if len(self.previous_evaluations) > MAX_PREVIOUS_EVALUATIONS:
+                oldest = next(iter(self.previous_evaluations))
+                del self.previous_evaluations[oldest]
+        return result_of_evaluation(evaluation)
+
+    def calculate_many(self, jobs: list[Any]) -> jsonrpcserver.Result:
+        """Calculate many (ags, year, overrides) combinations in one request.
+
+        The result has one item per job, either {"job": ndx, "result": ..} or
+        {"job": ndx, "error": {"code": .., "message": ..}}, where ndx is the index
+        of the job in jobs. The items are in the order the jobs were done. Here
+        that is the order of jobs, the RPC server runs them in parallel (see
+        httpserver).
+        """
+        try:
+            params = jobs_params(jobs)
+        except ValueError as e:
+            return jsonrpcserver.InvalidParams(str(e))
+        items: list[dict[str, Any]] = []
+        for (ndx, p) in enumerate(params):
+            try:
+                items.append(
+                    {"job": ndx, "result": json.loads(self.calculate_json(**p))}
+                )
+            except Exception as e:
+                items.append(
+                    {"job": ndx, "error": {"code": JOB_ERROR, "message": repr(e)}}
+                )
+        return jsonrpcserver.Success(items)
+
+    def explain(
+        self,
+        ags: str,
+        year: int,
+        overrides: dict[str, int | float | str],
+        paths: list[str],
+        depth: int | None = None,
     ) -> jsonrpcserver.Result:
-        def calculate():
-            defaults = dataclasses.asdict(generator.make_entries(self.rd, ags, year))
-            defaults.update(overrides)
-            entries = generator.Entries(**defaults)
-            inputs = generator.Inputs(
-                facts_and_assumptions=self.rd.facts_and_assumptions(), entries=entries
+        """The values and traces of a few paths of the result (see tracing.explain).
+
+        Only the sectors needed for the paths are calculated, and only their
+        traces are returned. So the explorer can calculate without traces and
+        ask for the trace of a value when it is shown.
+        """
+        if (
+            not isinstance(paths, list)  # type: ignore
+            or not paths
+            or len(paths) > MAX_EXPLAIN_PATHS
+            or not all(isinstance(p, str) for p in paths)  # type: ignore
+        ):
+            return jsonrpcserver.InvalidParams(
+                f"paths must be a list of 1 to {MAX_EXPLAIN_PATHS} paths"
             )
-            g = generator.calculate(inputs)
-            return g.result_dict()
+        if depth is not None and (
+            not isinstance(depth, int) or isinstance(depth, bool) or depth < 0  # type: ignore
+        ):
+            return jsonrpcserver.InvalidParams("depth must be a number >= 0")
+        try:
+            generator.sectors_of_paths(paths)
+        except ValueError as e:
+            return jsonrpcserver.InvalidParams(str(e))
+        return jsonrpcserver.Success(
+            explain(
+                self.rd,
+                lambda rd: generator.calculate(
+                    self.make_inputs(ags, year, overrides, rd), paths=paths
+                ),
+                paths,
+                depth=depth,
+            )
+        )
 
-        result = with_tracing(enabled=trace, f=calculate)
-        return jsonrpcserver.Success(result)
+    def dependents(self, ags: str, year: int, names: list[str]) -> jsonrpcserver.Result:
+        """The result paths that depend on the given facts, assumptions and entries
+        as {name: [path, ..]} (see tracing.dependencies).
+
+        The index is built by one traced calculation per ags and year, the last few
+        are kept.
+        """
+        try:
+            (ags, year, names) = dependents_params([ags, year, names])
+        except ValueError as e:
+            return jsonrpcserver.InvalidParams(str(e))
+        index = self.cached_dependency_index(ags, year)
+        if index is None:
+            index = dependency_index(self.rd, ags, year)
+            self.keep_dependency_index(ags, year, index)
+        try:
+            return jsonrpcserver.Success(index.query(names))
+        except ValueError as e:
+            return jsonrpcserver.InvalidParams(str(e))
+
+    def cached_dependency_index(self, ags: str, year: int) -> DependencyIndex | None:
+        with self._dependency_indexes_lock:
+            index = self.dependency_indexes.pop((ags, year), None)
+            if index is not None:
+                self.dependency_indexes[(ags, year)] = index
+            return index
+
+    def keep_dependency_index(self, ags: str, year: int, index: DependencyIndex):
+        """Keep index, forgetting the least recently used one if there are too many."""
+        with self._dependency_indexes_lock:
+            self.dependency_indexes.pop((ags, year), None)
+            self.dependency_indexes[(ags, year)] = index
+            if len(self.dependency_indexes) > MAX_DEPENDENCY_INDEXES:
+                oldest = next(iter(self.dependency_indexes))
+                del self.dependency_indexes[oldest]
 
     def get_overridables(self, ags: str, year: int) -> jsonrpcserver.Result:
         return jsonrpcserver.Success(
             overridables.sections_with_defaults(self.rd, ags, year)
         )
 
+    def cache_stats(self) -> jsonrpcserver.Result:
+        stats = self.result_cache.stats()
+        return jsonrpcserver.Success(
+            dataclasses.asdict(stats) | {"hit_rate": stats.hit_rate()}
+        )
+
     def methods(self) -> jsonrpcserver.methods.Methods:
         return {
             "make-entries": self.make_entries,
             "get-overridables": self.get_overridables,
             "list-ags": self.list_ags,
             "calculate": self.calculate,
+            "calculate-many": self.calculate_many,
+            "calculate-vector": self.calculate_vector,
+            "explain": self.explain,
+            "dependents": self.dependents,
+            "cache-stats": self.cache_stats,
         }
@@ -4,6 +4,6 @@
 calculation is done. Used by the explorer. Not used by the Klimavision website.
 """
 
-from .monkeypatch import with_tracing
+from .views import TracingRefData, with_tracing, dump_with_tracing, explain
 
-__all__ = ["with_tracing"]
+__all__ = ["TracingRefData", "with_tracing", "dump_with_tracing", "explain"]
@@ -0,0 +1,114 @@
+"""Which result paths depend on which facts, assumptions and entries.
+
+The index is built from the tape of one traced calculation (see number): Every
+node depends on the sources of its operands, so one pass over the tape gives
+the sources of every number in the result.  The sets of sources are python ints
+used as bit sets, so combining them is a single (fast) or.
+
+Only dependencies through arithmetic are recorded.  A value that merely decides
+which formula is used (e.g. the entry t_rt7, or a comparison) is not part of any
+trace.
+"""
+
+# pyright: strict
+
+from dataclasses import dataclass, fields, replace
+from typing import Iterable
+
+from ..generator import Entries, Inputs, RefData, calculate, make_entries, resultjson
+from . import number
+from .views import TracingRefData
+
+
+@dataclass(kw_only=True)
+class DependencyIndex:
+    # The sorted result paths that depend on each fact, assumption and (numeric)
+    # field of Entries.  Names nothing depends on have no paths.
+    dependents: dict[str, list[str]]
+
+    def query(self, names: Iterable[str]) -> dict[str, list[str]]:
+        """The dependents of the given names. Raises ValueError for unknown names."""
+        names = list(names)
+        unknown = [n for n in names if n not in self.dependents]
+        if unknown:
+            raise ValueError(f"Unknown facts, assumptions or entries: {unknown}")
+        return {n: self.dependents[n] for n in names}
+
+    def restricted_to(self, paths: Iterable[str]) -> "DependencyIndex":
+        """Only keep the given result paths (e.g. those used by a consumer)."""
+        keep = set(paths)
+        return DependencyIndex(
+            dependents={
+                n: [p for p in ps if p in keep] for (n, ps) in self.dependents.items()
+            }
+        )
+
+
+def _marked_entries(table: number.TraceTable, entries: Entries) -> Entries:
+    """entries, but every number gets a node of its own.
+
+    So an entry can be told apart from the data it was made of (or from other
+    entries that are the same number).
+    """
+    changes: dict[str, number.TracedNumber] = {}
+    for fld in fields(entries):
+        v = getattr(entries, fld.name)
+        if isinstance(v, number.TracedNumber):
+            changes[fld.name] = +v
+        elif isinstance(v, (float, int)):
+            changes[fld.name] = number.TracedNumber.lift(v, table)
+    return replace(entries, **changes)
+
+
+def _sources_of_nodes(table: number.TraceTable, sources: dict[int, int]) -> list[int]:
+    """The sources (bit set) every node of table depends on, given the sources of
+    the nodes that are sources themselves."""
+    deps = [0] * len(table)
+    ops = table.ops
+    a = table.a
+    b = table.b
+    get = sources.get
+    for id in range(len(deps)):
+        if ops[id] >= number.OP_ADD:
+            d = deps[a[id]]
+            if b[id] >= 0:
+                d |= deps[b[id]]
+            deps[id] = d | get(id, 0)
+        else:
+            deps[id] = get(id, 0)
+    return deps
+
+
+def dependency_index(rd: RefData, ags: str, year: int) -> DependencyIndex:
+    """The DependencyIndex of a traced calculation of ags and year."""
+    table = number.TraceTable()
+    trd = TracingRefData(rd, table)
+    fa = trd.facts_and_assumptions()
+    entries = _marked_entries(table, make_entries(trd, ags, year))
+    result = calculate(Inputs(facts_and_assumptions=fa, entries=entries))
+
+    names = [*fa.facts.labels, *fa.assumptions.labels]
+    bit_of_name = {n: 1 << ndx for (ndx, n) in enumerate(names)}
+    sources: dict[int, int] = {}
+    for id in range(len(table)):
+        if table.ops[id] == number.OP_FACT_OR_ASS:
+            sources[id] = bit_of_name[table.node(id)[1]]
+    for fld in fields(entries):
+        v = getattr(entries, fld.name)
+        if isinstance(v, number.TracedNumber):
+            bit_of_name[fld.name] = 1 << len(names)
+            names.append(fld.name)
+            sources[v.trace] = bit_of_name[fld.name]
+
+    deps = _sources_of_nodes(table, sources)
+    dependents: dict[str, list[str]] = {n: [] for n in names}
+    for (path, v) in resultjson.leaves(result):
+        if isinstance(v, number.TracedNumber):
+            bits = deps[v.trace]
+            while bits:
+                low = bits & -bits
+                dependents[names[low.bit_length() - 1]].append(".".join(path))
+                bits ^= low
+    for ps in dependents.values():
+        ps.sort()
+    return DependencyIndex(dependents=dependents)
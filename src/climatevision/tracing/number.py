@@ -5,7 +5,16 @@
 # For the generator core this leads to surprisingly good traces as
 # we largely do not use for loops or ifs to decide how to do the computation.
 # Or to say it differently all we really have is just a collection of formulas
-from typing import Literal, Union, Callable, TypedDict
+#
+# The traces are stored in a TraceTable: Every TracedNumber is a handle of its
+# own node on the tape of the table, which refers to the nodes of its operands by
+# their index. So a value that is used in many formulas is only stored once.  A TracedNumber that ends up in
+# the result gets the path to it as its name, and wherever it was used that
+# name appears in the trace.  The nested dicts the explorer expects (TRACE) are
+# only built when the traces are written, alternatively DagExport writes one
+# list of nodes in which equal sub expressions appear only once.
+from array import array
+from typing import Any, Callable, Iterable, Literal, Union, TypedDict
 
 
 # Traces will be returned as values that python's json module
@@ -19,6 +28,7 @@ TRACE = Union[
     "DefTrace",
     "BinaryTrace",
     "UnaryTrace",
+    "TruncatedTrace",
 ]
 
 
@@ -60,103 +70,265 @@ class UnaryTrace(TypedDict):
     a: TRACE
 
 
-def literal(v: int | float) -> TRACE:
-    return v
-
-
-def data(source: str, key: str, attr: str, value: float | int) -> TRACE:
-    return {"source": source, "key": key, "attr": attr, "value": value}
-
+# The place of a sub expression that was left out (see TraceTable.limited_tree).
+class TruncatedTrace(TypedDict):
+    truncated: bool
+    value: float | int
 
-def fact_or_ass(n: str, value: float | int) -> TRACE:
-    return {"fact_or_ass": n, "value": value}
 
+# A node is a tuple whose first item is its kind:
+#   (LITERAL, value)
+#   (DATA, source, key, attr, value)
+#   (FACT_OR_ASS, name, value)
+#   (BINARY, op, a, b, value)
+#   (UNARY, op, a)
+class Kind:
+    LITERAL = 0
+    DATA = 1
+    FACT_OR_ASS = 2
+    BINARY = 3
+    UNARY = 4
+
+
+Node = tuple[Any, ...]
+
+# The operations as they are stored in the tape (see TraceTable).
+OP_LITERAL = 0
+OP_DATA = 1
+OP_FACT_OR_ASS = 2
+OP_ADD = 3
+OP_SUB = 4
+OP_MUL = 5
+OP_DIV = 6
+OP_NEG = 7
+OP_POS = 8
+
+_BINARY_OPS: dict[int, Literal["+", "-", "*", "/"]] = {
+    OP_ADD: "+",
+    OP_SUB: "-",
+    OP_MUL: "*",
+    OP_DIV: "/",
+}
+_UNARY_OPS: dict[int, Literal["+", "-"]] = {OP_NEG: "-", OP_POS: "+"}
+
+
+def _key(v: float | int) -> object:
+    # 0.0 == -0.0 (and 1 == 1.0, so the type is part of the keys as well), but they
+    # should not share a node.
+    return v if v else str(v)
+
+
+class TraceTable:
+    """The nodes of the traces of one calculation.
+
+    The nodes are recorded on a tape of four columns: the operation, the indices
+    of the operands (or of the label of data, facts and assumptions) and the
+    value. Values that are not floats are kept exactly in a dict on the side.
+    The tuples of Node are only made when a trace is written.
+
+    Each TracedNumber gets a new node, only the literals that are operands of
+    a calculation (and which no one else can refer to) share their nodes.
+    """
 
-def _replace_name_defs_by_names(trace: TRACE) -> TRACE:
-    match trace:
-        case {"binary": op, "a": a, "b": b, "value": v}:
-            return {
-                "binary": op,
-                "a": _replace_name_defs_by_names(a),
-                "b": _replace_name_defs_by_names(b),
-                "value": v,
-            }
-        case {"unary": op, "a": a}:
-            return {"unary": op, "a": _replace_name_defs_by_names(a)}
-        case int() | float():
+    ops: "array[int]"
+    a: "array[int]"
+    b: "array[int]"
+    values: "array[float]"
+    names: dict[int, str]
+    _exact: dict[int, float | int]
+    _labels: list[tuple[Any, ...]]
+    _label_ids: dict[tuple[Any, ...], int]
+    _literals: dict[tuple[object, ...], int]
+    _trees: dict[int, TRACE]
+
+    def __init__(self):
+        self.ops = array("b")
+        self.a = array("q")
+        self.b = array("q")
+        self.values = array("d")
+        self.names = {}
+        self._exact = {}
+        self._labels = []
+        self._label_ids = {}
+        self._literals = {}
+        self._trees = {}
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def record(self, op: int, a: int, b: int, value: float | int) -> int:
+        """Append a node and return its index."""
+        id = len(self.ops)
+        self.ops.append(op)
+        self.a.append(a)
+        self.b.append(b)
+        self.values.append(value)
+        if type(value) is not float:
+            self._exact[id] = value
+        return id
+
+    def _label(self, label: tuple[Any, ...]) -> int:
+        id = self._label_ids.get(label)
+        if id is None:
+            self._labels.append(label)
+            id = self._label_ids[label] = len(self._labels) - 1
+        return id
+
+    def operand(self, v: float | int) -> int:
+        key = (type(v), _key(v))
+        id = self._literals.get(key)
+        if id is None:
+            id = self._literals[key] = self.record(OP_LITERAL, -1, -1, v)
+        return id
+
+    def literal(self, v: float | int) -> int:
+        return self.record(OP_LITERAL, -1, -1, v)
+
+    def data(self, source: str, key: str | int, attr: str, value: float | int) -> int:
+        return self.record(OP_DATA, self._label((source, key, attr)), -1, value)
+
+    def fact_or_ass(self, n: str, value: float | int) -> int:
+        return self.record(OP_FACT_OR_ASS, self._label((n,)), -1, value)
+
+    def value(self, id: int) -> float | int:
+        v = self._exact.get(id)
+        return self.values[id] if v is None else v
+
+    def node(self, id: int) -> Node:
+        op = self.ops[id]
+        value = self.value(id)
+        if op == OP_LITERAL:
+            return (Kind.LITERAL, value)
+        elif op == OP_DATA:
+            return (Kind.DATA, *self._labels[self.a[id]], value)
+        elif op == OP_FACT_OR_ASS:
+            return (Kind.FACT_OR_ASS, self._labels[self.a[id]][0], value)
+        elif op in _BINARY_OPS:
+            return (Kind.BINARY, _BINARY_OPS[op], self.a[id], self.b[id], value)
+        else:
+            return (Kind.UNARY, _UNARY_OPS[op], self.a[id])
+
+    def set_name(self, id: int, n: str):
+        """Name the node, unless it already has a name."""
+        if id not in self.names:
+            self.names[id] = n
+            self._trees.clear()
+
+    def tree(self, id: int) -> TRACE:
+        """The trace as nested dicts, names included as name definitions."""
+        trace = self.expression(id, self.tree)
+        n = self.names.get(id)
+        if n is None:
             return trace
-        case {"def_name": ({"name": n} as name), "trace": t}:
-            # Names we could not resolve we replace by their expression
-            if n.startswith("?"):
-                return _replace_name_defs_by_names(t)
+        return {"def_name": {"name": n}, "trace": trace}
+
+    def expression(self, id: int, operand: Callable[[int], TRACE]) -> TRACE:
+        """The node as a dict (or a number for literals), operands are given by
+        operand."""
+        match self.node(id):
+            case (Kind.LITERAL, v):
+                return v
+            case (Kind.DATA, source, key, attr, value):
+                return {"source": source, "key": key, "attr": attr, "value": value}
+            case (Kind.FACT_OR_ASS, n, value):
+                return {"fact_or_ass": n, "value": value}
+            case (Kind.BINARY, op, a, b, value):
+                return {"binary": op, "a": operand(a), "b": operand(b), "value": value}
+            case (Kind.UNARY, op, a):
+                return {"unary": op, "a": operand(a)}
+            case _:
+                raise ValueError(f"Invalid node {id}")
+
+    def finalized_tree(self, id: int) -> TRACE:
+        """The trace as nested dicts, in which every named operand is replaced by
+        its name.
+
+        Equal sub traces are the same dict, so set all names before.
+        """
+        return self.expression(id, self._finalized_operand)
+
+    def limited_tree(self, id: int, depth: int) -> TRACE:
+        """Like finalized_tree, but only depth levels of operands deep. Deeper
+        calculations are replaced by TruncatedTraces.
+        """
+
+        def operand(id: int) -> TRACE:
+            n = self.names.get(id)
+            if n is not None:
+                return {"name": n}
+            elif depth <= 0 and self.ops[id] > OP_FACT_OR_ASS:
+                return {"truncated": True, "value": self.value(id)}
             else:
-                return name
-        case {"source": _, "key": _, "attr": _, "value": _}:
-            return trace
-        case {"fact_or_ass": _, "value": _}:
-            return trace
-        case _:
-            return trace
+                return self.limited_tree(id, depth - 1)
 
+        return self.expression(id, operand)
 
-def def_name(n: str, trace: TRACE) -> DefTrace:
-    return {"def_name": {"name": n}, "trace": trace}
-
-
-def binary(
-    value: float | int, op: Literal["+", "-", "*", "/"], a: TRACE, b: TRACE
-) -> TRACE:
-    return {"binary": op, "a": a, "b": b, "value": value}
+    def _finalized_operand(self, id: int) -> TRACE:
+        tree: TRACE | None = self._trees.get(id)
+        if tree is None:
+            n = self.names.get(id)
+            if n is None:
+                tree = self.expression(id, self._finalized_operand)
+            else:
+                tree = {"name": n}
+            self._trees[id] = tree
+        return tree
 
 
-def unary(op: Literal["+", "-"], a: TRACE) -> TRACE:
-    return {"unary": op, "a": a}
+# The table of the TracedNumbers that are created without giving one (e.g. in
+# tests). Traced calculations use a table of their own (see views).
+_default_table = TraceTable()
 
 
 class TracedNumber:
-    trace: TRACE
+    __slots__ = ("value", "trace", "table")
+
+    # The index of the node of the trace in the table.
+    trace: int
     value: float | int
+    table: TraceTable
 
-    def __init__(
-        self,
-        v: Union[float, int],
-        trace: TRACE,
-    ):
+    def __init__(self, v: Union[float, int], trace: int, table: TraceTable):
         self.value = v
         self.trace = trace
+        self.table = table
 
     @classmethod
-    def lift(cls, v: Union["TracedNumber", float, int]) -> "TracedNumber":
+    def lift(
+        cls, v: Union["TracedNumber", float, int], table: TraceTable | None = None
+    ) -> "TracedNumber":
         if isinstance(v, TracedNumber):
             return v
         else:
-            return cls(v, literal(v))
+            table = _default_table if table is None else table
+            return cls(v, table.literal(v), table)
 
     @classmethod
     def data(
-        cls, v: Union["TracedNumber", float, int], source: str, key: str, attr: str
+        cls,
+        v: Union["TracedNumber", float, int],
+        source: str,
+        key: str | int,
+        attr: str,
+        table: TraceTable | None = None,
     ):
         if isinstance(v, TracedNumber):
-            return cls(v.value, data(source, key, attr, v.value))
-        else:
-            return cls(v, data(source, key, attr, v))
+            v = v.value
+        table = _default_table if table is None else table
+        return cls(v, table.data(source, key, attr, v), table)
 
     @classmethod
-    def fact_or_ass(cls, n: str, v: float | int):
-        return cls(v, fact_or_ass(n, v))
-
-    def binop(
-        self,
-        op: Literal["+", "-", "*", "/"],
-        other: Union["TracedNumber", float, int],
-        f: Callable[[int | float, int | float], int | float],
-    ) -> "TracedNumber":
-        other = self.lift(other)
-        value = f(self.value, other.value)
-        return TracedNumber(
-            value,
-            trace=binary(value=value, op=op, a=self.trace, b=other.trace),
-        )
+    def fact_or_ass(cls, n: str, v: float | int, table: TraceTable | None = None):
+        table = _default_table if table is None else table
+        return cls(v, table.fact_or_ass(n, v), table)
+
+    # TracedNumbers are immutable, so copies (e.g. by dataclasses.asdict) can share
+    # them and stay in the same table.
+    def __copy__(self) -> "TracedNumber":
+        return self
+
+    def __deepcopy__(self, memo: dict[int, object]) -> "TracedNumber":
+        return self
 
     def is_integer(self) -> bool:
         if isinstance(self.value, int):
@@ -167,29 +339,95 @@ class TracedNumber:
     def __float__(self) -> float:
         return float(self.value)
 
+    # The arithmetic appends one node to the tape of the table. It is written out
+    # in every operator, as it is done for every number the generator computes.
     def __add__(self, other: Union["TracedNumber", float, int]) -> "TracedNumber":
-        return self.binop("+", other, lambda a, b: a + b)
+        table = self.table
+        if isinstance(other, TracedNumber):
+            value = self.value + other.value
+            return TracedNumber(
+                value, table.record(OP_ADD, self.trace, other.trace, value), table
+            )
+        value = self.value + other
+        b = table.operand(other)
+        return TracedNumber(value, table.record(OP_ADD, self.trace, b, value), table)
 
     def __radd__(self, other: Union["TracedNumber", float, int]) -> "TracedNumber":
-        return self.lift(other) + self
+        table = self.table
+        if isinstance(other, TracedNumber):
+            value = other.value + self.value
+            return TracedNumber(
+                value, table.record(OP_ADD, other.trace, self.trace, value), table
+            )
+        value = other + self.value
+        a = table.operand(other)
+        return TracedNumber(value, table.record(OP_ADD, a, self.trace, value), table)
 
     def __sub__(self, other: Union["TracedNumber", float, int]) -> "TracedNumber":
-        return self.binop("-", other, lambda a, b: a - b)
+        table = self.table
+        if isinstance(other, TracedNumber):
+            value = self.value - other.value
+            return TracedNumber(
+                value, table.record(OP_SUB, self.trace, other.trace, value), table
+            )
+        value = self.value - other
+        b = table.operand(other)
+        return TracedNumber(value, table.record(OP_SUB, self.trace, b, value), table)
 
     def __rsub__(self, other: Union["TracedNumber", float, int]) -> "TracedNumber":
-        return self.lift(other) - self
+        table = self.table
+        if isinstance(other, TracedNumber):
+            value = other.value - self.value
+            return TracedNumber(
+                value, table.record(OP_SUB, other.trace, self.trace, value), table
+            )
+        value = other - self.value
+        a = table.operand(other)
+        return TracedNumber(value, table.record(OP_SUB, a, self.trace, value), table)
 
     def __mul__(self, other: Union["TracedNumber", float, int]) -> "TracedNumber":
-        return self.binop("*", other, lambda a, b: a * b)
+        table = self.table
+        if isinstance(other, TracedNumber):
+            value = self.value * other.value
+            return TracedNumber(
+                value, table.record(OP_MUL, self.trace, other.trace, value), table
+            )
+        value = self.value * other
+        b = table.operand(other)
+        return TracedNumber(value, table.record(OP_MUL, self.trace, b, value), table)
 
     def __rmul__(self, other: Union["TracedNumber", float, int]) -> "TracedNumber":
-        return self.lift(other) * self
+        table = self.table
+        if isinstance(other, TracedNumber):
+            value = other.value * self.value
+            return TracedNumber(
+                value, table.record(OP_MUL, other.trace, self.trace, value), table
+            )
+        value = other * self.value
+        a = table.operand(other)
+        return TracedNumber(value, table.record(OP_MUL, a, self.trace, value), table)
 
     def __truediv__(self, other: Union["TracedNumber", float, int]) -> "TracedNumber":
-        return self.binop("/", other, lambda a, b: a / b)
+        table = self.table
+        if isinstance(other, TracedNumber):
+            value = self.value / other.value
+            return TracedNumber(
+                value, table.record(OP_DIV, self.trace, other.trace, value), table
+            )
+        value = self.value / other
+        b = table.operand(other)
+        return TracedNumber(value, table.record(OP_DIV, self.trace, b, value), table)
 
     def __rtruediv__(self, other: Union["TracedNumber", float, int]) -> "TracedNumber":
-        return self.lift(other) / self
+        table = self.table
+        if isinstance(other, TracedNumber):
+            value = other.value / self.value
+            return TracedNumber(
+                value, table.record(OP_DIV, other.trace, self.trace, value), table
+            )
+        value = other / self.value
+        a = table.operand(other)
+        return TracedNumber(value, table.record(OP_DIV, a, self.trace, value), table)
 
     def __gt__(self, other: Union["TracedNumber", float, int]) -> bool:
         if isinstance(other, self.__class__):
@@ -222,10 +460,17 @@ class TracedNumber:
             return self.value != other
 
     def __str__(self) -> str:
-        return f"{self.value} : {self.trace}"
+        return f"{self.value} : {self.table.tree(self.trace)}"
+
+    def __pos__(self) -> "TracedNumber":
+        table = self.table
+        value = self.value
+        return TracedNumber(value, table.record(OP_POS, self.trace, -1, value), table)
 
     def __neg__(self) -> "TracedNumber":
-        return self.__class__(-self.value, trace=unary("-", self.trace))
+        table = self.table
+        value = -self.value
+        return TracedNumber(value, table.record(OP_NEG, self.trace, -1, value), table)
 
 
 RESULT_DICTIONARY = dict[
@@ -237,41 +482,109 @@ JSON_RESULT_DICTIONARY = dict[
 ]
 
 
+def _set_name(path: Iterable[str], tn: TracedNumber):
+    tn.table.set_name(tn.trace, ".".join(path))
+
+
 def set_names(r: RESULT_DICTIONARY, path: list[str] = []) -> None:
-    """For all name definitions at the toplevel of a tracednumber, set their name to
-    the path to that traced number in the tree.  Unless the name is already set.
-    This is done by side effect and relies on sharing for the proper effect.
+    """For all traced numbers, set the name of their node to the path to that traced
+    number in the tree.  Unless the name is already set.
     """
-
-    def helper(
-        path: list[str],
-        node: Union[int, float, None, "TracedNumber", "RESULT_DICTIONARY"],
-    ) -> None:
-        match node:
+    for k, v in r.items():
+        match v:
             case TracedNumber():
-                match node.trace:
-                    case {"def_name": ({"name": str(n)} as name), "trace": _}:
-                        if n.startswith("?"):
-                            name["name"] = ".".join(path)
-                    case _:
-                        pass
-            case int() | float() | None:
-                pass
+                _set_name(path + [k], v)
             case dict():
-                return set_names(node, path)
+                set_names(v, path + [k])
+            case _:
+                pass
 
-    for k, v in r.items():
-        helper(path + [k], v)
+
+def set_names_of_leaves(leaves: Iterable[tuple[tuple[str, ...], object]]) -> None:
+    """Like set_names, but for the (path, value) pairs of all leaves of a result."""
+    for (path, v) in leaves:
+        if isinstance(v, TracedNumber):
+            _set_name(path, v)
+
+
+def finalized(tn: TracedNumber, depth: int | None = None) -> ValueWithTrace:
+    """The value and the trace of tn as they should appear in the JSON.
+    The names need to be set before (see set_names).
+
+    With a depth only that many levels of operands are included (see
+    TraceTable.limited_tree).
+    """
+    if depth is None:
+        return {"value": tn.value, "trace": tn.table.finalized_tree(tn.trace)}
+    return {"value": tn.value, "trace": tn.table.limited_tree(tn.trace, depth)}
+
+
+def _content_key(node: dict[str, object]) -> tuple[object, ...]:
+    return tuple(
+        (k, type(v), _key(v) if isinstance(v, (int, float)) else v)
+        for (k, v) in node.items()
+    )
+
+
+class DagExport:
+    """Write traces as a list of nodes instead of nested dicts.
+
+    Every traced number becomes {"value": .., "trace": ndx} and nodes (only
+    those reachable from the exported numbers) look like the nested traces
+    except that operands are indices into nodes:
+        {"literal": v}
+        {"source": .., "key": .., "attr": .., "value": ..}
+        {"fact_or_ass": .., "value": ..}
+        {"binary": op, "a": ndx, "b": ndx, "value": ..}
+        {"unary": op, "a": ndx}
+        {"name": ..}
+    Like in the nested traces a named operand is replaced by its name, so set
+    the names before.  Equal nodes are only written once.
+    """
+
+    table: TraceTable
+    nodes: list[dict[str, object]]
+    _ndxs: dict[int, int]
+    _ndx_of_content: dict[tuple[object, ...], int]
+
+    def __init__(self, table: TraceTable):
+        self.table = table
+        self.nodes = []
+        self._ndxs = {}
+        self._ndx_of_content = {}
+
+    def _add(self, node: dict[str, object]) -> int:
+        key = _content_key(node)
+        ndx = self._ndx_of_content.get(key)
+        if ndx is None:
+            self.nodes.append(node)
+            ndx = self._ndx_of_content[key] = len(self.nodes) - 1
+        return ndx
+
+    def _expression(self, id: int) -> int:
+        if self.table.ops[id] == OP_LITERAL:
+            return self._add({"literal": self.table.value(id)})
+        return self._add(self.table.expression(id, self._operand))  # type: ignore (all other nodes are dicts)
+
+    def _operand(self, id: int) -> int:
+        ndx = self._ndxs.get(id)
+        if ndx is None:
+            n = self.table.names.get(id)
+            ndx = self._expression(id) if n is None else self._add({"name": n})
+            self._ndxs[id] = ndx
+        return ndx
+
+    def finalized(self, tn: TracedNumber) -> dict[str, object]:
+        return {"value": tn.value, "trace": self._expression(tn.trace)}
 
 
 def finalize_traces_in_result(r: RESULT_DICTIONARY, path: list[str] = []) -> None:
     """Finalize the traces.  This does several things:
-    1. We set the names in name definitions for things reachable by following the result tree. (e.g. r18.r.CO2e_combustion_based)
+    1. We set the names of the traced numbers reachable by following the result tree. (e.g. r18.r.CO2e_combustion_based)
     2. We replace all traced numbers by a TracedValue
-    3. We replace the toplevel name definitions by their trace
-    4. We replace all other name definitions by either
-        4.1 their name if the name was resolved in 1
-        4.2 the trace if it wasn't (this can for example happen for intermediate result dictionaries like
+    3. In their traces we replace all operands by either
+        3.1 their name if they were named in 1
+        3.2 their trace if they weren't (this can for example happen for intermediate result dictionaries like
             the sum of several Transport).
     """
     set_names(r)
@@ -280,19 +593,7 @@ def finalize_traces_in_result(r: RESULT_DICTIONARY, path: list[str] = []) -> Non
         for k, v in r.items():
             match v:
                 case TracedNumber() as tn:
-                    match tn.trace:
-                        case {"def_name": _, "trace": t}:
-                            r[k] = {
-                                "value": tn.value,
-                                "trace": _replace_name_defs_by_names(t),
-                            }
-
-                        case _:
-                            r[k] = {
-                                "value": tn.value,
-                                "trace": _replace_name_defs_by_names(tn.trace),
-                            }
-                    assert not isinstance(r[k], TracedNumber)
+                    r[k] = finalized(tn)
                 case int() | float() | None:
                     pass
                 case {"value": _, "trace": _}:
@@ -0,0 +1,199 @@
+"""Tracing views of the reference data.
+
+A traced calculation gets a TracingRefData instead of the RefData. All numbers
+read from that view (the values of rows, facts and assumptions) are
+TracedNumbers, and as the generator only does arithmetic with them so is every
+number it computes from them.  Nothing is changed globally, so traced and
+untraced calculations can run side by side (e.g. in different threads).
+
+Every traced calculation has a TraceTable of its own that holds the nodes of
+its traces (see number).  Once the result is there its traced numbers are
+named by their paths in the result.
+"""
+
+# pyright: strict
+
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Iterable, TypeVar
+import fnmatch
+
+from ..generator import RefData, resultjson
+from ..generator.refdata import DataFrame, FactsAndAssumptions, Row
+from ..generator.resultdict import dataclass_to_result_dict
+from . import number
+
+KeyT = TypeVar("KeyT")
+
+
+class TracedRow(Row[KeyT]):
+    table: number.TraceTable
+
+    def __init__(self, df: DataFrame[KeyT], key_value: KeyT, table: number.TraceTable):
+        super().__init__(df, key_value)
+        self.table = table
+
+    def float(self, attr: str) -> float:
+        v = super().float(attr)
+        key: Any = self.key_value
+        # make facts and assumptions prettier
+        if self.dataset in ["facts", "assumptions"] and attr == "value":
+            tn = number.TracedNumber.fact_or_ass(str(key), v, self.table)
+        else:
+            tn = number.TracedNumber.data(v, self.dataset, key, attr, self.table)
+        return tn  # type: ignore (pyright does not know that tracednumber can be used instead of float)
+
+
+class TracingFactsAndAssumptions(FactsAndAssumptions):
+    """The facts and assumptions of fa as TracedNumbers."""
+
+    table: number.TraceTable
+
+    def __init__(self, fa: FactsAndAssumptions, table: number.TraceTable):
+        self.__dict__.update(fa.__dict__)
+        self.table = table
+
+    def fact(self, keyname: str) -> float:
+        v = super().fact(keyname)
+        return number.TracedNumber.fact_or_ass(keyname, v, self.table)  # type: ignore
+
+    def ass(self, keyname: str) -> float:
+        v = super().ass(keyname)
+        return number.TracedNumber.fact_or_ass(keyname, v, self.table)  # type: ignore
+
+
+class TracingRefData(RefData):
+    """A view of rd (which shares all its data) whose numbers are TracedNumbers."""
+
+    table: number.TraceTable
+
+    def __init__(self, rd: RefData, table: number.TraceTable):
+        self.__dict__.update(rd.__dict__)
+        self._facts_and_assumptions = TracingFactsAndAssumptions(
+            rd.facts_and_assumptions(), table
+        )
+        self.table = table
+
+    def _row(self, df: DataFrame[KeyT], key_value: KeyT) -> Row[KeyT]:
+        return TracedRow(df, key_value, self.table)
+
+
+def _lift_numbers(table: number.TraceTable, v: object) -> None:
+    """Replace the plain numbers in the dataclasses (and dicts) of v by traced literals,
+    so that every number of a traced result has a trace.
+    """
+    if isinstance(v, dict):
+        d: dict[Any, Any] = v  # type: ignore
+        for (k, x) in d.items():
+            if isinstance(x, (float, int)):
+                d[k] = number.TracedNumber.lift(x, table)
+            else:
+                _lift_numbers(table, x)
+    elif is_dataclass(v) and not isinstance(v, type):
+        for fld in fields(v):
+            x = getattr(v, fld.name)
+            if isinstance(x, (float, int)):
+                setattr(v, fld.name, number.TracedNumber.lift(x, table))
+            else:
+                _lift_numbers(table, x)
+
+
+def _traced(table: number.TraceTable, v: object) -> object:
+    """The (dict of the) result v with its numbers named by their paths."""
+    if is_dataclass(v) and not isinstance(v, type):
+        _lift_numbers(table, v)
+    number.set_names_of_leaves(resultjson.leaves(v))
+    return v
+
+
+def with_tracing(enabled: bool, rd: RefData, f: Callable[[RefData], Any]) -> Any:
+    """f(rd), but if enabled f gets a tracing view of rd and the numbers of what it
+    returns are replaced by their values and traces (see number.finalized).
+
+    f should return a Result (or the JSON ready dict of one, e.g. asdict(entries)),
+    which is then returned as its result dict.
+    """
+    if enabled:
+        table = number.TraceTable()
+        v = _traced(table, f(TracingRefData(rd, table)))
+    else:
+        v = f(rd)
+    if is_dataclass(v) and not isinstance(v, type):
+        v = dataclass_to_result_dict(v)
+    if enabled:
+        number.finalize_traces_in_result(v)  # type: ignore
+    return v
+
+
+def dump_with_tracing(
+    enabled: bool,
+    rd: RefData,
+    f: Callable[[RefData], object],
+    fp: resultjson.Writer,
+    *,
+    indent: int | None = None,
+    compact: bool = False,
+    dag: bool = False,
+) -> None:
+    """Like json.dump(with_tracing(enabled, rd, f), fp), but the result is written
+    from the Result (see resultjson). The finalized traces are only built while
+    they are written, not for the whole result at once.
+
+    With dag the traces are written as a list of nodes (see number.DagExport)
+    and the JSON is {"result": .., "traces": [..]}.
+    """
+    if not enabled:
+        resultjson.dump(f(rd), fp, indent=indent, compact=compact)
+        return
+
+    class Traces:
+        pass
+
+    traces = Traces()
+    table = number.TraceTable()
+    export = number.DagExport(table)
+
+    def finalized(v: Any):
+        if isinstance(v, number.TracedNumber):
+            return export.finalized(v) if dag else number.finalized(v)
+        elif v is traces:
+            # Only written after the result, so all nodes were exported.
+            return export.nodes
+        raise TypeError(f"Object of type {type(v).__name__} is not JSON serializable")
+
+    v = _traced(table, f(TracingRefData(rd, table)))
+    if dag:
+        v = {"result": v, "traces": traces}
+    resultjson.dump(v, fp, indent=indent, compact=compact, default=finalized)
+
+
+def _matches(path: tuple[str, ...], pattern: list[str]) -> bool:
+    return len(pattern) <= len(path) and all(
+        fnmatch.fnmatchcase(name, p) for (name, p) in zip(path, pattern)
+    )
+
+
+def explain(
+    rd: RefData,
+    f: Callable[[RefData], object],
+    paths: Iterable[str],
+    *,
+    depth: int | None = None,
+) -> dict[str, Any]:
+    """The values and traces of some paths of the result f returns for a tracing
+    view of rd, as {path: {"value": .., "trace": ..}} (there is no trace for None).
+
+    The paths are selected like by select_paths, so a path may use wildcards and
+    selects everything below it. With a depth only that many levels of operands
+    are included in the traces (see number.finalized).
+    """
+    patterns = [p.split(".") for p in paths]
+    table = number.TraceTable()
+    v = _traced(table, f(TracingRefData(rd, table)))
+    explained: dict[str, Any] = {}
+    for (path, x) in resultjson.leaves(v):
+        if any(_matches(path, pattern) for pattern in patterns):
+            if isinstance(x, number.TracedNumber):
+                explained[".".join(path)] = number.finalized(x, depth)
+            else:
+                explained[".".join(path)] = {"value": x}
+    return explained
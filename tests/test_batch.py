@@ -0,0 +1,46 @@
+# pyright: strict
+
+from types import SimpleNamespace
+from typing import Any, Sequence
+
+import pytest
+
+from climatevision.generator import batch
+
+
+class _RefData:
+    """Just enough of a RefData for calculate_all_ags."""
+
+    def ags_master(self) -> dict[str, str]:
+        return {ags: ags for ags in ["00000001", "00000002", "00000003", "bad"]}
+
+    def facts_and_assumptions(self) -> None:
+        return None
+
+
+def _make_entries(refdata: Any, ags: str, year: int) -> Any:
+    if ags == "bad":
+        raise ValueError("no entries")
+    # 00000001 and 00000002 are in the same group.
+    t_rt7 = "71" if ags == "00000003" else "72"
+    return SimpleNamespace(ags=ags, m_AGS_com=ags, t_rt7=t_rt7, t_rt3="3")
+
+
+def _calculate_group(facts_and_assumptions: Any, entries: Sequence[Any]) -> Any:
+    if any(e.ags == "00000002" for e in entries):
+        raise ZeroDivisionError()
+    return [f"result of {e.ags}" for e in entries]
+
+
+def test_failing_ags_do_not_stop_the_others(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(batch, "make_entries", _make_entries)
+    monkeypatch.setattr(batch, "_calculate_group", _calculate_group)
+    (results, errors) = batch.calculate_all_ags(_RefData(), year=2035)  # type: ignore
+    assert results == {
+        "00000001": "result of 00000001",
+        "00000003": "result of 00000003",
+    }
+    assert {ags: type(e) for (ags, e) in errors.items()} == {
+        "bad": ValueError,
+        "00000002": ZeroDivisionError,
+    }
@@ -0,0 +1,124 @@
+# pyright: strict
+
+from dataclasses import dataclass, replace
+from typing import Any
+
+import pytest
+
+from climatevision.generator import dag, Inputs
+
+
+@dataclass(kw_only=True, frozen=True)
+class _Entries:
+    x: int
+    y: int
+
+
+def _inputs(x: int = 1, y: int = 2, facts: Any = None) -> Inputs:
+    return Inputs(facts_and_assumptions=facts, entries=_Entries(x=x, y=y))  # type: ignore
+
+
+def _make_a(inputs: Any) -> list[str]:
+    return ["a"]
+
+
+def _make_b(inputs: Any, *, a: list[str]) -> list[str]:
+    return a + ["b"]
+
+
+def _make_c(inputs: Any) -> str:
+    return "c"
+
+
+def _update_a(inputs: Any, *, a: list[str], b: Any = None) -> None:
+    a.append("updated")
+
+
+def _make_d(inputs: Any, *, a: list[str]) -> list[str]:
+    return list(a)
+
+
+def _graph() -> dag.Graph:
+    return dag.Graph(
+        [
+            dag.Node(name="a", fn=_make_a),
+            dag.Node(name="b", fn=_make_b, deps=("a",)),
+            dag.Node(name="c", fn=_make_c),
+            dag.Node(name="a_update", fn=_update_a, deps=("a", "b"), updates="a"),
+            dag.Node(name="d", fn=_make_d, deps=("a_update",)),
+        ]
+    )
+
+
+def test_run_all_nodes():
+    g = _graph()
+    for max_workers in [1, 4]:
+        e = g.run(_inputs(), max_workers=max_workers)
+        assert e.values["b"] == ["a", "b"]
+        assert e.values["d"] == ["a", "updated"]
+        assert e.values["a_update"] is e.values["a"]
+        assert set(e.seconds.keys()) == set(g.nodes.keys())
+
+
+def test_final_and_required():
+    g = _graph()
+    assert g.final("a") == "a_update"
+    assert g.final("b") == "b"
+    assert g.required(["d"]) == ["a", "b", "a_update", "d"]
+    e = g.run(_inputs(), targets=["b"])
+    assert list(e.values.keys()) == ["a", "b"]
+
+
+def test_update_must_come_after_all_uses():
+    with pytest.raises(AssertionError):
+        dag.Graph(
+            [
+                dag.Node(name="a", fn=_make_a),
+                dag.Node(name="a_update", fn=_update_a, deps=("a",), updates="a"),
+                dag.Node(name="d", fn=_make_d, deps=("a",)),
+            ]
+        )
+
+
+def _read_x(inputs: Inputs) -> list[int]:
+    return [inputs.entries.x]  # type: ignore
+
+
+def _add_y(inputs: Inputs, *, x: list[int]) -> None:
+    x.append(inputs.entries.y)  # type: ignore
+
+
+def _sum(inputs: Inputs, *, x: list[int]) -> int:
+    return sum(x)
+
+
+def test_rerun_only_what_depends_on_changed_entries():
+    g = dag.Graph(
+        [
+            dag.Node(name="x", fn=_read_x),
+            dag.Node(name="c", fn=_make_c),
+            dag.Node(name="x_y", fn=_add_y, deps=("x",), updates="x"),
+            dag.Node(name="sum", fn=_sum, deps=("x_y",)),
+        ]
+    )
+    inputs = _inputs(x=1, y=2)
+    first = g.run(inputs)
+    assert first.values["sum"] == 3
+    assert first.entries_read["x"] == {"x"}
+    assert first.entries_read["x_y"] == {"y"}
+
+    second = g.rerun(first, inputs.with_entries(replace(inputs.entries, x=10)))  # type: ignore
+    assert second.values["sum"] == 12
+    assert set(second.seconds.keys()) == {"x", "x_y", "sum"}
+    # x is updated in place by x_y, so it must be recalculated as well.
+    third = g.rerun(second, inputs.with_entries(replace(second.inputs.entries, y=5)))  # type: ignore
+    assert third.values["sum"] == 15
+    assert set(third.seconds.keys()) == {"x", "x_y", "sum"}
+    assert second.values["sum"] == 12 and second.values["x"] == [10, 2]
+
+    nothing_changed = g.rerun(third, third.inputs)
+    assert nothing_changed.seconds == {}
+    assert nothing_changed.values == third.values
+
+    other_facts = g.rerun(third, _inputs(x=10, y=5, facts=object()))
+    assert set(other_facts.seconds.keys()) == set(g.nodes.keys())
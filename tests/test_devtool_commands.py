@@ -1,8 +1,12 @@
 # pyright: strict
 
+from pathlib import Path
 from typing import Any
 import os
 
+import pytest
+
+from commands import cmd_bench, cmd_test_end_to_end
 from devtool import Devtool
 
 filePath = "test.txt"
@@ -55,6 +59,38 @@ def test_cmd_make_entries_with_parameters():
         assert False, "file " + filePath + " was not created"
 
 
+def test_cmd_dependents():
+    check_cmd(
+        ["dependents", "r_gas_fec", "-used_by", "tests/usage.json"],
+        "dependents",
+        True,
+    )
+
+
+def test_cmd_bench():
+    check_cmd(
+        ["bench", "-ags", "03159016", "-warmup", "0", "-repetitions", "1"],
+        "bench",
+        True,
+    )
+
+
+def test_bench_stats_and_baseline():
+    s = cmd_bench.stats([0.3, 0.1, 0.2])
+    assert (s["n"], s["min"], s["p50"], s["max"]) == (3, 0.1, 0.2, 0.3)
+    baseline = {"a": {"p50": 1.0}, "b": {"p50": 1.0}, "c": {"p50": 1.0}}
+    stages = {
+        "a": {"p50": 1.5},
+        "b": {"p50": 1.05},
+        "c": {"p50": 0.5},
+        "d": {"p50": 1.0},
+    }
+    compared = cmd_bench.compare_with_baseline(stages, baseline, tolerance=0.1)
+    assert compared["p50_ratio"] == {"a": 1.5, "b": 1.05, "c": 0.5}
+    assert compared["slower"] == ["a"]
+    assert compared["faster"] == ["c"]
+
+
 def test_cmd_explorer():
     check_cmd(
         ["explorer"],
@@ -63,6 +99,14 @@ def test_cmd_explorer():
     )
 
 
+def test_cmd_serve():
+    check_cmd(
+        ["serve", "-workers", "4", "-timeout", "30"],
+        "serve",
+        False,  # You can't run this command here, because it won't return.
+    )
+
+
 def test_cmd_ready_to_rock():
     check_cmd(
         ["ready_to_rock"],
@@ -111,6 +155,95 @@ def test_cmd_test_end_to_end_run_all_ags():
     )
 
 
+def test_cmd_test_end_to_end_run_all_ags_with_parameters():
+    check_cmd(
+        ["test_end_to_end", "run_all_ags", "-jobs", "4", "-o", "out", "-restart"],
+        "run_all_ags",
+        False,  # Same rationale as above
+    )
+
+
+def test_run_all_ags_resume(tmp_path: Path):
+    # 01 was written completely, 02 only to results.jsonl (the checkpoint was
+    # not flushed anymore), 03 failed and 04 was interrupted while writing.
+    (tmp_path / "results.jsonl").write_text(
+        '{"ags": "01", "result": {}}\n{"ags": "02", "result": {}}\n{"ags": "04", "res'
+    )
+    (tmp_path / "errors.txt").write_text("03\tValueError('x')\n")
+    (tmp_path / "checkpoint.txt").write_text("01\tOK\n03\tERROR\n")
+    done = cmd_test_end_to_end._recover_run_all_ags(str(tmp_path))  # type: ignore
+    assert done == {"01", "02", "03"}
+    assert (tmp_path / "results.jsonl").read_text().endswith('"02", "result": {}}\n')
+    assert (tmp_path / "checkpoint.txt").read_text() == "01\tOK\n02\tOK\n03\tERROR\n"
+
+
+class _AgsOnly:
+    """Just enough of a RefData for update_golden and check_golden."""
+
+    def __init__(self, ags: list[str]):
+        self.ags = ags
+
+    def ags_master(self) -> dict[str, str]:
+        return {ags: ags for ags in self.ags}
+
+    def version(self) -> None:
+        return None
+
+
+def test_golden_store_of_failing_first_ags(monkeypatch: pytest.MonkeyPatch):
+    def result_dict(ags: str, year: int) -> dict[str, Any]:
+        if ags == "01":
+            raise ValueError("x")
+        return {"r18": {"a": float(year), "b": None}}
+
+    # The workers are forked, so they see this as well.
+    monkeypatch.setattr(cmd_test_end_to_end, "_run_all_ags_result_dict", result_dict)
+    rd: Any = _AgsOnly(["01", "02"])
+    store = cmd_test_end_to_end.update_golden(rd, [2035], jobs="2")
+    assert store.schema.paths == ("r18.a", "r18.b")
+    assert store.keys == [("01", 2035), ("02", 2035)]
+    assert store.errors == ["ValueError('x')", ""]
+    assert cmd_test_end_to_end.check_golden(rd, store, jobs="2") == []
+
+    def fixed(ags: str, year: int) -> dict[str, Any]:
+        return {"r18": {"a": float(year), "b": None}}
+
+    monkeypatch.setattr(cmd_test_end_to_end, "_run_all_ags_result_dict", fixed)
+    [(ags, year, _)] = cmd_test_end_to_end.check_golden(rd, store, jobs="2")
+    assert (ags, year) == ("01", 2035)
+
+
+def test_golden_store_of_two_schemas(monkeypatch: pytest.MonkeyPatch):
+    def result_dict(ags: str, year: int) -> dict[str, Any]:
+        if ags == "02":
+            return {"r18": {"a": float(year)}}
+        return {"r18": {"a": float(year), "b": None}}
+
+    monkeypatch.setattr(cmd_test_end_to_end, "_run_all_ags_result_dict", result_dict)
+    rd: Any = _AgsOnly(["01", "02", "03"])
+    store = cmd_test_end_to_end.update_golden(rd, [2035], jobs="2")
+    assert store.schema.paths == ("r18.a", "r18.b")
+    assert store.errors == ["", "", ""]
+    assert list(store.other_shapes) == [1]
+    assert cmd_test_end_to_end.check_golden(rd, store, jobs="2") == []
+
+    def changed(ags: str, year: int) -> dict[str, Any]:
+        if ags == "02":
+            return {"r18": {"a": 1.0}}
+        return result_dict(ags, year)
+
+    monkeypatch.setattr(cmd_test_end_to_end, "_run_all_ags_result_dict", changed)
+    [(ags, year, _)] = cmd_test_end_to_end.check_golden(rd, store, jobs="2")
+    assert (ags, year) == ("02", 2035)
+
+
+def test_golden_store_of_nothing():
+    rd: Any = _AgsOnly([])
+    store = cmd_test_end_to_end.update_golden(rd, [2035], jobs="1")
+    assert store.keys == []
+    assert len(store.schema) == 0
+
+
 def test_cmd_test_end_to_end_update_expectations():
     check_cmd(
         ["test_end_to_end", "update_expectations"],
@@ -0,0 +1,38 @@
+# pyright: strict
+
+from climatevision.generator import diffs
+
+EXPECTED = {
+    "r18": {"a": 1.0, "b": {"c": 2.5, "d": None}},
+    "h30": {"e": float("nan"), "f": 0.0, "g": 3},
+}
+
+
+def test_compare_finds_the_same_diffs_as_all():
+    actual = {
+        "r18": {"a": 1.0 + 1e-12, "b": {"c": 2.6, "d": 5}},
+        "h30": {"e": float("nan"), "f": 1e-3, "g": 3},
+    }
+    report = diffs.compare(actual=actual, expected=EXPECTED)
+    assert report.compared == 6
+    assert report.changed == 3
+    # None -> 5 and 0 -> 1e-3 are infinitely large relative changes, the larger
+    # absolute difference comes first.
+    assert [d.path for d in report.top] == ["r18.b.d", "h30.f", "r18.b.c"]
+    assert report.top[0].expected is None
+    assert report.sectors["r18"].leaves == 3
+    assert report.sectors["r18"].changed == 2
+    assert report.sectors["h30"].max_abs == 1e-3
+
+    report = diffs.compare(actual=EXPECTED, expected=EXPECTED, top=1)
+    assert report.changed == 0
+    assert report.top == []
+
+
+def test_compare_reports_missing_leaves():
+    actual = {"r18": {"a": 1.0, "b": {"c": 2.5, "d": None}}, "x": {"y": 1}}
+    report = diffs.compare(actual=actual, expected=EXPECTED, top=2)
+    assert report.compared == 3
+    assert report.changed == 4
+    assert [d.path for d in report.top] == ["h30.e", "h30.f"]
+    assert report.top[0].actual is diffs.MISSING_SENTINEL
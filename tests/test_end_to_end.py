@@ -9,12 +9,17 @@ import os
 import pytest
 
 from climatevision.generator import (
+    batch,
     refdatatools,
     diffs,
     make_entries,
     calculate_with_default_inputs,
+    select_paths,
     RefData,
 )
+from climatevision.generator.goldenstore import GoldenStore
+from climatevision.compiler import CompiledGenerator
+from commands import cmd_test_end_to_end
 
 PUBLIC_OR_PROP = Literal["public", "proprietary"]
 
@@ -157,3 +162,59 @@ def test_end_to_end_goettingen_2025(datadir_status: refdatatools.DataDirStatus):
 # Max year for the generator and website = 2050
 def test_end_to_end_goettingen_2050(datadir_status: refdatatools.DataDirStatus):
     end_to_end(datadir_status, ags="03159016", year=2050)
+
+
+def test_batch_matches_single_calculations():
+    """The vectorized calculation of many AGS must give the same results as
+    calculating them one by one."""
+    refdata = RefData.load()
+    agss = ["03159016", "08416041", "03159000", "03000000", "DG000000"]
+    (results, errors) = batch.calculate_all_ags(refdata, year=2035, agss=agss)
+    assert errors == {}
+    for ags in agss:
+        expected = calculate_with_default_inputs(ags=ags, year=2035).result_dict()
+        got = results[ags].result_dict()
+        ds = list(diffs.all(expected=expected, actual=got))  # type: ignore
+        for d in ds:
+            print(ags, d)
+        assert not ds, f"Batch result for {ags} differs"
+
+
+def test_partial_calculation_matches_full_calculation():
+    paths = ["bisko.*", "r18.r.CO2e_total", "m183X"]
+    full = calculate_with_default_inputs(ags="03159016", year=2035)
+    partial = calculate_with_default_inputs(ags="03159016", year=2035, paths=paths)
+    assert partial.e30 is None  # type: ignore
+    expected = select_paths(full.result_dict(), paths)
+    got = select_paths(partial.result_dict(), paths)
+    ds = list(diffs.all(expected=expected, actual=got))  # type: ignore
+    for d in ds:
+        print(d)
+    assert not ds, "Partial calculation differs"
+
+
+def test_compiled_generator_matches_calculation():
+    refdata = RefData.load()
+    compiled = CompiledGenerator(refdata.facts_and_assumptions())
+    for ags in ["03159016", "08416041", "DG000000"]:
+        expected = calculate_with_default_inputs(ags=ags, year=2035).result_dict()
+        got = compiled.result_dict(make_entries(refdata, ags, 2035))
+        ds = list(diffs.all(expected=expected, actual=got))  # type: ignore
+        for d in ds:
+            print(ags, d)
+        assert not ds, f"Compiled result for {ags} differs"
+
+
+def test_golden_store():
+    """Compare all AGS with the golden store (see devtool test_end_to_end
+    update_golden), if there is one."""
+    root = refdatatools.root_of_this_repo()
+    fname = os.path.join(root, cmd_test_end_to_end.default_golden_store)
+    if not os.path.exists(fname):
+        pytest.skip("There is no golden store")
+    store = GoldenStore.load(fname)
+    regressions = cmd_test_end_to_end.check_golden(RefData.load(), store)
+    for (ags, year, differences) in regressions:
+        for d in differences:
+            print(ags, year, d)
+    assert not regressions, f"{len(regressions)} results differ from the golden store"
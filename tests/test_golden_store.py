@@ -0,0 +1,87 @@
+# pyright: strict
+
+from typing import Any
+import os
+
+import numpy as np
+import pytest
+
+from climatevision.generator import resultvector
+from climatevision.generator.goldenstore import GoldenStore
+from climatevision.generator.refdata import Version
+
+RESULT = {"r18": {"a": 1, "b": None}, "h30": {"c": float("nan"), "d": -0.0}}
+
+
+def test_round_trip(tmp_path: str):
+    (schema, vector) = resultvector.vector_of_result_dict(RESULT)
+    store = GoldenStore.of_rows(
+        [
+            ("08416041", 2035, (schema, vector * 2), ""),
+            ("03159016", 2050, None, "ValueError('x')"),
+            ("03159016", 2035, (schema, vector), ""),
+        ],
+        data_version=Version(public="a", proprietary="b"),
+    )
+    assert store.keys == [("03159016", 2035), ("03159016", 2050), ("08416041", 2035)]
+    fname = os.path.join(tmp_path, "golden.npz")
+    store.save(fname)
+
+    loaded = GoldenStore.load(fname)
+    assert loaded.schema.id == schema.id
+    assert loaded.keys == store.keys
+    assert loaded.errors == ["", "ValueError('x')", ""]
+    assert loaded.data_version == Version(public="a", proprietary="b")
+    assert loaded.values.tobytes() == store.values.tobytes()
+    assert loaded.values[loaded.row("03159016", 2035)].tobytes() == vector.tobytes()
+    assert resultvector.is_null(loaded.values[loaded.row("03159016", 2050)]).all()
+    with pytest.raises(KeyError):
+        loaded.row("03159016", 2040)
+
+
+def test_other_shapes(tmp_path: str):
+    (schema, vector) = resultvector.vector_of_result_dict(RESULT)
+    (other, other_vector) = resultvector.vector_of_result_dict({"r18": {"a": 2}})
+    store = GoldenStore.of_rows(
+        [
+            ("01", 2035, (other, other_vector), ""),
+            ("02", 2035, (schema, vector), ""),
+            ("03", 2035, (schema, vector * 2), ""),
+            ("04", 2035, (other, other_vector * 3), ""),
+            ("05", 2035, (schema, vector * 4), ""),
+        ]
+    )
+    assert store.schema.id == schema.id
+    fname = os.path.join(tmp_path, "golden.npz")
+    store.save(fname)
+
+    loaded = GoldenStore.load(fname)
+    assert loaded.schema.id == schema.id
+    assert sorted(loaded.other_shapes) == [0, 3]
+    for (ags, factor, expected_schema, expected) in [
+        ("01", 1, other, other_vector),
+        ("03", 2, schema, vector),
+        ("04", 3, other, other_vector),
+    ]:
+        (s, v) = loaded.result_vector(loaded.row(ags, 2035))
+        assert s.id == expected_schema.id
+        assert v.tobytes() == (expected * factor).tobytes()
+
+
+def test_the_first_of_the_most_common_schemas_wins():
+    (schema, vector) = resultvector.vector_of_result_dict(RESULT)
+    (other, other_vector) = resultvector.vector_of_result_dict({"r18": {"a": 2}})
+    rows: list[Any] = [
+        ("02", 2035, (schema, vector), ""),
+        ("01", 2035, (other, other_vector), ""),
+    ]
+    assert GoldenStore.of_rows(rows).schema.id == other.id
+    assert GoldenStore.of_rows(list(reversed(rows))).schema.id == other.id
+
+
+def test_shape_must_match():
+    (schema, _) = resultvector.vector_of_result_dict(RESULT)
+    with pytest.raises(ValueError):
+        GoldenStore(
+            schema=schema, keys=[("x", 2035)], values=np.zeros((1, 2)), errors=[""]
+        )
@@ -0,0 +1,215 @@
+# pyright: strict
+
+from http.client import HTTPConnection
+from typing import Any, Iterator
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from climatevision.server import httpserver
+from climatevision.server.httpserver import RpcServer, ServerConfig, WorkerFailed
+from climatevision.tracing.dependencies import DependencyIndex
+
+
+class _NoRefData:
+    """Just enough of a RefData for the server, the tests never calculate."""
+
+    def version(self) -> None:
+        return None
+
+    def nbytes(self) -> int:
+        return 0
+
+
+def _sleep(seconds: float) -> str:
+    time.sleep(seconds)
+    return "null"
+
+
+def _echo(arg: Any) -> str:
+    return json.dumps(arg)
+
+
+def _crash(arg: Any) -> str:
+    os._exit(1)
+
+
+def _pid(arg: Any) -> int:
+    return os.getpid()
+
+
+@pytest.fixture
+def server() -> Iterator[RpcServer]:
+    config = ServerConfig(
+        host="127.0.0.1", port=0, workers=1, timeout=0.5, max_pending=1
+    )
+    server = RpcServer(_NoRefData(), config)  # type: ignore
+    server.start_workers()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.stop()
+        thread.join()
+        server.close()
+
+
+def _url(server: RpcServer, path: str) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def _get(server: RpcServer, path: str) -> tuple[int, bytes]:
+    try:
+        with urlopen(_url(server, path)) as response:
+            return (response.status, response.read())
+    except HTTPError as e:
+        return (e.code, e.read())
+
+
+def _post(server: RpcServer, request: object) -> tuple[int, Any]:
+    r = Request(
+        _url(server, server.config.api_path),
+        data=json.dumps(request).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urlopen(r) as response:
+            return (response.status, json.load(response))
+    except HTTPError as e:
+        return (e.code, json.load(e))
+
+
+def _wait_until_idle(server: RpcServer):
+    for _ in range(100):
+        if server._pending.acquire(blocking=False):  # type: ignore
+            server._pending.release()  # type: ignore
+            return
+        time.sleep(0.05)
+    raise AssertionError("the worker is still busy")
+
+
+def test_health(server: RpcServer):
+    assert _get(server, "/health") == (200, b"ok")
+    server.draining = True
+    assert _get(server, "/health") == (503, b"shutting down")
+
+
+def test_overload(server: RpcServer):
+    busy = threading.Thread(target=server.in_worker, args=(1, _sleep, 0.3))
+    busy.start()
+    time.sleep(0.1)
+    (status, response) = _post(
+        server, {"jsonrpc": "2.0", "method": "calculate-vector", "params": [], "id": 2}
+    )
+    busy.join()
+    assert status == 503
+    assert response["error"]["message"] == "Server busy"
+    assert response["id"] == 2
+
+
+def test_timeout_keeps_the_worker_until_it_is_done(server: RpcServer):
+    with pytest.raises(WorkerFailed) as e:
+        server.in_worker(1, _sleep, 1.0)
+    assert e.value.status == 504
+    # The worker is still calculating.
+    with pytest.raises(WorkerFailed) as e:
+        server.in_worker(2, _echo, "hello")
+    assert e.value.status == 503
+    _wait_until_idle(server)
+    assert server.in_worker(3, _echo, "hello") == '"hello"'
+
+
+def test_worker_crash_replaces_the_pool(server: RpcServer):
+    [pool] = server.pools
+    with pytest.raises(WorkerFailed) as e:
+        server.in_worker(1, _crash, None)
+    assert e.value.status == 500
+    assert json.loads(e.value.response)["error"]["message"] == "Worker process died"
+    assert server.pools[0] is not pool
+    _wait_until_idle(server)
+    assert server.in_worker(2, _echo, [1, 2]) == "[1, 2]"
+
+
+def test_an_ags_and_year_always_goes_to_the_same_worker():
+    config = ServerConfig(host="127.0.0.1", port=0, workers=4)
+    server = RpcServer(_NoRefData(), config)  # type: ignore
+    try:
+        server.start_workers()
+        keys = [json.dumps([f"0315901{n}", 2035]) for n in range(8)]
+        pids = [server.in_worker(1, _pid, None, key=key) for key in keys]
+        assert len(set(pids)) > 1
+        for _ in range(3):
+            again = [server.in_worker(1, _pid, None, key=key) for key in keys]
+            assert again == pids
+    finally:
+        server.close()
+    # calculate and calculate-vector by name or by position.
+    by_name = {"year": 2035, "ags": "03159016"}
+    assert httpserver._ags_year_key(by_name) == keys[6]  # type: ignore
+    assert httpserver._ags_year_key(["03159016", 2035, {}]) == keys[6]  # type: ignore
+
+
+def test_closing_an_unstarted_stream(server: RpcServer):
+    (status, stream) = server.dispatch(
+        json.dumps(
+            {
+                "jsonrpc": "2.0",
+                "method": "calculate-many",
+                "params": {"jobs": [{"ags": "03159016", "year": 2035}]},
+                "id": 1,
+            }
+        )
+    )
+    assert status == 200
+    assert not isinstance(stream, str)
+    # As when sending the headers fails.
+    stream.close()
+    assert server._pending.acquire(blocking=False)  # type: ignore
+    server._pending.release()  # type: ignore
+    requests = server.request_metrics.snapshot()[("calculate-many", False)].requests
+    assert requests == {200: 1}
+
+
+def test_dependents_are_cached_by_the_server(server: RpcServer):
+    index = DependencyIndex(dependents={"Fact_A": ["r18.a"]})
+    server.rpcs.keep_dependency_index("03159016", 2035, index)
+
+    def dependents(id: int, params: object) -> tuple[int, Any]:
+        return _post(
+            server,
+            {"jsonrpc": "2.0", "method": "dependents", "params": params, "id": id},
+        )
+
+    assert dependents(1, ["03159016", 2035, ["Fact_A"]]) == (
+        200,
+        {"jsonrpc": "2.0", "result": {"Fact_A": ["r18.a"]}, "id": 1},
+    )
+    (status, response) = dependents(
+        2, {"ags": "03159016", "year": 2035, "names": ["Fact_X"]}
+    )
+    assert (status, response["error"]["code"]) == (200, -32602)
+    # Not cached, so a worker builds the index (which fails without reference data).
+    (status, response) = dependents(3, ["03159016", 2030, ["Fact_A"]])
+    assert (status, response["error"]["code"]) == (200, -32000)
+    assert server.rpcs.cached_dependency_index("03159016", 2030) is None
+
+
+@pytest.mark.parametrize(
+    "content_length,body", [("abc", b"{}"), ("-1", b"{}"), ("2", b"\xff\xfe")]
+)
+def test_bad_request(server: RpcServer, content_length: str, body: bytes):
+    connection = HTTPConnection("127.0.0.1", server.server_address[1])
+    try:
+        connection.putrequest("POST", server.config.api_path)
+        connection.putheader("Content-Length", content_length)
+        connection.endheaders()
+        connection.send(body)
+        assert connection.getresponse().status == 400
+    finally:
+        connection.close()
@@ -0,0 +1,121 @@
+# pyright: strict
+
+from typing import Any
+import logging
+import tracemalloc
+
+import pytest
+
+from climatevision.generator import dag, instrumentation, Inputs
+from climatevision.generator.instrumentation import Histogram, HistogramHook, Timing
+
+
+class _Recording(instrumentation.Hook):
+    def __init__(self):
+        self.events: list[tuple[str, str]] = []
+        self.timings: dict[str, Timing] = {}
+        self.error: BaseException | None = None
+
+    def stage_started(self, stage: str):
+        self.events.append(("start", stage))
+
+    def stage_done(self, stage: str, timing: Timing):
+        self.events.append(("done", stage))
+        self.timings[stage] = timing
+
+    def stage_failed(self, stage: str, timing: Timing, error: BaseException):
+        self.events.append(("failed", stage))
+        self.timings[stage] = timing
+        self.error = error
+
+
+def _make_a(inputs: Any) -> list[int]:
+    return list(range(1000))
+
+
+def _make_b(inputs: Any, *, a: list[int]) -> int:
+    return sum(a)
+
+
+def _fail(inputs: Any, *, a: list[int]) -> int:
+    raise ValueError("boom")
+
+
+def _inputs() -> Inputs:
+    return Inputs(facts_and_assumptions=None, entries=None)  # type: ignore
+
+
+def test_hooks_see_every_stage():
+    g = dag.Graph(
+        [dag.Node(name="a", fn=_make_a), dag.Node(name="b", fn=_make_b, deps=("a",))]
+    )
+    for max_workers in [1, 4]:
+        recording = _Recording()
+        histograms = HistogramHook()
+        e = g.run(_inputs(), max_workers=max_workers, hooks=[recording, histograms])
+        assert recording.events == [
+            ("start", "a"),
+            ("done", "a"),
+            ("start", "b"),
+            ("done", "b"),
+        ]
+        assert recording.timings["a"].wall == e.seconds["a"]
+        assert recording.timings["a"].cpu >= 0
+        assert recording.timings["a"].allocated is None
+        snapshot = histograms.snapshot()
+        assert snapshot["b"].wall.count == 1
+        assert sum(snapshot["b"].cpu.counts) == 1
+
+    tracemalloc.start()
+    try:
+        recording = _Recording()
+        g.run(_inputs(), hooks=[recording])
+        allocated = recording.timings["a"].allocated
+        assert allocated is not None and allocated > 0
+    finally:
+        tracemalloc.stop()
+
+
+def test_failed_event_for_failed_stage():
+    g = dag.Graph(
+        [dag.Node(name="a", fn=_make_a), dag.Node(name="f", fn=_fail, deps=("a",))]
+    )
+    for max_workers in [1, 4]:
+        recording = _Recording()
+        with pytest.raises(ValueError):
+            g.run(_inputs(), max_workers=max_workers, hooks=[recording])
+        assert recording.events == [
+            ("start", "a"),
+            ("done", "a"),
+            ("start", "f"),
+            ("failed", "f"),
+        ]
+        assert str(recording.error) == "boom"
+        assert recording.timings["f"].wall >= 0
+
+
+def test_registered_hooks():
+    hook = _Recording()
+    assert hook not in instrumentation.active_hooks()
+    instrumentation.register(hook)
+    try:
+        other = instrumentation.Hook()
+        assert instrumentation.active_hooks([other]) == [hook, other]
+    finally:
+        instrumentation.unregister(hook)
+    assert hook not in instrumentation.active_hooks()
+
+
+def test_histogram():
+    h = Histogram(bounds=(0.1, 1.0))
+    for v in [0.05, 0.1, 0.5, 2.0]:
+        h.add(v)
+    assert h.counts == [2, 1, 1]
+    assert h.count == 4
+    assert h.sum == pytest.approx(2.65)
+
+
+def test_logging_hook(caplog: pytest.LogCaptureFixture):
+    with caplog.at_level(logging.DEBUG):
+        instrumentation.LoggingHook().stage_done("r18", Timing(wall=0.5, cpu=0.25))
+    assert caplog.messages == ["r18_calc: 0.500s (cpu 0.250s)"]
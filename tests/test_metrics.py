@@ -0,0 +1,79 @@
+# pyright: strict
+
+from climatevision.generator.refdata import Version
+from climatevision.server import metrics
+from climatevision.server.resultcache import CacheStats
+
+
+def _render(requests: metrics.RequestMetrics) -> list[str]:
+    return metrics.render(
+        requests,
+        cache=CacheStats(
+            hits=3, misses=1, evictions=0, entries=1, bytes=100, max_bytes=1000
+        ),
+        workers=2,
+        pool_jobs=[4, 1],
+        refdata_bytes=12345,
+        data_version=Version(public="abc", proprietary='x"y'),
+    ).splitlines()
+
+
+def test_render_requests():
+    requests = metrics.RequestMetrics()
+    for (seconds, size) in [(0.003, 500), (0.2, 2000), (200.0, 2000)]:
+        requests.observe(
+            "calculate", traced=False, status=200, seconds=seconds, response_bytes=size
+        )
+    requests.observe(
+        "calculate", traced=True, status=504, seconds=120.0, response_bytes=10
+    )
+    lines = _render(requests)
+
+    assert "# TYPE generator_rpc_requests_total counter" in lines
+    assert (
+        'generator_rpc_requests_total{method="calculate",traced="false",status="200"} 3'
+        in lines
+    )
+    assert (
+        'generator_rpc_requests_total{method="calculate",traced="true",status="504"} 1'
+        in lines
+    )
+    buckets = [
+        line.rsplit(" ", maxsplit=1)
+        for line in lines
+        if line.startswith(
+            'generator_rpc_latency_seconds_bucket{method="calculate",traced="false"'
+        )
+    ]
+    assert buckets[0] == [
+        'generator_rpc_latency_seconds_bucket{method="calculate",traced="false",le="0.005"}',
+        "1",
+    ]
+    assert buckets[-2][1] == "2"
+    assert buckets[-1] == [
+        'generator_rpc_latency_seconds_bucket{method="calculate",traced="false",le="+Inf"}',
+        "3",
+    ]
+    assert (
+        'generator_rpc_latency_seconds_count{method="calculate",traced="false"} 3'
+        in lines
+    )
+    assert (
+        'generator_rpc_response_bytes_sum{method="calculate",traced="false"} 4500'
+        in lines
+    )
+
+
+def test_render_state():
+    lines = _render(metrics.RequestMetrics())
+    assert "generator_result_cache_hits_total 3" in lines
+    assert "generator_pool_queue_depth 3" in lines
+    assert "generator_refdata_bytes 12345" in lines
+    assert 'generator_data_version_info{public="abc",proprietary="x\\"y"} 1' in lines
+    # Every sample belongs to the metric declared before it.
+    declared = ""
+    for line in lines:
+        if line.startswith("# TYPE "):
+            declared = line.split()[2]
+        elif not line.startswith("#"):
+            assert line.startswith(declared)
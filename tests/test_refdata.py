@@ -8,9 +8,14 @@
    of the reference data module.
 """
 
+from pathlib import Path
+import sys
+
 import pytest
 
 from climatevision.generator import RefData
+from climatevision.generator import refdata as refdata_module
+from climatevision.generator.refdata import DataFrame, Row, RowNotFound
 
 FEDERAL_STATES = ["%02i000000" % i for i in range(1, 17)]
 
@@ -60,3 +65,97 @@ def test_co2path(refdata: RefData):
     p = refdata.co2path(2035)
     assert p.float("GHG_budget_2016_to_year") == pytest.approx(7923139996.0)
     assert p.float("nonCO2_budget_2016_to_year") == pytest.approx(1586688275)
+
+
+def test_snapshot_matches_csv(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Loading via the snapshot must give the same data as parsing the CSV files."""
+    snapshot = tmp_path / "refdata.pickle"
+    monkeypatch.setattr(
+        refdata_module, "_snapshot_path", lambda *args, **kwargs: str(snapshot)
+    )
+    from_csv = RefData.load(use_snapshot=False)
+    RefData.load()  # make sure the snapshot exists
+    assert snapshot.exists()
+    from_snapshot = RefData.load()
+    assert from_snapshot.version() == from_csv.version()
+    assert from_snapshot.ags_master() == from_csv.ags_master()
+    for ags in FEDERAL_STATES:
+        assert str(from_snapshot.traffic(ags)) == str(from_csv.traffic(ags))
+        assert str(from_snapshot.population(ags)) == str(from_csv.population(ags))
+    assert from_snapshot.fact("Fact_M_CO2e_wo_lulucf_2015_vs_2018") == from_csv.fact(
+        "Fact_M_CO2e_wo_lulucf_2015_vs_2018"
+    )
+
+
+def test_area_kinds_are_kept_as_strings(refdata: RefData):
+    """rt7 looks like a number but is a code, so it must not be turned into e.g. '71.0'."""
+    assert refdata.area_kinds("03159016").str("rt7") in [
+        "71",
+        "72",
+        "73",
+        "74",
+        "75",
+        "76",
+        "77",
+    ]
+
+
+def test_constant_table_matches_rows(refdata: RefData):
+    facts = refdata.facts_and_assumptions().facts
+    for label in facts.labels[:50]:
+        expected = Row(refdata.facts_and_assumptions()._facts, label).float("value")  # type: ignore
+        assert facts.by_label(label) == expected
+        assert facts.by_id(facts.id_of(label)) == expected
+    with pytest.raises(RowNotFound):
+        refdata.fact("Fact_does_not_exist")
+    with pytest.raises(RowNotFound):
+        refdata.facts_and_assumptions().assumptions.id_of("Ass_does_not_exist")
+
+
+def test_str_of_numeric_cells_is_the_csv_text(tmp_path: Path):
+    (tmp_path / "public" / "numbers").mkdir(parents=True)
+    (tmp_path / "public" / "numbers" / "2018.csv").write_text(
+        "ags,a,b\n01000000,1.0,1e3\n02000000,1,\n"
+    )
+    df = DataFrame.load_ags(str(tmp_path), "numbers")
+    row = Row(df, "01000000")
+    assert row.float("a") == 1.0
+    assert row.str("a") == "1.0"
+    assert row.str("b") == "1e3"
+    assert Row(df, "02000000").str("a") == "1"
+    assert Row(df, "02000000").str("b") == ""
+    df.append_rows({"01000000": [2.0, 3.5]})
+    assert Row(df, "01000000").str("a") == "2"
+    assert Row(df, "01000000").str("b") == "3.5"
+
+
+def test_nbytes_counts_every_frame_once(tmp_path: Path):
+    (tmp_path / "public" / "any").mkdir(parents=True)
+    (tmp_path / "public" / "any" / "2018.csv").write_text(
+        "ags,description,value\n01000000,a,1\n02000000,b,2.5\n"
+    )
+    names = [
+        "ags_master",
+        "area",
+        "area_kinds",
+        "assumptions",
+        "buildings",
+        "co2path",
+        "destatis",
+        "facts",
+        "flats",
+        "nat_agri",
+        "nat_organic_agri",
+        "nat_energy",
+        "nat_res_buildings",
+        "population",
+        "renewable_energy",
+        "traffic",
+    ]
+    frames = {name: DataFrame.load_ags(str(tmp_path), "any") for name in names}
+    rd = RefData(**frames, fix_missing_entries=False)  # type: ignore
+    expected = sum(df.nbytes() for (name, df) in frames.items() if name != "ags_master")
+    expected += sum(
+        sys.getsizeof(k) + sys.getsizeof(v) for (k, v) in rd.ags_master().items()
+    )
+    assert rd.nbytes() == expected
@@ -0,0 +1,30 @@
+# pyright: strict
+
+from climatevision.server.resultcache import ResultCache, canonical_hash
+
+
+def test_canonical_hash_ignores_order():
+    assert canonical_hash({"a": 1, "b": "x"}) == canonical_hash({"b": "x", "a": 1})
+    assert canonical_hash({"a": 1}) != canonical_hash({"a": 1.0})
+
+
+def test_evicts_least_recently_used():
+    cache = ResultCache(max_bytes=10)
+    cache.put("a", "1234")
+    cache.put("b", "1234")
+    assert cache.get("a") == "1234"
+    cache.put("c", "1234")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1234"
+    assert cache.get("c") == "1234"
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions) == (3, 1, 1)
+    assert (stats.entries, stats.bytes) == (2, 8)
+    assert stats.hit_rate() == 0.75
+
+
+def test_does_not_cache_results_larger_than_the_budget():
+    cache = ResultCache(max_bytes=3)
+    cache.put("a", "1234")
+    assert cache.get("a") is None
+    assert cache.stats().bytes == 0
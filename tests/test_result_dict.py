@@ -0,0 +1,61 @@
+# pyright: strict
+
+from dataclasses import dataclass
+
+import pytest
+
+from climatevision.generator.resultdict import dataclass_to_result_dict
+
+
+@dataclass(kw_only=True)
+class Transport:
+    a: float
+    b: float
+
+
+@dataclass(kw_only=True)
+class Inner:
+    x: float
+    y: list[int]
+
+
+@dataclass(kw_only=True)
+class Lifting:
+    LIFT_INTO_RESULT_DICT = ["transport", "more"]
+    first: float
+    transport: Transport
+    inner: Inner
+    more: Transport
+    anything: object
+
+
+@dataclass(kw_only=True)
+class Broken:
+    LIFT_INTO_RESULT_DICT = ["x"]
+    x: float
+
+
+def test_lifts_fields_into_result_dict():
+    v = Lifting(
+        first=1.0,
+        transport=Transport(a=2.0, b=3.0),
+        inner=Inner(x=4.0, y=[5]),
+        more=Transport(a=6.0, b=7.0),
+        anything=Inner(x=8.0, y=[]),
+    )
+    d = dataclass_to_result_dict(v)
+    assert d == {
+        "first": 1.0,
+        "inner": {"x": 4.0, "y": [5]},
+        "anything": {"x": 8.0, "y": []},
+        "a": 6.0,
+        "b": 7.0,
+    }
+    assert list(d) == ["first", "inner", "anything", "a", "b"]
+    # Like asdict values that are not dataclasses are not copied.
+    assert d["inner"]["y"] is v.inner.y  # type: ignore
+
+
+def test_lifting_something_else_than_a_dataclass_fails():
+    with pytest.raises(AssertionError):
+        dataclass_to_result_dict(Broken(x=1.0))
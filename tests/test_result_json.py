@@ -0,0 +1,88 @@
+# pyright: strict
+
+from dataclasses import dataclass
+import io
+import json
+
+import pytest
+
+from climatevision.generator import resultjson
+from climatevision.generator.resultdict import dataclass_to_result_dict
+
+
+@dataclass(kw_only=True)
+class Transport:
+    a: float
+    b: int
+
+
+@dataclass(kw_only=True)
+class Sector:
+    LIFT_INTO_RESULT_DICT = ["transport"]
+    name: str
+    transport: Transport
+    nested: dict[str, object]
+    flags: list[object]
+
+
+SECTOR = Sector(
+    name='ä "x"',
+    transport=Transport(a=float("nan"), b=2),
+    nested={"empty": {}, "inf": float("inf"), "none": None, "l": []},
+    flags=[True, False, -1.5e-300],
+)
+
+
+@pytest.mark.parametrize(
+    "options,json_options",
+    [
+        ({}, {}),
+        ({"indent": 4}, {"indent": 4}),
+        ({"compact": True}, {"separators": (",", ":")}),
+    ],
+)
+def test_same_as_json_dumps_of_result_dict(
+    options: dict[str, object], json_options: dict[str, object]
+):
+    expected = json.dumps(dataclass_to_result_dict(SECTOR), **json_options)  # type: ignore
+    assert resultjson.dumps(SECTOR, **options) == expected  # type: ignore
+    out = io.StringIO()
+    resultjson.dump(SECTOR, out, **options)  # type: ignore
+    assert out.getvalue() == expected
+
+
+def test_default_converts_unknown_values():
+    with pytest.raises(TypeError):
+        resultjson.dumps({"x": object()})
+    assert resultjson.dumps({"x": {1}}, default=sorted) == '{"x": [1]}'
+
+
+def test_leaves_are_in_result_dict_order():
+    assert [p for (p, _) in resultjson.leaves(SECTOR)] == [
+        ("name",),
+        ("nested", "inf"),
+        ("nested", "none"),
+        ("nested", "l"),
+        ("flags",),
+        ("a",),
+        ("b",),
+    ]
+
+
+@dataclass(kw_only=True)
+class Result:
+    # Lifted in another order than the fields.
+    LIFT_INTO_RESULT_DICT = ["extra", "sector"]
+    year: int
+    sector: Sector
+    extra: dict[str, object]
+
+    def result_dict(self) -> dict[str, object]:
+        return dataclass_to_result_dict(self)
+
+
+def test_dump_of_result_with_lifted_fields():
+    result = Result(year=2035, sector=SECTOR, extra={"x": 1, "year": 2030})
+    out = io.StringIO()
+    resultjson.dump(result, out)
+    assert out.getvalue() == json.dumps(result.result_dict())
@@ -0,0 +1,60 @@
+# pyright: strict
+
+import math
+
+import numpy as np
+import pytest
+
+from climatevision.generator import resultvector
+
+RESULT = {
+    "r18": {"a": 1, "b": {"c": 2.5, "d": None}},
+    "h30": {"e": float("nan"), "f": -0.0},
+}
+
+
+def test_round_trip():
+    (schema, vector) = resultvector.vector_of_result_dict(RESULT)
+    assert schema.paths == ("r18.a", "r18.b.c", "r18.b.d", "h30.e", "h30.f")
+    assert schema.offsets["r18.b.d"] == 2
+    assert resultvector.is_null(vector).tolist() == [False, False, True, False, False]
+    back = schema.result_dict(vector)
+    assert back["r18"] == {"a": 1.0, "b": {"c": 2.5, "d": None}}
+    assert math.isnan(back["h30"]["e"])
+
+    (schema_id, unpacked) = resultvector.unpack(resultvector.pack(schema, vector))
+    assert schema_id == schema.id
+    assert unpacked.tobytes() == vector.tobytes()
+
+
+def test_same_shape_same_schema():
+    (schema, v1) = resultvector.vector_of_result_dict(RESULT)
+    other = {"r18": {"a": 2, "b": {"c": 0, "d": 1}}, "h30": {"e": 3, "f": 4}}
+    (same, v2) = resultvector.vector_of_result_dict(other)
+    assert same is schema
+    assert resultvector.schema_by_id(schema.id) is schema
+    matrix = resultvector.stack(schema, [(schema, v1), (same, v2)])
+    assert matrix.shape == (2, 5)
+    assert np.array_equal(matrix[1], [2, 0, 1, 3, 4])
+
+    (different, _) = resultvector.vector_of_result_dict({"x": 1})
+    assert different.id != schema.id
+    with pytest.raises(ValueError):
+        resultvector.stack(schema, [(different, np.zeros(1))])
+
+
+def test_only_numbers():
+    with pytest.raises(TypeError):
+        resultvector.vector_of_result_dict({"x": "text"})
+
+
+def test_keeps_the_schemas_used_last():
+    (first, _) = resultvector.vector_of_result_dict(RESULT)
+    for ndx in range(resultvector.MAX_SCHEMAS - 1):
+        resultvector.vector_of_result_dict({f"x{ndx}": 1})
+        # Using the first one keeps it.
+        assert resultvector.vector_of_result_dict(RESULT)[0] is first
+    (last, _) = resultvector.vector_of_result_dict({"y": 1})
+    assert resultvector.schema_by_id(first.id) is first
+    assert resultvector.schema_by_id(last.id) is last
+    assert len(resultvector._schemas) == resultvector.MAX_SCHEMAS  # type: ignore
@@ -0,0 +1,88 @@
+# pyright: strict
+
+import jsonrpcserver
+import pytest
+
+from climatevision.server.rpcs import MAX_DEPENDENCY_INDEXES, GeneratorRpcs, jobs_params
+from climatevision.tracing.dependencies import DependencyIndex
+
+
+class _NoRefData:
+    """Just enough of a RefData for the checks of the params."""
+
+    def version(self) -> None:
+        return None
+
+
+def test_jobs_params_accepts_lists_and_dicts():
+    jobs: list[object] = [
+        ["03159016", 2035, {"a": 1}],
+        {"ags": "DG000000", "year": 2030},
+    ]
+    assert jobs_params(jobs) == [
+        {"ags": "03159016", "year": 2035, "overrides": {"a": 1}, "trace": False},
+        {"ags": "DG000000", "year": 2030, "overrides": {}, "trace": False},
+    ]
+
+
+@pytest.mark.parametrize(
+    "jobs",
+    [
+        "03159016",
+        [["03159016", 2035]],
+        [{"ags": "03159016"}],
+        [{"ags": "03159016", "year": "2035"}],
+        [{"ags": "03159016", "year": True}],
+        [["03159016", True, {"a": 1}]],
+        [["03159016", 2035, "overrides"]],
+    ],
+)
+def test_jobs_params_rejects_invalid_jobs(jobs: object):
+    with pytest.raises(ValueError):
+        jobs_params(jobs)
+
+
+@pytest.mark.parametrize("depth", [-1, True, 1.5])
+def test_explain_rejects_invalid_depth(depth: object):
+    rpcs = GeneratorRpcs(_NoRefData())  # type: ignore
+    result = rpcs.explain("03159016", 2035, {}, ["r18.s.energy"], depth)  # type: ignore
+    assert result == jsonrpcserver.InvalidParams("depth must be a number >= 0")
+
+
+INDEX = DependencyIndex(dependents={"Fact_A": ["r18.a", "r30.a"], "Ass_B": []})
+
+
+def test_dependents_from_cached_index():
+    rpcs = GeneratorRpcs(_NoRefData())  # type: ignore
+    rpcs.keep_dependency_index("03159016", 2035, INDEX)
+    # Building an index would fail without reference data.
+    assert rpcs.dependents("03159016", 2035, ["Fact_A"]) == jsonrpcserver.Success(
+        {"Fact_A": ["r18.a", "r30.a"]}
+    )
+
+
+@pytest.mark.parametrize(
+    "year,names,message",
+    [
+        (2035, [], "names must be a non empty list of names"),
+        (2035, ["Fact_A", 1], "names must be a non empty list of names"),
+        (2035, "Fact_A", "names must be a non empty list of names"),
+        (True, ["Fact_A"], "ags must be a string and year a number"),
+        (2035, ["Fact_X"], "Unknown facts, assumptions or entries: ['Fact_X']"),
+    ],
+)
+def test_dependents_rejects_invalid_params(year: object, names: object, message: str):
+    rpcs = GeneratorRpcs(_NoRefData())  # type: ignore
+    rpcs.keep_dependency_index("03159016", 2035, INDEX)
+    result = rpcs.dependents("03159016", year, names)  # type: ignore
+    assert result == jsonrpcserver.InvalidParams(message)
+
+
+def test_keeps_the_last_dependency_indexes():
+    rpcs = GeneratorRpcs(_NoRefData())  # type: ignore
+    for year in range(2030, 2030 + MAX_DEPENDENCY_INDEXES):
+        rpcs.keep_dependency_index("03159016", year, INDEX)
+    assert rpcs.cached_dependency_index("03159016", 2030) is INDEX
+    rpcs.keep_dependency_index("03159016", 2050, INDEX)
+    assert rpcs.cached_dependency_index("03159016", 2031) is None
+    assert rpcs.cached_dependency_index("03159016", 2030) is INDEX
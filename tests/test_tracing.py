@@ -1,5 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from climatevision.tracing import dependencies, number
 from climatevision.tracing.number import TracedNumber
-from climatevision.generator import calculate_with_default_inputs
+from climatevision.generator import calculate_with_default_inputs, RefData
 from climatevision.tracing import with_tracing
 
 
@@ -86,6 +91,89 @@ def test_comparisons():
     assert TracedNumber.lift(1) < 2  # type: ignore
 
 
+def test_tables():
+    table = number.TraceTable()
+    a = TracedNumber.fact_or_ass("a", 2, table) * 3
+    assert a.table is table
+    assert (3 * a).table is table
+    # Each traced number has a node of its own, only plain operands share theirs.
+    b = TracedNumber.fact_or_ass("a", 2, table) * 3
+    assert a.trace != b.trace
+    assert table.node(a.trace)[3] == table.node(b.trace)[3]
+    # Equal values of different type (or sign) do not share a node.
+    assert table.operand(1) != table.operand(1.0)
+    assert table.operand(0.0) != table.operand(-0.0)
+
+
+def test_tape():
+    table = number.TraceTable()
+    x = TracedNumber.data(2, "d", "k", "c", table)
+    y = -(x / 4.0) + 1
+    assert len(table) == 6
+    assert table.node(x.trace) == (number.Kind.DATA, "d", "k", "c", 2)
+    assert table.node(y.trace) == (
+        number.Kind.BINARY,
+        "+",
+        y.trace - 2,
+        y.trace - 1,
+        0.5,
+    )
+    assert table.node(y.trace - 2) == (number.Kind.UNARY, "-", y.trace - 3)
+    # Values that are not floats are kept as they are.
+    assert type(table.value(x.trace)) is int
+    assert type(table.value(y.trace - 1)) is int
+    assert type(table.value(y.trace)) is float
+
+
+def test_dag_export():
+    table = number.TraceTable()
+    x = TracedNumber.fact_or_ass("a", 2, table)
+    y = TracedNumber.lift(3, table)
+    number.set_names({"r": {"x": x, "y": y}})
+    z = x * y + x * y
+
+    export = number.DagExport(table)
+    assert export.finalized(z) == {"value": 12, "trace": 3}
+    assert export.finalized(x) == {"value": 2, "trace": 4}
+    assert export.nodes == [
+        {"name": "r.x"},
+        {"name": "r.y"},
+        {"binary": "*", "a": 0, "b": 1, "value": 6},
+        {"binary": "+", "a": 2, "b": 2, "value": 12},
+        {"fact_or_ass": "a", "value": 2},
+    ]
+    assert number.finalized(z)["trace"] == {
+        "binary": "+",
+        "a": {"binary": "*", "a": {"name": "r.x"}, "b": {"name": "r.y"}, "value": 6},
+        "b": {"binary": "*", "a": {"name": "r.x"}, "b": {"name": "r.y"}, "value": 6},
+        "value": 12,
+    }
+
+
+def test_limited_tree():
+    table = number.TraceTable()
+    x = TracedNumber.fact_or_ass("a", 2, table)
+    number.set_names({"r": {"x": x}})
+    z = -(x * 3 + 1) * TracedNumber.data(5, "d", "k", "c", table)
+
+    assert number.finalized(z, depth=0)["trace"] == {
+        "binary": "*",
+        "a": {"truncated": True, "value": -7},
+        "b": {"source": "d", "key": "k", "attr": "c", "value": 5},
+        "value": -35,
+    }
+    assert number.finalized(z, depth=2)["trace"]["a"] == {  # type: ignore
+        "unary": "-",
+        "a": {
+            "binary": "+",
+            "a": {"truncated": True, "value": 6},
+            "b": 1,
+            "value": 7,
+        },
+    }
+    assert number.finalized(z, depth=9) == number.finalized(z)
+
+
 def test_enable_disable_tracing():
     """Here we do not care about the value computed nor do we care about the exact trace.
     What we do want is that the value stays the same across each run and that the trace
@@ -100,26 +188,65 @@ def test_enable_disable_tracing():
         + "}"
     )
 
-    result = with_tracing(
-        enabled=True,
-        f=lambda: calculate_with_default_inputs("08416041", 2035).result_dict(),
-    )
+    rd = RefData.load()
+
+    def calculate(rd: RefData):
+        return calculate_with_default_inputs("08416041", 2035, refdata=rd)
+
+    result = with_tracing(enabled=True, rd=rd, f=calculate)
     assert (
         str(result["a30"]["g"]["cost_wage"])  # type: ignore
         == "{'value': " + expected_value + ", 'trace': " + expected_trace + "}"
     )
 
-    result = with_tracing(
-        enabled=False,
-        f=lambda: calculate_with_default_inputs("08416041", 2035).result_dict(),
-    )
+    result = with_tracing(enabled=False, rd=rd, f=calculate)
     assert str(result["a30"]["g"]["cost_wage"]) == expected_value  # type: ignore
 
-    result = with_tracing(
-        enabled=True,
-        f=lambda: calculate_with_default_inputs("08416041", 2035).result_dict(),
-    )
+    result = with_tracing(enabled=True, rd=rd, f=calculate)
     assert (
         str(result["a30"]["g"]["cost_wage"])  # type: ignore
         == "{'value': " + expected_value + ", 'trace': " + expected_trace + "}"
     )
+
+
+def test_traced_and_untraced_side_by_side():
+    rd = RefData.load()
+
+    def calculate(trace: bool):
+        return with_tracing(
+            enabled=trace,
+            rd=rd,
+            f=lambda rd: calculate_with_default_inputs("08416041", 2035, refdata=rd),
+        )
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(calculate, [True, False, True, False]))
+    assert isinstance(results[0]["a30"]["g"]["cost_wage"], dict)
+    assert isinstance(results[1]["a30"]["g"]["cost_wage"], float)
+    assert results[0] == results[2]
+    assert results[1] == results[3]
+
+
+def test_sources_of_nodes():
+    table = number.TraceTable()
+    x = TracedNumber.fact_or_ass("Fact_x", 2, table)
+    y = TracedNumber.fact_or_ass("Ass_y", 3, table)
+    e = +TracedNumber.lift(4, table)
+    z = -(x * 2) + e
+    w = y / e
+    deps = dependencies._sources_of_nodes(
+        table, {x.trace: 0b001, y.trace: 0b010, e.trace: 0b100}
+    )
+    assert deps[z.trace] == 0b101
+    assert deps[w.trace] == 0b110
+    assert deps[table.operand(2)] == 0
+
+
+def test_dependency_index():
+    index = dependencies.DependencyIndex(
+        dependents={"Fact_x": ["a.b", "c.d"], "r_gas_fec": []}
+    )
+    assert index.query(["r_gas_fec"]) == {"r_gas_fec": []}
+    assert index.restricted_to(["c.d"]).query(["Fact_x"]) == {"Fact_x": ["c.d"]}
+    with pytest.raises(ValueError):
+        index.query(["Fact_x", "Fact_unknown"])